@@ -1,4 +1,6 @@
 
+import asyncio
+import os
 import sys
 import json
 import logging
@@ -9,32 +11,81 @@ from checkQC.qc_engine import QCEngine
 from checkQC.config import ConfigFactory
 from checkQC.run_type_recognizer import RunTypeRecognizer
 from checkQC.run_type_summarizer import RunTypeSummarizer
-from checkQC.exceptions import CheckQCException
+from checkQC.results_store import ResultsStore
+from checkQC.baselines import ThresholdResolver
+from checkQC.runfolder_io import RunfolderPrefetcher
+from checkQC.runfolder_archive import RunfolderArchive, ArchivedRunfolder
+from checkQC.sidecar import Sidecar
+from checkQC.deadline import Deadline
+from checkQC.execution_plan import ExecutionPlan
+from checkQC.handlers.qc_handler import ReportLogging
+from checkQC.log_setup import configure_logging
+from checkQC.exceptions import CheckQCException, QCTimeout
+from checkQC import profiling
 from checkQC import __version__ as checkqc_version
 
+log = logging.getLogger(__name__)
 
-logging.basicConfig(level=logging.DEBUG,
-                    format='%(levelname)-8s %(message)s')
 
-console_log_handler = logging.StreamHandler()
-log = logging.getLogger("")
+def _parse_lanes(ctx, param, value):
+    if not value:
+        return None
+    try:
+        lanes = [int(lane) for lane in value.split(",")]
+    except ValueError:
+        raise click.BadParameter("lanes should be given as a comma separated list of lane numbers, e.g. 1,3")
+    if any(lane < 1 for lane in lanes):
+        raise click.BadParameter("lane numbers start from 1")
+    return lanes
 
 
 @click.command("checkqc")
 @click.option("--config", help="Path to the checkQC configuration file", type=click.Path())
 @click.option('--json', is_flag=True, default=False, help="Print the results of the run as json to stdout")
+@click.option("--results_db", help="Path to a database where the results of the run will be stored (optional)",
+              type=click.Path())
+@click.option("--prefetch", is_flag=True, default=False,
+              help="Read all files needed from the runfolder up front, using large parallel reads. Useful if the "
+                   "runfolder is on a network filesystem.")
+@click.option("--scratch", help="Copy the files needed from the runfolder into this local directory before "
+                                "reading them (implies --prefetch). If the runfolder is an archive, the files "
+                                "needed are extracted here.", type=click.Path())
+@click.option("--sidecar", is_flag=True, default=False,
+              help="Write a summary of the values extracted from the runfolder next to it, and use it to avoid "
+                   "re-reading the runfolder when it is checked again.")
+@click.option("--only", multiple=True, help="Only run this handler (can be given several times)")
+@click.option("--skip", multiple=True, help="Do not run this handler (can be given several times)")
+@click.option("--skip_unavailable", is_flag=True, default=False,
+              help="Skip handlers for which none of the data sources are available (e.g. since the run has not "
+                   "been demultiplexed yet), instead of reporting them as not checked, which is a fatal qc error")
+@click.option("--lanes", callback=_parse_lanes,
+              help="Only check these lanes, given as a comma separated list, e.g. 3 or 1,2")
+@click.option("--profile", help="Profile the check, and write a cProfile (pstats) file for each stage of the check, "
+                                "and the sampled stacks in the collapsed format of flame graph tools, to this "
+                                "directory", type=click.Path(file_okay=False))
+@click.option("--log_format", type=click.Choice(["text", "json"]), default="text",
+              help="Write the log as text or as one json object per line (default: text)")
+@click.option("--report_logging", type=click.Choice(ReportLogging.MODES), default=ReportLogging.ALL,
+              help="Log all errors and warnings found, a summary per handler, a sample of them per handler, or "
+                   "none of them (default: all)")
 @click.version_option(checkqc_version)
 @click.argument('runfolder', type=click.Path())
-def start(config, json, runfolder):
+def start(config, json, results_db, prefetch, scratch, sidecar, only, skip, skip_unavailable, lanes, profile,
+          log_format, report_logging, runfolder):
     """
     checkQC is a command line utility designed to quickly gather and assess quality control metrics from an
     Illumina sequencing run. It is highly customizable and which quality controls modules should be run
     for a particular run type should be specified in the provided configuration file.
+
+    The runfolder can also be given as a tar or zip archive of the runfolder.
     """
     # -----------------------------------
     # This is the application entry point
     # -----------------------------------
-    app = App(runfolder, config, json)
+    configure_logging(json_format=log_format == "json")
+    ReportLogging.configure(report_logging)
+    app = App(runfolder, config, json, results_db, prefetch=prefetch, scratch_dir=scratch, sidecar=sidecar,
+              only=only, skip=skip, lanes=lanes, profile_dir=profile, skip_unavailable=skip_unavailable)
     app.run()
     sys.exit(app.exit_status)
 
@@ -44,43 +95,242 @@ class App(object):
     This is the main application object for CheckQC.
     """
 
-    def __init__(self, runfolder, config_file=None, json_mode=False):
+    def __init__(self, runfolder, config_file=None, json_mode=False, results_db=None, prefetch=False,
+                 scratch_dir=None, sidecar=False, only=None, skip=None, lanes=None, profile_dir=None,
+                 skip_unavailable=False):
         self._runfolder = runfolder
         self._config_file = config_file
         self._json_mode = json_mode
+        self._results_db = results_db
+        self._prefetch = prefetch or bool(scratch_dir)
+        self._scratch_dir = scratch_dir
+        self._lanes = lanes
+        # The sidecar holds the values of all lanes, so it is neither used nor written when only some are checked
+        self._sidecar = sidecar and not lanes
+        self._sidecar_signals = None
+        self._only = only
+        self._skip = skip
+        self._profile_dir = profile_dir
+        self._skip_unavailable = skip_unavailable
         self.exit_status = 0
+        self.metrics = []
+        self.timed_out = False
+        self._deadline = None
+
+    def _open_runfolder(self, parser_configurations):
+        if RunfolderArchive.is_archive(self._runfolder):
+            archived_runfolder = ArchivedRunfolder(self._runfolder, parser_configurations, self._scratch_dir)
+            return archived_runfolder.open(), archived_runfolder.close, archived_runfolder.archive
+        if self._prefetch:
+            prefetcher = RunfolderPrefetcher(self._runfolder, parser_configurations, self._scratch_dir)
+            return prefetcher.prefetch(), prefetcher.cleanup, None
+        return self._runfolder, None, None
+
+    def create_qc_engine(self, config, runfolder, run_type_recognizer, deadline=None, runfolder_archive=None,
+                         recorded_signals=None, record_signals=False):
+        """
+        Create the QCEngine which checks a runfolder with a configuration, in the same way as the application does:
+        the handlers of the run type are looked up, their thresholds are resolved against the results database
+        (if one is used), and they are compiled into an ExecutionPlan restricted by `only` and `skip`.
+
+        :param config: the checkQC configuration
+        :param runfolder: path to the runfolder (or the temporary runfolder of an archive) to check
+        :param run_type_recognizer: a RunTypeRecognizer of the runfolder
+        :param deadline: a Deadline limiting the time the engine may run, or None
+        :param runfolder_archive: the RunfolderArchive the runfolder has been created from, or None
+        :param recorded_signals: values sent by the parsers earlier, which are replayed instead of running them
+        :param record_signals: if True the values sent by the parsers are recorded
+        :returns: a tuple of the QCEngine and the summary of the run type
+        :raises: ConfigurationError if `only` or `skip` contains a handler which is not configured
+        """
+        instrument_and_reagent_version = run_type_recognizer.instrument_and_reagent_version()
+
+        # TODO For now assume symmetric read lengths
+        both_read_lengths = run_type_recognizer.read_length()
+        read_length = int(both_read_lengths.split("-")[0])
+        handler_config = config.get_handler_configs(instrument_and_reagent_version, read_length)
+        if self._results_db:
+            threshold_resolver = ThresholdResolver(ResultsStore(self._results_db))
+            handler_config = threshold_resolver.resolve(handler_config,
+                                                        run_type_recognizer.instrument_name(),
+                                                        instrument_and_reagent_version,
+                                                        both_read_lengths)
+
+        # Handlers which are disabled still collect metrics, so they are only pruned when no metrics are stored
+        execution_plan = ExecutionPlan.get(handler_config, only=self._only, skip=self._skip,
+                                           prune_disabled=not self._results_db)
+        run_type_summary = RunTypeSummarizer.summarize(instrument_and_reagent_version, both_read_lengths,
+                                                       execution_plan.selected_handler_config())
+
+        qc_engine = QCEngine(runfolder=runfolder,
+                             parser_configurations=config.get("parser_configurations", None),
+                             handler_config=handler_config,
+                             deadline=deadline,
+                             recorded_signals=recorded_signals,
+                             record_signals=record_signals,
+                             execution_plan=execution_plan,
+                             lanes=self._lanes,
+                             skip_unavailable_handlers=self._skip_unavailable,
+                             runfolder_archive=runfolder_archive)
+        return qc_engine, run_type_summary
+
+    def _create_qc_engine(self, config, runfolder, run_type_recognizer, deadline=None, runfolder_archive=None):
+        if self._sidecar:
+            sidecar = Sidecar(self._runfolder, config.get("parser_configurations", None)).load()
+            self._sidecar_signals = sidecar["signals"] if sidecar else None
+        return self.create_qc_engine(config, runfolder, run_type_recognizer, deadline, runfolder_archive,
+                                     recorded_signals=self._sidecar_signals, record_signals=self._sidecar)
+
+    def _finish(self, qc_engine, reports, run_type_summary, run_type_recognizer):
+        reports["run_summary"] = run_type_summary
+        self.exit_status = qc_engine.exit_status
+        self.metrics = qc_engine.metrics
+
+        if self._results_db:
+            if self._is_partial_check():
+                # Storing a run replaces all earlier results of it, so a partial check is not stored
+                log.info("Not storing the results in {}, since only a part of the run was checked".format(
+                    self._results_db))
+            else:
+                self._store_results(run_type_recognizer, reports, qc_engine.metrics)
+        if self._sidecar:
+            self._write_sidecar(qc_engine, reports, run_type_recognizer)
+        return reports
+
+    def _is_partial_check(self):
+        return bool(self._lanes or self._only or self._skip)
+
+    def _write_sidecar(self, qc_engine, reports, run_type_recognizer):
+        signals = dict(self._sidecar_signals or {})
+        if self._sidecar_signals is not None and set(qc_engine.recorded_signals).issubset(signals):
+            # All values were replayed from the sidecar, so there is nothing new to write
+            return
+        signals.update(qc_engine.recorded_signals)
+        run_type = {"instrument_and_reagent_type": reports["run_summary"]["instrument_and_reagent_type"],
+                    "read_length": reports["run_summary"]["read_length"],
+                    "instrument": run_type_recognizer.instrument_name(),
+                    "run_id": run_type_recognizer.run_id(),
+                    "run_date": None}
+        run_date = run_type_recognizer.run_date()
+        if run_date:
+            run_type["run_date"] = run_date.isoformat()
+        Sidecar(self._runfolder, qc_engine.parser_configurations).write(run_type=run_type,
+                                                                        signals=signals,
+                                                                        reports=reports,
+                                                                        metrics=qc_engine.metrics)
+
+    def _timed_out(self, error):
+        log.error("Checking {} was stopped: {}".format(self._runfolder, error))
+        self.exit_status = 1
+        self.timed_out = True
+
+    def cancel(self):
+        """
+        Cancel a running check. Since the cancellation is cooperative, the check will stop the next time
+        it checks its deadline.
+
+        :returns: None
+        """
+        if self._deadline:
+            self._deadline.cancel()
 
     def configure_and_run(self):
         """
         Configures and runs the application. It will set the exit status of the object in accordance with if any
-        fatal qc errors were found or not.
+        fatal qc errors were found or not. If the time limits of the `timeouts` section of the configuration are
+        passed, the check is stopped and `timed_out` is set.
+
+        If a profile directory was given, the check is profiled, and the profiles are written there
+        (see `checkQC.profiling.Profiler`).
 
         :returns: The reports of the application as a dict
         """
+        if self._profile_dir:
+            with profiling.Profiler(self._profile_dir):
+                return self._configure_and_run()
+        return self._configure_and_run()
+
+    def _configure_and_run(self):
+        close_runfolder = None
         try:
             config = ConfigFactory.from_config_path(self._config_file)
-            parser_configurations = config.get("parser_configurations", None)
-            run_type_recognizer = RunTypeRecognizer(config=config, runfolder=self._runfolder)
-            instrument_and_reagent_version = run_type_recognizer.instrument_and_reagent_version()
+            self._deadline = deadline = Deadline.from_config(config)
+            deadline.start_stage(Deadline.OPEN_RUNFOLDER)
+            with profiling.stage(Deadline.OPEN_RUNFOLDER):
+                runfolder, close_runfolder, runfolder_archive = self._open_runfolder(
+                    config.get("parser_configurations", None))
+            deadline.start_stage(Deadline.CONFIGURE)
+            with profiling.stage(Deadline.CONFIGURE):
+                run_type_recognizer = RunTypeRecognizer(config=config, runfolder=runfolder)
+                qc_engine, run_type_summary = self._create_qc_engine(config, runfolder, run_type_recognizer,
+                                                                     deadline, runfolder_archive)
+            reports = qc_engine.run()
+            return self._finish(qc_engine, reports, run_type_summary, run_type_recognizer)
+        except QCTimeout as e:
+            self._timed_out(e)
+        except CheckQCException as e:
+            log.error(e)
+            self.exit_status = 1
+        finally:
+            if close_runfolder:
+                close_runfolder()
 
-            # TODO For now assume symmetric read lengths
-            both_read_lengths = run_type_recognizer.read_length()
-            read_length = int(both_read_lengths.split("-")[0])
-            handler_config = config.get_handler_configs(instrument_and_reagent_version, read_length)
+    async def _run_async(self, config, deadline):
+        loop = asyncio.get_event_loop()
+        close_runfolder = None
+        try:
+            deadline.start_stage(Deadline.OPEN_RUNFOLDER)
+            runfolder, close_runfolder, runfolder_archive = await loop.run_in_executor(
+                None, self._open_runfolder, config.get("parser_configurations", None))
+            deadline.start_stage(Deadline.CONFIGURE)
+            run_type_recognizer = await RunTypeRecognizer.create_async(config=config, runfolder=runfolder)
+            # Resolving thresholds and storing results query the results database, and the sidecar is
+            # read and written, so these are done in an executor as well
+            qc_engine, run_type_summary = await loop.run_in_executor(None, self._create_qc_engine, config,
+                                                                     runfolder, run_type_recognizer, deadline,
+                                                                     runfolder_archive)
+            reports = await qc_engine.run_async()
+            return await loop.run_in_executor(None, self._finish, qc_engine, reports, run_type_summary,
+                                              run_type_recognizer)
+        finally:
+            if close_runfolder:
+                await loop.run_in_executor(None, close_runfolder)
 
-            run_type_summary = RunTypeSummarizer.summarize(instrument_and_reagent_version, both_read_lengths, handler_config)
+    async def configure_and_run_async(self):
+        """
+        Configures and runs the application from a coroutine, like `configure_and_run`. The runfolder files are
+        read, and the results database and sidecar are used, in an executor, and the parsers are run concurrently
+        (see `QCEngine.run_async`), so that the event loop is not blocked.
 
-            qc_engine = QCEngine(runfolder=self._runfolder,
-                                 parser_configurations=parser_configurations,
-                                 handler_config=handler_config)
-            reports = qc_engine.run()
-            reports["run_summary"] = run_type_summary
-            self.exit_status = qc_engine.exit_status
-            return reports
+        Since work done in an executor (e.g. a read from a hung filesystem) cannot be interrupted, the total
+        time limit is also enforced by cancelling the coroutine once it has passed, so that the caller is never
+        kept waiting for longer than the limit.
+
+        :returns: The reports of the application as a dict
+        """
+        try:
+            config = ConfigFactory.from_config_path(self._config_file)
+            self._deadline = deadline = Deadline.from_config(config)
+            return await asyncio.wait_for(self._run_async(config, deadline), timeout=deadline.remaining())
+        except asyncio.TimeoutError:
+            self.cancel()
+            self._timed_out("The check took longer than the total time limit of {} seconds".format(
+                self._deadline.total))
+        except QCTimeout as e:
+            self._timed_out(e)
         except CheckQCException as e:
             log.error(e)
             self.exit_status = 1
 
+    def _store_results(self, run_type_recognizer, reports, metrics):
+        log.info("Storing results in: {}".format(self._results_db))
+        ResultsStore(self._results_db).add_run(run_id=run_type_recognizer.run_id(),
+                                               runfolder=os.path.abspath(self._runfolder),
+                                               instrument=run_type_recognizer.instrument_name(),
+                                               run_date=run_type_recognizer.run_date(),
+                                               reports=reports,
+                                               metrics=metrics)
+
     def run(self):
         """
         This method will run CheckQC as it is intended to run as a commandline application, it will log to the
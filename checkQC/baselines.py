@@ -0,0 +1,204 @@
+import bisect
+import copy
+import logging
+
+from checkQC.handlers.qc_handler import QCHandler
+from checkQC.handlers.qc_handler_factory import QCHandlerFactory
+from checkQC.exceptions import QCHandlerNotFound
+
+log = logging.getLogger(__name__)
+
+
+class TDigest(object):
+    """
+    A (merging) t-digest, a compact sketch of a distribution from which quantiles can be estimated.
+    New values can be added incrementally, which means that the baseline of a metric can be kept up to date
+    as new runs are checked, without having to go back to the values of all earlier runs.
+
+    The digest keeps a sorted list of centroids, `[mean, weight]`, where the centroids close to the tails
+    of the distribution are kept small, so that the estimates of e.g. the 1st or 99th percentile are accurate.
+    See Dunning & Ertl, "Computing extremely accurate quantiles using t-digests" for details.
+    """
+
+    def __init__(self, compression=100, centroids=None):
+        """
+        Create a TDigest instance
+
+        :param compression: controls the number of centroids kept, and thereby the accuracy of the digest
+        :param centroids: a list of `[mean, weight]` pairs, e.g. from an earlier call to `to_dict`
+        """
+        self.compression = compression
+        self._centroids = [list(centroid) for centroid in centroids] if centroids else []
+        self._buffer = []
+
+    def __len__(self):
+        return int(sum(weight for _, weight in self._centroids) + sum(weight for _, weight in self._buffer))
+
+    def update(self, value, weight=1):
+        """
+        Add a value to the digest
+
+        :param value: the value to add
+        :param weight: the weight of the value
+        :returns: None
+        """
+        self._buffer.append([float(value), weight])
+        if len(self._buffer) > self.compression * 5:
+            self._compress()
+
+    def _compress(self):
+        if not self._buffer:
+            return
+        points = sorted(self._centroids + self._buffer, key=lambda centroid: centroid[0])
+        self._buffer = []
+        total_weight = sum(weight for _, weight in points)
+
+        merged = [list(points[0])]
+        cumulative_weight = 0
+        for mean, weight in points[1:]:
+            current = merged[-1]
+            proposed_weight = current[1] + weight
+            quantile = (cumulative_weight + proposed_weight / 2.0) / total_weight
+            if proposed_weight <= 4 * total_weight * quantile * (1 - quantile) / self.compression:
+                current[0] += (mean - current[0]) * weight / proposed_weight
+                current[1] = proposed_weight
+            else:
+                cumulative_weight += current[1]
+                merged.append([mean, weight])
+        self._centroids = merged
+
+    def quantile(self, quantile):
+        """
+        Estimate the value at the given quantile
+
+        :param quantile: a quantile between 0 and 1
+        :returns: the estimated value, or None if no values have been added to the digest
+        """
+        self._compress()
+        if not self._centroids:
+            return None
+        if len(self._centroids) == 1:
+            return self._centroids[0][0]
+
+        total_weight = sum(weight for _, weight in self._centroids)
+        target = quantile * total_weight
+        midpoints = []
+        cumulative_weight = 0
+        for _, weight in self._centroids:
+            midpoints.append(cumulative_weight + weight / 2.0)
+            cumulative_weight += weight
+
+        if target <= midpoints[0]:
+            return self._centroids[0][0]
+        if target >= midpoints[-1]:
+            return self._centroids[-1][0]
+
+        i = bisect.bisect_right(midpoints, target)
+        low_mean, high_mean = self._centroids[i - 1][0], self._centroids[i][0]
+        fraction = (target - midpoints[i - 1]) / (midpoints[i] - midpoints[i - 1])
+        return low_mean + fraction * (high_mean - low_mean)
+
+    def percentiles(self):
+        """
+        Estimate all integer percentiles of the digest, so that these can later be looked up directly
+
+        :returns: a list with the estimated values of the percentiles 0 to 100, or None if the digest is empty
+        """
+        if not len(self):
+            return None
+        return [self.quantile(percentile / 100.0) for percentile in range(101)]
+
+    def to_dict(self):
+        """
+        Dump the digest as a dictionary, e.g. to be able to store it as json
+
+        :returns: A dict representing the TDigest
+        """
+        self._compress()
+        return {"compression": self.compression, "centroids": self._centroids}
+
+    @staticmethod
+    def from_dict(digest_dict):
+        """
+        Create a TDigest from a dict created by `to_dict`
+
+        :param digest_dict: dict representing a TDigest
+        :returns: a TDigest instance
+        """
+        return TDigest(compression=digest_dict["compression"], centroids=digest_dict["centroids"])
+
+
+class ThresholdResolver(object):
+    """
+    The ThresholdResolver replaces relative thresholds in handler configurations, e.g. `warning: p5`, with the
+    value of that percentile in the baseline of the metric the handler checks. Baselines are kept in the
+    ResultsStore per instrument, instrument and reagent type, and read length. If there is no baseline for the
+    particular instrument, the baseline for all instruments of the same type and read length is used.
+
+    For a handler to support relative thresholds it must set `BASELINE_METRIC` to the name of the metric it checks.
+    """
+
+    def __init__(self, results_store, qc_handler_factory=None):
+        """
+        Create a ThresholdResolver instance
+
+        :param results_store: the ResultsStore holding the baselines
+        :param qc_handler_factory: A QCHandlerFactory, if None default QCHandlerFactory will be used
+        """
+        self._results_store = results_store
+        if qc_handler_factory:
+            self._qc_handler_factory = qc_handler_factory
+        else:
+            self._qc_handler_factory = QCHandlerFactory()
+
+    def _baseline_metric(self, handler_name):
+        try:
+            return self._qc_handler_factory.get_subclass(handler_name).BASELINE_METRIC
+        except QCHandlerNotFound:
+            return None
+
+    def resolve(self, handler_configs, instrument, instrument_and_reagent_type, read_length):
+        """
+        Resolve any relative thresholds in the handler configurations.
+
+        :param handler_configs: list of handler configurations, these will not be mutated
+        :param instrument: name of the instrument, e.g. 'D00118'
+        :param instrument_and_reagent_type: the instrument and reagent type, e.g. 'hiseq2500_rapidhighoutput_v4'
+        :param read_length: the read length(s) of the run, e.g. '125-125'
+        :returns: a list of handler configurations where relative thresholds have been replaced by actual values.
+                  If no baseline is available the threshold will be set to 'unknown'.
+        """
+        resolved_configs = []
+        for handler_config in handler_configs:
+            relative_keys = [key for key in (QCHandler.ERROR, QCHandler.WARNING)
+                             if QCHandler.is_relative_threshold(handler_config.get(key))]
+            if not relative_keys:
+                resolved_configs.append(handler_config)
+                continue
+
+            resolved_config = copy.deepcopy(handler_config)
+            metric = self._baseline_metric(handler_config["name"])
+            percentiles = None
+            if metric:
+                percentiles = self._results_store.get_baseline_percentiles(instrument,
+                                                                           instrument_and_reagent_type,
+                                                                           read_length,
+                                                                           metric)
+            else:
+                log.warning("{} does not support relative thresholds".format(handler_config["name"]))
+
+            for key in relative_keys:
+                if percentiles:
+                    percentile = int(handler_config[key][1:])
+                    resolved_config[key] = percentiles[percentile]
+                    log.info("Resolved {} threshold {} of {} to {}".format(key, handler_config[key],
+                                                                          handler_config["name"],
+                                                                          resolved_config[key]))
+                else:
+                    log.warning("No baseline found for {} on {} ({}, {}), "
+                                "using {} threshold 'unknown'".format(handler_config["name"], instrument,
+                                                                      instrument_and_reagent_type, read_length,
+                                                                      key))
+                    resolved_config[key] = QCHandler.UNKNOWN
+            resolved_configs.append(resolved_config)
+        return resolved_configs
@@ -0,0 +1,128 @@
+import json
+import logging
+import sys
+
+import click
+
+from checkQC.app import App
+from checkQC.config import ConfigFactory
+from checkQC.run_type_recognizer import RunTypeRecognizer
+from checkQC.log_setup import configure_logging
+from checkQC.exceptions import CheckQCException
+from checkQC import __version__ as checkqc_version
+
+log = logging.getLogger(__name__)
+
+
+class ConfigDiff(object):
+    """
+    ConfigDiff shows how changing the configuration would change the outcome of checking a set of runfolders.
+
+    Collecting the data from a runfolder is separated from evaluating it: each runfolder is parsed once, while
+    checking it against the first configuration, and the values the parsers sent to the handlers are recorded.
+    These are then replayed into handlers created from each of the other configurations, so that evaluating a
+    configuration does not require the runfolder to be read again. Parsers which are only needed by the
+    handlers of a later configuration are run (and recorded) the first time they are needed.
+
+    The handlers of each configuration are set up in the same way as by `checkqc` (see `App.create_qc_engine`),
+    so if a results database is given, thresholds relative to the historical baselines are resolved against it.
+    """
+
+    def __init__(self, config_files, results_db=None):
+        """
+        Create a ConfigDiff instance
+
+        :param config_files: paths to the configuration files to compare, the first one is the baseline
+        :param results_db: path to a results database to resolve baseline thresholds against (optional)
+        """
+        self.config_files = config_files
+        self.configs = [ConfigFactory.from_config_path(config_file) for config_file in config_files]
+        self.results_db = results_db
+
+    @staticmethod
+    def _report_messages(reports):
+        messages = set()
+        for handler_name, handler_reports in (reports or {}).items():
+            if isinstance(handler_reports, list):
+                for report in handler_reports:
+                    messages.add((handler_name, report["type"], report["message"]))
+        return messages
+
+    def _evaluate(self, config, run_type_recognizer, runfolder, recorded_signals):
+        app = App(runfolder=runfolder, results_db=self.results_db)
+        qc_engine, _ = app.create_qc_engine(config, runfolder, run_type_recognizer,
+                                            recorded_signals=recorded_signals, record_signals=True)
+        reports = qc_engine.run()
+        return reports, qc_engine
+
+    def diff_runfolder(self, runfolder):
+        """
+        Check a runfolder against all configurations
+
+        :param runfolder: path to the runfolder
+        :returns: a dict with the exit status for each configuration, and the reports which were
+                  added or removed compared to the first configuration
+        """
+        run_type_recognizer = RunTypeRecognizer(config=self.configs[0], runfolder=runfolder)
+        recorded_signals = {}
+        parser_configurations = None
+        results = []
+        for config in self.configs:
+            # Recorded values can only be reused if the parsers were configured in the same way
+            if config.get("parser_configurations", None) != parser_configurations:
+                recorded_signals = {}
+                parser_configurations = config.get("parser_configurations", None)
+            reports, qc_engine = self._evaluate(config, run_type_recognizer, runfolder, recorded_signals)
+            recorded_signals = dict(recorded_signals, **qc_engine.recorded_signals)
+            results.append((qc_engine.exit_status, self._report_messages(reports)))
+
+        baseline_exit_status, baseline_messages = results[0]
+        configurations = []
+        for config_file, (exit_status, messages) in zip(self.config_files, results):
+            configurations.append({"config": config_file,
+                                   "exit_status": exit_status,
+                                   "added": [{"handler": handler, "type": report_type, "message": message}
+                                             for handler, report_type, message in
+                                             sorted(messages - baseline_messages)],
+                                   "removed": [{"handler": handler, "type": report_type, "message": message}
+                                               for handler, report_type, message in
+                                               sorted(baseline_messages - messages)]})
+        return {"runfolder": runfolder,
+                "status_changed": len(set(exit_status for exit_status, _ in results)) > 1,
+                "configurations": configurations}
+
+    def run(self, runfolders):
+        """
+        Check all runfolders against all configurations
+
+        :param runfolders: paths to the runfolders
+        :returns: a dict with the results for each runfolder, and the runfolders whose status changed
+        """
+        runs = []
+        for runfolder in runfolders:
+            try:
+                runs.append(self.diff_runfolder(runfolder))
+            except CheckQCException as e:
+                log.error("Could not check {}: {}".format(runfolder, e))
+                runs.append({"runfolder": runfolder, "error": str(e)})
+        return {"status_changed": [run["runfolder"] for run in runs if run.get("status_changed")],
+                "runs": runs,
+                "version": checkqc_version}
+
+
+@click.command("checkqc-diff-config")
+@click.argument('old_config', type=click.Path())
+@click.argument('new_config', type=click.Path())
+@click.option("--results_db", help="Path to a results database to resolve baseline thresholds against (optional)",
+              type=click.Path())
+@click.argument('runfolders', type=click.Path(), nargs=-1, required=True)
+def start(old_config, new_config, results_db, runfolders):
+    """
+    Check a set of runfolders against two configurations, and print (as json) which runfolders would change
+    status, and which reports would be added or removed, if the new configuration was used. Each runfolder is
+    only parsed once.
+    """
+    configure_logging()
+    report = ConfigDiff([old_config, new_config], results_db=results_db).run(list(runfolders))
+    print(json.dumps(report))
+    sys.exit(0)
@@ -0,0 +1,106 @@
+import time
+
+from checkQC.exceptions import QCTimeout
+
+
+class Deadline(object):
+    """
+    A Deadline keeps track of the time limits for checking a runfolder. There can be a limit on the total time,
+    and on the time spent in each stage of the check (see `STAGES`). The limits are enforced cooperatively,
+    i.e. long running parts of checkQC (such as the parsers) call `check` regularly, which will raise a
+    `QCTimeout` if a limit has been passed, or if the check has been cancelled from elsewhere using `cancel`.
+
+    The limits are read from the `timeouts` section of the configuration, e.g.:
+
+    .. code-block :: yaml
+
+        timeouts:
+          total: 300
+          stages:
+            parse: 240
+    """
+
+    OPEN_RUNFOLDER = "open_runfolder"
+    CONFIGURE = "configure"
+    PARSE = "parse"
+    STAGES = (OPEN_RUNFOLDER, CONFIGURE, PARSE)
+
+    def __init__(self, total=None, stages=None):
+        """
+        Create a Deadline instance, the time starts counting when it is created
+
+        :param total: the total number of seconds allowed, or None for no limit
+        :param stages: a dict of stage names to the number of seconds allowed for that stage
+        """
+        self.total = total
+        self.stages = stages or {}
+        self._started = time.monotonic()
+        self._stage = None
+        self._stage_started = None
+        self._cancelled = False
+
+    @staticmethod
+    def from_config(config):
+        """
+        Create a Deadline from the `timeouts` section of the configuration
+
+        :param config: the checkQC configuration
+        :returns: a Deadline instance, without limits if there is no `timeouts` section
+        """
+        timeouts = config.get("timeouts", None) or {}
+        return Deadline(total=timeouts.get("total"), stages=timeouts.get("stages"))
+
+    def start_stage(self, stage):
+        """
+        Start a new stage of the check
+
+        :param stage: name of the stage
+        :returns: None
+        :raises: QCTimeout if a limit has already been passed
+        """
+        self.check()
+        self._stage = stage
+        self._stage_started = time.monotonic()
+
+    def _stage_limit(self):
+        return self.stages.get(self._stage) if self._stage else None
+
+    def remaining(self):
+        """
+        The time remaining until the first limit is reached
+
+        :returns: the number of seconds remaining, or None if there are no limits
+        """
+        now = time.monotonic()
+        remaining = []
+        if self.total is not None:
+            remaining.append(self.total - (now - self._started))
+        stage_limit = self._stage_limit()
+        if stage_limit is not None:
+            remaining.append(stage_limit - (now - self._stage_started))
+        return max(min(remaining), 0) if remaining else None
+
+    def cancel(self):
+        """
+        Cancel the check, the next call to `check` will raise a QCTimeout
+
+        :returns: None
+        """
+        self._cancelled = True
+
+    def check(self):
+        """
+        Check that no limit has been passed
+
+        :returns: None
+        :raises: QCTimeout if a limit has been passed, or if the check has been cancelled
+        """
+        if self._cancelled:
+            raise QCTimeout("The check was cancelled")
+        now = time.monotonic()
+        if self.total is not None and now - self._started > self.total:
+            raise QCTimeout("The check took longer than the total time limit of {} seconds".format(self.total))
+        stage_limit = self._stage_limit()
+        if stage_limit is not None and now - self._stage_started > stage_limit:
+            raise QCTimeout("The '{}' stage took longer than its time limit of {} seconds".format(self._stage,
+                                                                                                stage_limit))
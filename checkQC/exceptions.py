@@ -29,7 +29,27 @@ class RunParametersNotFound(CheckQCException):
     pass
 
 
-class StatsJsonNotFound(CheckQCException):
+class DataSourceNotFound(CheckQCException):
+    pass
+
+
+class StatsJsonNotFound(DataSourceNotFound):
+    pass
+
+
+class InteropNotFound(DataSourceNotFound):
+    pass
+
+
+class DemultiplexStatsNotFound(DataSourceNotFound):
+    pass
+
+
+class FastqNotFound(DataSourceNotFound):
+    pass
+
+
+class MalformedDataSource(CheckQCException):
     pass
 
 
@@ -43,3 +63,7 @@ class ConfigurationError(CheckQCException):
 
 class ConfigEntryMissing(CheckQCException):
     pass
+
+
+class QCTimeout(CheckQCException):
+    pass
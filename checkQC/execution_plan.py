@@ -0,0 +1,173 @@
+import json
+import logging
+import threading
+from collections import OrderedDict
+
+from checkQC.handlers.qc_handler_factory import QCHandlerFactory
+from checkQC.exceptions import ConfigurationError
+
+log = logging.getLogger(__name__)
+
+
+class HandlerPrototype(object):
+    """
+    A HandlerPrototype holds what is needed to create a QCHandler for a run: its class, its (validated)
+    configuration and the Parsers it can get its data from, in the order they should be tried.
+    """
+
+    def __init__(self, clazz, qc_config, parser_factories):
+        self.clazz = clazz
+        self.qc_config = qc_config
+        self.parser_factories = parser_factories
+
+    def create(self):
+        """
+        Create a new instance of the QCHandler
+
+        :returns: a QCHandler instance
+        """
+        return self.clazz(qc_config=self.qc_config)
+
+
+class ExecutionPlan(object):
+    """
+    An ExecutionPlan describes how a run of a particular run type (i.e. instrument and reagent version, and
+    read length) should be checked. It is compiled once from the handler configuration of the run type, which
+    means finding the QCHandler classes, validating their configurations and resolving which Parsers they read
+    from, and can then be used by the QCEngine for any number of runs of that type.
+
+    When the plan is compiled, handlers can be excluded, either by name (`only` and `skip`) or because they are
+    disabled, i.e. both their thresholds are `unknown`, and Parsers which no remaining handler needs will then
+    never be run. Since disabled handlers still collect metrics, they should not be pruned when the metrics are
+    of interest, e.g. when they are stored in a results database.
+
+    Compiled plans are cached (see `ExecutionPlan.get`), so that the setup of each run in a batch, or each
+    request to the webservice, is nearly free.
+    """
+
+    MAX_CACHED_PLANS = 64
+
+    _cache = OrderedDict()
+    _cache_lock = threading.Lock()
+
+    def __init__(self, handler_config, qc_handler_factory=None, only=None, skip=None, prune_disabled=True):
+        """
+        Create an ExecutionPlan instance
+
+        :param handler_config: list of handler configurations, as given by `Config.get_handler_configs`
+        :param qc_handler_factory: A QCHandlerFactory, if None default QCHandlerFactory will be used
+        :param only: names of the handlers to run, if None all handlers are run
+        :param skip: names of the handlers not to run
+        :param prune_disabled: if True handlers which have `unknown` as both error and warning threshold are
+                               not run
+        :raises: ConfigurationError if `only` or `skip` contains a handler which is not in the configuration
+        """
+        self.handler_config = handler_config
+        self.only = set(only) if only else None
+        self.skip = set(skip) if skip else set()
+        configured_names = set(clazz_config["name"] for clazz_config in handler_config)
+        unknown_names = ((self.only or set()) | self.skip) - configured_names
+        if unknown_names:
+            raise ConfigurationError("Unknown handler(s) given to only or skip: {}. The handlers configured for "
+                                     "this run type are: {}".format(", ".join(sorted(unknown_names)),
+                                                                   ", ".join(sorted(configured_names))))
+        self.prune_disabled = prune_disabled
+        self._qc_handler_factory = qc_handler_factory or QCHandlerFactory()
+        self._compile_lock = threading.Lock()
+        self.handler_prototypes = None
+
+    @classmethod
+    def get(cls, handler_config, only=None, skip=None, prune_disabled=True):
+        """
+        Get a cached ExecutionPlan, creating it if there is no plan for this configuration yet
+
+        :param handler_config: list of handler configurations, as given by `Config.get_handler_configs`
+        :param only: names of the handlers to run, if None all handlers are run
+        :param skip: names of the handlers not to run
+        :param prune_disabled: if True handlers which have `unknown` as both thresholds are not run
+        :returns: an ExecutionPlan
+        :raises: ConfigurationError if `only` or `skip` contains a handler which is not in the configuration
+        """
+        key = (json.dumps(handler_config, sort_keys=True, default=str),
+               tuple(sorted(only)) if only else None,
+               tuple(sorted(skip)) if skip else (),
+               prune_disabled)
+        with cls._cache_lock:
+            if key in cls._cache:
+                cls._cache.move_to_end(key)
+                return cls._cache[key]
+            plan = cls(handler_config, only=only, skip=skip, prune_disabled=prune_disabled)
+            cls._cache[key] = plan
+            while len(cls._cache) > cls.MAX_CACHED_PLANS:
+                cls._cache.popitem(last=False)
+            return plan
+
+    @classmethod
+    def clear_cache(cls):
+        """
+        Drop all cached ExecutionPlans
+
+        :returns: None
+        """
+        with cls._cache_lock:
+            cls._cache.clear()
+
+    def selected_handler_config(self):
+        """
+        The configurations of the handlers which have not been excluded by `only` or `skip`
+
+        :returns: a list of handler configurations
+        """
+        return [clazz_config for clazz_config in self.handler_config
+                if (self.only is None or clazz_config["name"] in self.only) and
+                clazz_config["name"] not in self.skip]
+
+    def compile(self):
+        """
+        Compile the plan, unless it has been compiled already
+
+        :returns: the list of HandlerPrototypes of the plan
+        :raises: ConfigurationError if the configuration of any handler is not valid
+        """
+        with self._compile_lock:
+            if self.handler_prototypes is None:
+                self.handler_prototypes = self._compile()
+            return self.handler_prototypes
+
+    def _compile(self):
+        handler_prototypes = []
+        for clazz_config in self.selected_handler_config():
+            clazz = self._qc_handler_factory.get_subclass(clazz_config["name"])
+            handler = clazz(qc_config=clazz_config)
+            try:
+                handler.validate_configuration()
+            except ConfigurationError as e:
+                log.error("Error in configuration found for handler: {}. {}".format(clazz.__name__, e))
+                raise e
+            if self.prune_disabled and handler.is_disabled():
+                log.debug("Not running {} since both its thresholds are unknown".format(clazz.__name__))
+                continue
+            handler_prototypes.append(HandlerPrototype(clazz,
+                                                       clazz_config,
+                                                       [handler.parser()] + list(handler.fallback_parsers())))
+        return handler_prototypes
+
+    def parser_graph(self):
+        """
+        The Parsers which will be used by the plan, and the handlers which read from them
+
+        :returns: an OrderedDict of the (primary) Parser of each handler to the names of the handlers reading
+                  from it
+        """
+        graph = OrderedDict()
+        for prototype in self.compile():
+            graph.setdefault(prototype.parser_factories[0], []).append(prototype.clazz.__name__)
+        return graph
+
+    def create_handlers(self):
+        """
+        Create the handlers for a run
+
+        :returns: a list of tuples of a new QCHandler instance and the Parsers it can get its data from
+        """
+        return [(prototype.create(), prototype.parser_factories) for prototype in self.compile()]
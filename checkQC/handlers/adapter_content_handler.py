@@ -0,0 +1,78 @@
+from checkQC.handlers.qc_handler import QCHandler, QCErrorFatal, QCErrorWarning
+from checkQC.parsers.fastq_parser import FastqParser
+
+
+class AdapterContentHandler(QCHandler):
+    """
+    This handler will check that the percentage of the sampled reads of a fastq file which contain an adapter
+    sequence is below the specified threshold. The reads are sampled by the FastqParser, which also determines
+    which adapters are looked for.
+    """
+
+    BASELINE_METRIC = "adapter_content"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fastq_samples = []
+
+    def parser(self):
+        """
+        The AdapterContentHandler fetches its data from the fastq files
+
+        :returns: A FastqParser callable
+        """
+        return FastqParser
+
+    def collect(self, signal):
+        key, value = signal
+        if key == "fastq_sample":
+            self.fastq_samples.append(value)
+
+    @staticmethod
+    def adapter_content(fastq_sample):
+        """
+        The adapter which is found in the largest share of the sampled reads
+
+        :param fastq_sample: the summary of the sampled reads of a fastq file, as sent by the FastqParser
+        :returns: a tuple of the name of the adapter and the percentage of the reads containing it, or None
+                  if no reads were sampled
+        """
+        if not fastq_sample["reads_sampled"] or not fastq_sample["adapter_counts"]:
+            return None
+        adapter, count = max(fastq_sample["adapter_counts"].items(), key=lambda adapter_count: adapter_count[1])
+        return adapter, count / fastq_sample["reads_sampled"] * 100
+
+    def metrics(self):
+        highest = {}
+        for fastq_sample in self.fastq_samples:
+            adapter_content = self.adapter_content(fastq_sample)
+            if adapter_content is None or fastq_sample["lane"] is None:
+                continue
+            key = (fastq_sample["lane"], fastq_sample["read"])
+            highest[key] = max(highest.get(key, 0), adapter_content[1])
+        for (lane, read), percentage in sorted(highest.items()):
+            yield {"metric": "adapter_content", "lane": lane, "read": read, "value": percentage}
+
+    def check_qc(self):
+
+        for fastq_sample in self.fastq_samples:
+            adapter_content = self.adapter_content(fastq_sample)
+            if adapter_content is None:
+                continue
+            adapter, percentage = adapter_content
+            lane_nbr = fastq_sample["lane"]
+            data = {"lane": lane_nbr, "read": fastq_sample["read"], "sample_id": fastq_sample["sample_id"],
+                    "file": fastq_sample["file"], "adapter": adapter, "percentage_with_adapter": percentage}
+
+            if self.error() != self.UNKNOWN and percentage > self.error():
+                yield QCErrorFatal("{} was found in {:.2f}% of the sampled reads of {}".format(
+                                   adapter, percentage, fastq_sample["file"]),
+                                   ordering=lane_nbr or 0,
+                                   data=dict(data, threshold=self.error()))
+            elif self.warning() != self.UNKNOWN and percentage > self.warning():
+                yield QCErrorWarning("{} was found in {:.2f}% of the sampled reads of {}".format(
+                                     adapter, percentage, fastq_sample["file"]),
+                                     ordering=lane_nbr or 0,
+                                     data=dict(data, threshold=self.warning()))
+            else:
+                continue
@@ -2,13 +2,19 @@ from math import pow
 
 from checkQC.handlers.qc_handler import QCHandler, QCErrorFatal, QCErrorWarning
 from checkQC.parsers.stats_json_parser import StatsJsonParser
+from checkQC.parsers.interop_parser import InteropParser
+from checkQC.parsers.bcl_convert_parser import BclConvertParser
 
 
 class ClusterPFHandler(QCHandler):
     """
     This handler will check that the number of clusters passing filter on a lane passes the set criteria.
+    The data is picked up from the Stats.json file, or if bcl2fastq has not been run, from the bcl-convert
+    reports or the Interop files.
     """
 
+    BASELINE_METRIC = "clusters_pf"
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.conversion_results = None
@@ -21,10 +27,29 @@ class ClusterPFHandler(QCHandler):
         """
         return StatsJsonParser
 
+    def fallback_parsers(self):
+        """
+        If bcl2fastq has not been run, the ClusterPFHandler will gather its data from the bcl-convert
+        reports, or if there are none, from the Interop files
+
+        :returns: a list with a BclConvertParser and a InteropParser callable
+        """
+        return [BclConvertParser, InteropParser]
+
     def collect(self, signal):
         key, value = signal
         if key == "ConversionResults":
             self.conversion_results = value
+        if key == "clusters_pf":
+            if self.conversion_results is None:
+                self.conversion_results = []
+            self.conversion_results.append({"LaneNumber": value["lane"], "TotalClustersPF": value["clusters_pf"]})
+
+    def metrics(self):
+        # Given in millions, just like the thresholds in the config
+        for lane_dict in self.conversion_results or []:
+            yield {"metric": "clusters_pf", "lane": int(lane_dict["LaneNumber"]), "read": None,
+                   "value": lane_dict["TotalClustersPF"]/pow(10, 6)}
 
     def check_qc(self):
         for lane_dict in self.conversion_results:
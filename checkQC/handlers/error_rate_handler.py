@@ -12,6 +12,8 @@ class ErrorRateHandler(QCHandler):
     ErrorRateHandler has 'allow_missing_error_rate' set to 'True'.
     """
 
+    BASELINE_METRIC = "error_rate"
+
     ALLOW_MISSING_ERROR_RATE = "allow_missing_error_rate"
 
     def __init__(self, *args, **kwargs):
@@ -31,6 +33,11 @@ class ErrorRateHandler(QCHandler):
         if key == "error_rate":
             self.error_results.append(value)
 
+    def metrics(self):
+        for error_dict in self.error_results:
+            yield {"metric": "error_rate", "lane": int(error_dict["lane"]), "read": error_dict["read"],
+                   "value": error_dict["error_rate"]}
+
     def custom_configuration_validation(self):
         try:
             value = self.qc_config[self.ALLOW_MISSING_ERROR_RATE]
@@ -41,6 +48,15 @@ class ErrorRateHandler(QCHandler):
             raise ConfigurationError("Only True/False are allowed as values for 'allow_missing_error_rate' in the "
                                      "ErrorRate handler config. Value was: {}".format(value))
 
+    def is_disabled(self):
+        """
+        The ErrorRateHandler is not disabled if it should report missing error rates, even if both its
+        thresholds are `unknown`
+
+        :returns: True if the handler is disabled, else False
+        """
+        return super().is_disabled() and self.qc_config.get(self.ALLOW_MISSING_ERROR_RATE) is not False
+
     def check_qc(self):
 
         for error_dict in self.error_results:
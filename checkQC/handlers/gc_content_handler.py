@@ -0,0 +1,84 @@
+import statistics
+from collections import defaultdict
+
+from checkQC.handlers.qc_handler import QCHandler, QCErrorFatal, QCErrorWarning
+from checkQC.parsers.fastq_parser import FastqParser
+
+
+class GCContentHandler(QCHandler):
+    """
+    This handler will check that the GC content of the sampled reads of each sample does not deviate from that of
+    the other samples on the lane. The value specified in the configuration is the largest accepted difference (in
+    percentage points) between the GC content of a sample and the median GC content of the samples on the lane
+    (for the same read). A sample which deviates can e.g. be contaminated, or come from another organism.
+    """
+
+    BASELINE_METRIC = "gc_content_deviation"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fastq_samples = []
+
+    def parser(self):
+        """
+        The GCContentHandler fetches its data from the fastq files
+
+        :returns: A FastqParser callable
+        """
+        return FastqParser
+
+    def collect(self, signal):
+        key, value = signal
+        if key == "fastq_sample":
+            self.fastq_samples.append(value)
+
+    def gc_content_deviations(self):
+        """
+        The deviation of the GC content of each sampled fastq file from the median of the lane and read
+
+        :returns: a list of tuples of the summary of the sampled reads of the fastq file, the median GC content
+                  of its lane and read, and the deviation from it in percentage points
+        """
+        by_lane_and_read = defaultdict(list)
+        for fastq_sample in self.fastq_samples:
+            if fastq_sample["gc_content"] is not None:
+                by_lane_and_read[(fastq_sample["lane"] or 0, fastq_sample["read"])].append(fastq_sample)
+
+        deviations = []
+        for key in sorted(by_lane_and_read):
+            fastq_samples = by_lane_and_read[key]
+            median = statistics.median(fastq_sample["gc_content"] for fastq_sample in fastq_samples)
+            for fastq_sample in fastq_samples:
+                deviations.append((fastq_sample, median, abs(fastq_sample["gc_content"] - median)))
+        return deviations
+
+    def metrics(self):
+        largest = {}
+        for fastq_sample, _, deviation in self.gc_content_deviations():
+            if fastq_sample["lane"] is None:
+                continue
+            key = (fastq_sample["lane"], fastq_sample["read"])
+            largest[key] = max(largest.get(key, 0), deviation)
+        for (lane, read), deviation in sorted(largest.items()):
+            yield {"metric": "gc_content_deviation", "lane": lane, "read": read, "value": deviation}
+
+    def check_qc(self):
+
+        for fastq_sample, median, deviation in self.gc_content_deviations():
+            lane_nbr = fastq_sample["lane"]
+            data = {"lane": lane_nbr, "read": fastq_sample["read"], "sample_id": fastq_sample["sample_id"],
+                    "file": fastq_sample["file"], "gc_content": fastq_sample["gc_content"],
+                    "median_gc_content": median, "deviation": deviation}
+
+            if self.error() != self.UNKNOWN and deviation > self.error():
+                yield QCErrorFatal("The GC content of {} was {:.2f}%, which deviates from the median of the lane "
+                                   "({:.2f}%)".format(fastq_sample["file"], fastq_sample["gc_content"], median),
+                                   ordering=lane_nbr or 0,
+                                   data=dict(data, threshold=self.error()))
+            elif self.warning() != self.UNKNOWN and deviation > self.warning():
+                yield QCErrorWarning("The GC content of {} was {:.2f}%, which deviates from the median of the lane "
+                                     "({:.2f}%)".format(fastq_sample["file"], fastq_sample["gc_content"], median),
+                                     ordering=lane_nbr or 0,
+                                     data=dict(data, threshold=self.warning()))
+            else:
+                continue
@@ -0,0 +1,88 @@
+from checkQC.handlers.qc_handler import QCHandler, QCErrorFatal, QCErrorWarning
+from checkQC.parsers.extended_tile_metrics_parser import ExtendedTileMetricsParser
+from checkQC.exceptions import ConfigurationError
+
+
+class OccupancyHandler(QCHandler):
+    """
+    This handler will check the occupancy of the wells of a patterned flowcell (e.g. on NovaSeq). The value specified
+    in the configuration is the lowest accepted percentage of occupied wells on a lane. Low occupancy is a sign of
+    underloading.
+
+    If 'max_percent_occupied_not_pf' is set, a warning is also given for lanes where the percentage of wells which
+    are occupied, but whose clusters do not pass filter, is higher than this. Many such wells are a sign of
+    overloading, or of pad hopping.
+
+    Runs on instruments without patterned flowcells have no occupancy data, and are not checked.
+    """
+
+    BASELINE_METRIC = "percent_occupied"
+
+    MAX_PERCENT_OCCUPIED_NOT_PF = "max_percent_occupied_not_pf"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.occupancy_results = []
+
+    def parser(self):
+        """
+        The OccupancyHandler fetches its data from the Interop files.
+
+        :returns: an ExtendedTileMetricsParser callable
+        """
+        return ExtendedTileMetricsParser
+
+    def custom_configuration_validation(self):
+        value = self.qc_config.get(self.MAX_PERCENT_OCCUPIED_NOT_PF, self.UNKNOWN)
+        if value != self.UNKNOWN and (isinstance(value, bool) or not isinstance(value, (int, float))):
+            raise ConfigurationError("'{}' in the OccupancyHandler config should be a number or unknown. "
+                                     "Value was: {}".format(self.MAX_PERCENT_OCCUPIED_NOT_PF, value))
+
+    def is_disabled(self):
+        """
+        The OccupancyHandler is not disabled if 'max_percent_occupied_not_pf' is set, even if both its
+        thresholds are `unknown`
+
+        :returns: True if the handler is disabled, else False
+        """
+        return super().is_disabled() and \
+            self.qc_config.get(self.MAX_PERCENT_OCCUPIED_NOT_PF, self.UNKNOWN) == self.UNKNOWN
+
+    def collect(self, signal):
+        key, value = signal
+        if key == "occupancy":
+            self.occupancy_results.append(value)
+
+    def metrics(self):
+        for occupancy_dict in self.occupancy_results:
+            yield {"metric": "percent_occupied", "lane": occupancy_dict["lane"], "read": None,
+                   "value": occupancy_dict["percent_occupied"]}
+            yield {"metric": "percent_occupied_not_pf", "lane": occupancy_dict["lane"], "read": None,
+                   "value": occupancy_dict["percent_occupied_not_pf"]}
+
+    def check_qc(self):
+        max_percent_occupied_not_pf = self.qc_config.get(self.MAX_PERCENT_OCCUPIED_NOT_PF, self.UNKNOWN)
+
+        for occupancy_dict in self.occupancy_results:
+            lane_nbr = occupancy_dict["lane"]
+            percent_occupied = occupancy_dict["percent_occupied"]
+            percent_occupied_not_pf = occupancy_dict["percent_occupied_not_pf"]
+
+            if self.error() != self.UNKNOWN and percent_occupied < float(self.error()):
+                yield QCErrorFatal("The occupancy was too low on lane {}, "
+                                   "it was: {:.2f}%".format(lane_nbr, percent_occupied),
+                                   ordering=lane_nbr,
+                                   data=dict(occupancy_dict, threshold=self.error()))
+            elif self.warning() != self.UNKNOWN and percent_occupied < float(self.warning()):
+                yield QCErrorWarning("The occupancy was too low on lane {}, "
+                                     "it was: {:.2f}%".format(lane_nbr, percent_occupied),
+                                     ordering=lane_nbr,
+                                     data=dict(occupancy_dict, threshold=self.warning()))
+
+            if max_percent_occupied_not_pf != self.UNKNOWN and \
+                    percent_occupied_not_pf > float(max_percent_occupied_not_pf):
+                yield QCErrorWarning("{:.2f}% of the wells on lane {} were occupied by clusters which did not pass "
+                                     "filter, the lane may have been overloaded".format(percent_occupied_not_pf,
+                                                                                        lane_nbr),
+                                     ordering=lane_nbr,
+                                     data=dict(occupancy_dict, threshold=max_percent_occupied_not_pf))
@@ -0,0 +1,78 @@
+from checkQC.handlers.qc_handler import QCHandler, QCErrorFatal, QCErrorWarning
+from checkQC.parsers.fastq_parser import FastqParser
+
+
+class OverrepresentedSequencesHandler(QCHandler):
+    """
+    This handler will check that no single sequence makes up more than the specified percentage of the sampled
+    reads of a fastq file. A sequence is the first bases of a read (by default 50, see the FastqParser). An
+    overrepresented sequence can e.g. be an adapter dimer, or a sign of a library with low complexity.
+    """
+
+    BASELINE_METRIC = "overrepresented_sequence_percentage"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fastq_samples = []
+
+    def parser(self):
+        """
+        The OverrepresentedSequencesHandler fetches its data from the fastq files
+
+        :returns: A FastqParser callable
+        """
+        return FastqParser
+
+    def collect(self, signal):
+        key, value = signal
+        if key == "fastq_sample":
+            self.fastq_samples.append(value)
+
+    @staticmethod
+    def most_common_sequence(fastq_sample):
+        """
+        The most common sequence of the sampled reads
+
+        :param fastq_sample: the summary of the sampled reads of a fastq file, as sent by the FastqParser
+        :returns: a tuple of the sequence and the percentage of the reads which it makes up, or None if no
+                  reads were sampled
+        """
+        if not fastq_sample["reads_sampled"] or not fastq_sample["top_sequences"]:
+            return None
+        sequence, count = fastq_sample["top_sequences"][0]
+        return sequence, count / fastq_sample["reads_sampled"] * 100
+
+    def metrics(self):
+        highest = {}
+        for fastq_sample in self.fastq_samples:
+            most_common_sequence = self.most_common_sequence(fastq_sample)
+            if most_common_sequence is None or fastq_sample["lane"] is None:
+                continue
+            key = (fastq_sample["lane"], fastq_sample["read"])
+            highest[key] = max(highest.get(key, 0), most_common_sequence[1])
+        for (lane, read), percentage in sorted(highest.items()):
+            yield {"metric": "overrepresented_sequence_percentage", "lane": lane, "read": read, "value": percentage}
+
+    def check_qc(self):
+
+        for fastq_sample in self.fastq_samples:
+            most_common_sequence = self.most_common_sequence(fastq_sample)
+            if most_common_sequence is None:
+                continue
+            sequence, percentage = most_common_sequence
+            lane_nbr = fastq_sample["lane"]
+            data = {"lane": lane_nbr, "read": fastq_sample["read"], "sample_id": fastq_sample["sample_id"],
+                    "file": fastq_sample["file"], "sequence": sequence, "percentage": percentage}
+
+            if self.error() != self.UNKNOWN and percentage > self.error():
+                yield QCErrorFatal("The sequence {} made up {:.2f}% of the sampled reads of {}".format(
+                                   sequence, percentage, fastq_sample["file"]),
+                                   ordering=lane_nbr or 0,
+                                   data=dict(data, threshold=self.error()))
+            elif self.warning() != self.UNKNOWN and percentage > self.warning():
+                yield QCErrorWarning("The sequence {} made up {:.2f}% of the sampled reads of {}".format(
+                                     sequence, percentage, fastq_sample["file"]),
+                                     ordering=lane_nbr or 0,
+                                     data=dict(data, threshold=self.warning()))
+            else:
+                continue
@@ -9,6 +9,8 @@ class Q30Handler(QCHandler):
     above the specified threshold.
     """
 
+    BASELINE_METRIC = "percent_q30"
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.error_results = []
@@ -26,6 +28,11 @@ class Q30Handler(QCHandler):
         if key == "percent_q30":
             self.error_results.append(value)
 
+    def metrics(self):
+        for error_dict in self.error_results:
+            yield {"metric": "percent_q30", "lane": int(error_dict["lane"]), "read": error_dict["read"],
+                   "value": error_dict["percent_q30"]}
+
     def check_qc(self):
 
         for error_dict in self.error_results:
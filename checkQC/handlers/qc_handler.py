@@ -1,5 +1,6 @@
 
 import logging
+import re
 
 from checkQC.exceptions import ConfigurationError
 
@@ -81,6 +82,84 @@ class QCErrorWarning(QCHandlerReport):
         return "warning"
 
 
+class ReportLogging(object):
+    """
+    ReportLogging decides how the errors and warnings found by the QCHandlers are logged when they report.
+    Logging each of them can take a noticeable amount of time on runs with thousands of reports, so the
+    mode can be set (with `configure`) to one of:
+
+     - `all`: log every error and warning (the default)
+     - `summarized`: log one line per handler, with the number of errors and warnings found
+     - `sampled`: log the first `sample_size` errors and warnings of each handler, and the number of those left out
+     - `off`: do not log the reports at all
+
+    The records logged for each error or warning carry the name of the handler (`qc_handler`), the type of the
+    report (`qc_report_type`) and its data (`qc_data`), so that they can be picked up by a structured formatter
+    (see `checkQC.log_setup.JsonFormatter`).
+    """
+
+    ALL = "all"
+    SUMMARIZED = "summarized"
+    SAMPLED = "sampled"
+    OFF = "off"
+    MODES = (ALL, SUMMARIZED, SAMPLED, OFF)
+
+    mode = ALL
+    sample_size = 10
+
+    @classmethod
+    def configure(cls, mode, sample_size=None):
+        """
+        Set how the reports are logged
+
+        :param mode: one of `ReportLogging.MODES`
+        :param sample_size: the number of reports logged per handler in the `sampled` mode
+        :returns: None
+        :raises: ConfigurationError if the mode is not known
+        """
+        if mode not in cls.MODES:
+            raise ConfigurationError("Unknown report logging mode: {}. Should be one of: {}".format(
+                mode, ", ".join(cls.MODES)))
+        cls.mode = mode
+        if sample_size is not None:
+            cls.sample_size = sample_size
+
+    @staticmethod
+    def _log_report(handler_name, report):
+        level = logging.ERROR if isinstance(report, QCErrorFatal) else logging.WARNING
+        log.log(level, report, extra={"qc_handler": handler_name,
+                                      "qc_report_type": report.type(),
+                                      "qc_data": report.data})
+
+    @classmethod
+    def log_reports(cls, handler_name, reports):
+        """
+        Log the reports of a handler according to the mode
+
+        :param handler_name: name of the handler which found the errors and warnings
+        :param reports: a list of the QCHandlerReports found by the handler
+        :returns: None
+        """
+        if cls.mode == cls.OFF or not reports:
+            return
+
+        if cls.mode == cls.SUMMARIZED:
+            nbr_of_errors = sum(1 for report in reports if isinstance(report, QCErrorFatal))
+            nbr_of_warnings = len(reports) - nbr_of_errors
+            log.log(logging.ERROR if nbr_of_errors else logging.WARNING,
+                    "{}: {} fatal qc error(s) and {} qc warning(s)".format(handler_name, nbr_of_errors,
+                                                                             nbr_of_warnings),
+                    extra={"qc_handler": handler_name, "qc_errors": nbr_of_errors, "qc_warnings": nbr_of_warnings})
+            return
+
+        logged = reports if cls.mode == cls.ALL else reports[:cls.sample_size]
+        for report in logged:
+            cls._log_report(handler_name, report)
+        if len(logged) < len(reports):
+            log.info("{}: {} more error(s) and warning(s) were not logged".format(
+                handler_name, len(reports) - len(logged)), extra={"qc_handler": handler_name})
+
+
 class Subscriber(object):
     """
     Subscriber defines the behaviour necessary to subscribe to data from a Parser. The implementing subclass
@@ -133,6 +212,16 @@ class Subscriber(object):
         """
         self.subscriber.send(value)
 
+    async def send_async(self, value):
+        """
+        Will send the specified value to the subscriber from a coroutine. Override this in a subclass which needs
+        to await something when receiving values.
+
+        :param value: Value to send to subscriber
+        :returns: None
+        """
+        self.send(value)
+
 
 class QCHandler(Subscriber):
     """
@@ -146,6 +235,12 @@ class QCHandler(Subscriber):
     ERROR = 'error'
     WARNING = 'warning'
 
+    # Name of the metric (as given by `metrics`) which the thresholds of this handler apply to. Setting this
+    # allows relative thresholds, e.g. `warning: p5`, to be resolved from historical baselines.
+    BASELINE_METRIC = None
+
+    RELATIVE_THRESHOLD = re.compile(r"^p(\d{1,2}|100)$")
+
     def __init__(self, qc_config):
         """
         Create a QCHandler instance
@@ -177,8 +272,35 @@ class QCHandler(Subscriber):
             self.qc_config[self.WARNING]
         except KeyError as e:
             raise ConfigurationError("Configuration expects key: {}. Perhaps it is missing?".format(e.args[0]))
+
+        for key in (self.ERROR, self.WARNING):
+            value = self.qc_config[key]
+            if self.is_relative_threshold(value):
+                raise ConfigurationError("The relative threshold {}: {} could not be resolved. Relative thresholds "
+                                         "require historical baselines, i.e. that a results "
+                                         "database is used.".format(key, value))
         self.custom_configuration_validation()
 
+    @staticmethod
+    def is_relative_threshold(value):
+        """
+        Check if a threshold is a relative threshold, i.e. has the format `p<percentile>`, e.g. `p5`
+
+        :param value: the threshold value from the configuration
+        :returns: True if the value is a relative threshold, else False
+        """
+        return isinstance(value, str) and bool(QCHandler.RELATIVE_THRESHOLD.match(value))
+
+    def is_disabled(self):
+        """
+        Check if the handler is disabled, i.e. if both its error and warning thresholds are `unknown`, which
+        means that it will never report anything (although it will still collect metrics). Handlers which
+        can report things which do not depend on these thresholds should override this.
+
+        :returns: True if the handler is disabled, else False
+        """
+        return self.qc_config.get(self.ERROR) == self.UNKNOWN and self.qc_config.get(self.WARNING) == self.UNKNOWN
+
     def error(self):
         """
         The value associated with a QC error
@@ -219,6 +341,23 @@ class QCHandler(Subscriber):
         """
         raise NotImplementedError("A handler needs to return the class of the parser it needs!")
 
+    def fallback_parsers(self):
+        """
+        Override this method in subclass to provide Parsers which the QCHandler can get its data from if the
+        data source of the Parser returned by `parser` is not available (i.e. if creating it raises
+        `DataSourceNotFound`). They will be tried in order, e.g.
+
+        .. code-block :: python
+
+            def fallback_parsers(self):
+                return [InteropParser]
+
+        The QCHandler must then be able to `collect` the data sent by these Parsers as well.
+
+        :returns: A list of Parser implementations
+        """
+        return []
+
     def check_qc(self):
         """
         The check_qc method provides the core behaviour of the QCHandler. It should check the values provided
@@ -229,22 +368,36 @@ class QCHandler(Subscriber):
         raise NotImplementedError("A handler must provide its own QC checking behaviour by implementing "
                                   "the `check_qc` method.")
 
+    def metrics(self):
+        """
+        Override this method in subclass to expose the values which the handler has collected, so that they
+        can e.g. be stored for later trend analysis. Each metric should be a dict on the following format:
+
+        .. code-block :: python
+
+            {"metric": "percent_q30", "lane": 1, "read": 1, "value": 93.4}
+
+        where `read` is None for metrics which are not specific to a read. Values should be given in the same
+        unit as the thresholds in the configuration.
+
+        :returns: An iterable of dicts describing the metrics collected by this QCHandler
+        """
+        return []
+
     def report(self):
         """
         Check the quality criteria as specified in `check_qc` and gather all reports. Will set the objects
-        `exit_status` in accordance with what types of reports are found.
+        `exit_status` in accordance with what types of reports are found. The reports are logged as configured
+        with `ReportLogging`.
 
         :returns: A sorted list of errors and warnings found when evaluating the qc criteria.
         """
         errors_and_warnings = self.check_qc()
         sorted_errors_and_warnings = sorted(errors_and_warnings, key=lambda x: x.ordering)
 
-        for element in sorted_errors_and_warnings:
-            if isinstance(element, QCErrorFatal):
-                self._exit_status = 1
-                log.error(element)
-            else:
-                log.warning(element)
+        if any(isinstance(element, QCErrorFatal) for element in sorted_errors_and_warnings):
+            self._exit_status = 1
+        ReportLogging.log_reports(type(self).__name__, sorted_errors_and_warnings)
 
         return sorted_errors_and_warnings
 
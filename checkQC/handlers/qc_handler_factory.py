@@ -1,29 +1,70 @@
 
 import importlib
+import logging
 import pkgutil
 
 import checkQC.handlers
 from checkQC.handlers.qc_handler import QCHandler
 from checkQC.exceptions import QCHandlerNotFound
 
+log = logging.getLogger(__name__)
+
 
 class QCHandlerFactory(object):
     """
     This class provides way of finding and instantiating a concrete QCHandler implementation.
     This allows QCHandlers to be instantiated dynamically at runtime e.g. based on what is
     specified in a config file.
+
+    QCHandlers are found through the `checkqc.handlers` entry point group, where the name of the entry point
+    should be the name of the QCHandler, e.g. in the `setup.py` of a plugin package:
+
+    .. code-block :: python
+
+        entry_points={
+            'checkqc.handlers': ['MyHandler = my_package.my_handler:MyHandler']
+        }
+
+    The index of entry points is only read once, and only the QCHandlers which are asked for are imported.
+    QCHandlers which are not registered as entry points are looked for in the `checkQC.handlers` package.
     """
 
-    @staticmethod
-    def create_subclass_instance(class_name, class_config):
+    ENTRY_POINT_GROUP = "checkqc.handlers"
+
+    _entry_points = None
+
+    @classmethod
+    def _entry_point_index(cls):
         """
-        This method will look for a class with the given `class_name` in the `checkQC.handlers` module.
-        If it can find a class with a matching name it will return a instance of that class.
+        Read the index of handler entry points, the first time this is called
 
-        :param class_name: the name of the class to instantiate
-        :param class_config: dictionary with configuration for the class
-        :returns: A instance of the class represented by class_name
+        :returns: a dict of handler names to entry points
         """
+        if cls._entry_points is None:
+            import pkg_resources
+            entry_points = {}
+            for entry_point in pkg_resources.iter_entry_points(cls.ENTRY_POINT_GROUP):
+                if entry_point.name in entry_points:
+                    log.warning("Found more than one QCHandler named {}, using the one from {}".format(
+                        entry_point.name, entry_points[entry_point.name].module_name))
+                    continue
+                entry_points[entry_point.name] = entry_point
+            cls._entry_points = entry_points
+        return cls._entry_points
+
+    @staticmethod
+    def _load_entry_point(class_name, entry_point):
+        try:
+            clazz = entry_point.load()
+        except Exception as e:
+            raise QCHandlerNotFound("Could not load the QCHandler {} from {}: {}".format(
+                class_name, entry_point.module_name, e))
+        if not (isinstance(clazz, type) and issubclass(clazz, QCHandler)):
+            raise QCHandlerNotFound("The entry point {} does not refer to a QCHandler".format(class_name))
+        return clazz
+
+    @staticmethod
+    def _find_in_handlers_package(class_name):
         package = checkQC.handlers
         prefix = package.__name__ + "."
 
@@ -33,7 +74,33 @@ class QCHandlerFactory(object):
         qc_handler_subclasses = list(QCHandler.__subclasses__())
         try:
             i = list(map(lambda clazz: clazz.__name__, qc_handler_subclasses)).index(class_name)
-            return qc_handler_subclasses[i](qc_config=class_config)
+            return qc_handler_subclasses[i]
         except ValueError:
             raise QCHandlerNotFound("Could not identify a QCHandler with name: {}".format(class_name))
 
+    @staticmethod
+    def get_subclass(class_name):
+        """
+        This method will look for a class with the given `class_name` among the `checkqc.handlers` entry points,
+        and if it is not found there, in the `checkQC.handlers` module.
+
+        :param class_name: the name of the class to find
+        :returns: The QCHandler subclass represented by class_name
+        :raises: QCHandlerNotFound if no QCHandler with a matching name could be found
+        """
+        entry_point = QCHandlerFactory._entry_point_index().get(class_name)
+        if entry_point is not None:
+            return QCHandlerFactory._load_entry_point(class_name, entry_point)
+        return QCHandlerFactory._find_in_handlers_package(class_name)
+
+    @staticmethod
+    def create_subclass_instance(class_name, class_config):
+        """
+        This method will look for a class with the given `class_name` (see `get_subclass`).
+        If it can find a class with a matching name it will return a instance of that class.
+
+        :param class_name: the name of the class to instantiate
+        :param class_config: dictionary with configuration for the class
+        :returns: A instance of the class represented by class_name
+        """
+        return QCHandlerFactory.get_subclass(class_name)(qc_config=class_config)
@@ -1,5 +1,6 @@
 from checkQC.handlers.qc_handler import QCHandler, QCErrorFatal, QCErrorWarning
 from checkQC.parsers.stats_json_parser import StatsJsonParser
+from checkQC.parsers.bcl_convert_parser import BclConvertParser
 from math import pow
 
 
@@ -22,6 +23,14 @@ class ReadsPerSampleHandler(QCHandler):
         """
         return StatsJsonParser
 
+    def fallback_parsers(self):
+        """
+        If bcl2fastq has not been run, the ReadsPerSampleHandler fetches its data from the bcl-convert reports
+
+        :returns: A list with a BclConvertParser callable
+        """
+        return [BclConvertParser]
+
     def collect(self, signal):
         key, value = signal
         if key == "ConversionResults":
@@ -0,0 +1,129 @@
+import numpy
+
+from checkQC.handlers.qc_handler import QCHandler, QCErrorFatal, QCErrorWarning
+from checkQC.parsers.stats_json_parser import StatsJsonParser
+from checkQC.parsers.bcl_convert_parser import BclConvertParser
+from checkQC.exceptions import ConfigurationError
+
+
+class SampleBalanceHandler(QCHandler):
+    """
+    This handler will check how evenly the reads of a lane are spread over the samples pooled on it. The value
+    specified in the configuration is the highest coefficient of variation (in percent) of the number of reads per
+    sample which is accepted on a lane. Lanes with fewer than two samples are not checked.
+
+    For each lane the Gini coefficient, the ratio between the smallest and largest number of reads of a sample, and
+    the fraction of samples with fewer reads than `below_median_percentage` percent (by default 20) of the median
+    number of reads are given as well, to help find out why a pool is poorly balanced.
+    """
+
+    BASELINE_METRIC = "sample_balance_cv"
+
+    BELOW_MEDIAN_PERCENTAGE = "below_median_percentage"
+    DEFAULT_BELOW_MEDIAN_PERCENTAGE = 20
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.conversion_results = None
+        self._lane_statistics = None
+
+    def parser(self):
+        """
+        The SampleBalanceHandler fetches its information from the Stats.json file
+
+        :returns: A StatsJsonParser callable
+        """
+        return StatsJsonParser
+
+    def fallback_parsers(self):
+        """
+        If bcl2fastq has not been run, the SampleBalanceHandler fetches its data from the bcl-convert reports
+
+        :returns: A list with a BclConvertParser callable
+        """
+        return [BclConvertParser]
+
+    def custom_configuration_validation(self):
+        value = self.qc_config.get(self.BELOW_MEDIAN_PERCENTAGE, self.DEFAULT_BELOW_MEDIAN_PERCENTAGE)
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not 0 < value <= 100:
+            raise ConfigurationError("'{}' in the SampleBalanceHandler config should be a number larger than 0 "
+                                     "and at most 100. Value was: {}".format(self.BELOW_MEDIAN_PERCENTAGE, value))
+
+    def collect(self, signal):
+        key, value = signal
+        if key == "ConversionResults":
+            self.conversion_results = value
+            self._lane_statistics = None
+
+    @staticmethod
+    def balance_statistics(reads, below_median_percentage=DEFAULT_BELOW_MEDIAN_PERCENTAGE):
+        """
+        Compute how evenly reads are spread over samples
+
+        :param reads: a numpy array of the number of reads of each sample
+        :param below_median_percentage: percentage of the median number of reads which samples are counted below
+        :returns: a dict with the coefficient of variation (in percent), the Gini coefficient, the ratio between the
+                  smallest and largest number of reads, and the fraction of samples below the percentage of the
+                  median, or None if there are no reads
+        """
+        total = reads.sum()
+        if len(reads) == 0 or total <= 0:
+            return None
+        nbr_of_samples = len(reads)
+        mean = total / nbr_of_samples
+        sorted_reads = numpy.sort(reads)
+        ranks = numpy.arange(1, nbr_of_samples + 1)
+        gini = 2.0 * numpy.dot(ranks, sorted_reads) / (nbr_of_samples * total) - \
+            (nbr_of_samples + 1.0) / nbr_of_samples
+        median = numpy.median(sorted_reads)
+        below_median = numpy.count_nonzero(sorted_reads < median * below_median_percentage / 100.0)
+        return {"coefficient_of_variation": float(sorted_reads.std() / mean * 100),
+                "gini": float(gini),
+                "min_max_ratio": float(sorted_reads[0] / sorted_reads[-1]),
+                "fraction_below_median_percentage": below_median / nbr_of_samples}
+
+    def lane_statistics(self):
+        """
+        The balance statistics (see `balance_statistics`) of each lane with at least two samples
+
+        :returns: a list of tuples of the lane number, the number of samples and the statistics of the lane
+        """
+        if self._lane_statistics is None:
+            below_median_percentage = self.qc_config.get(self.BELOW_MEDIAN_PERCENTAGE,
+                                                         self.DEFAULT_BELOW_MEDIAN_PERCENTAGE)
+            self._lane_statistics = []
+            for lane_dict in self.conversion_results or []:
+                lane_demux = lane_dict["DemuxResults"]
+                if len(lane_demux) < 2:
+                    continue
+                reads = numpy.fromiter((sample["NumberReads"] for sample in lane_demux),
+                                       dtype=numpy.float64, count=len(lane_demux))
+                statistics = self.balance_statistics(reads, below_median_percentage)
+                if statistics is not None:
+                    self._lane_statistics.append((int(lane_dict["LaneNumber"]), len(lane_demux), statistics))
+        return self._lane_statistics
+
+    def metrics(self):
+        for lane_nbr, _, statistics in self.lane_statistics():
+            yield {"metric": "sample_balance_cv", "lane": lane_nbr, "read": None,
+                   "value": statistics["coefficient_of_variation"]}
+            yield {"metric": "sample_balance_gini", "lane": lane_nbr, "read": None, "value": statistics["gini"]}
+
+    def check_qc(self):
+
+        for lane_nbr, nbr_of_samples, statistics in self.lane_statistics():
+            coefficient_of_variation = statistics["coefficient_of_variation"]
+            data = dict(statistics, lane=lane_nbr, number_of_samples=nbr_of_samples)
+
+            if self.error() != self.UNKNOWN and coefficient_of_variation > float(self.error()):
+                yield QCErrorFatal("The samples on lane {} were poorly balanced, the coefficient of variation of "
+                                   "the reads per sample was: {:.2f}%".format(lane_nbr, coefficient_of_variation),
+                                   ordering=lane_nbr,
+                                   data=dict(data, threshold=self.error()))
+            elif self.warning() != self.UNKNOWN and coefficient_of_variation > float(self.warning()):
+                yield QCErrorWarning("The samples on lane {} were poorly balanced, the coefficient of variation of "
+                                     "the reads per sample was: {:.2f}%".format(lane_nbr, coefficient_of_variation),
+                                     ordering=lane_nbr,
+                                     data=dict(data, threshold=self.warning()))
+            else:
+                continue
@@ -1,6 +1,7 @@
 
 from checkQC.handlers.qc_handler import QCHandler, QCErrorFatal, QCErrorWarning
 from checkQC.parsers.stats_json_parser import StatsJsonParser
+from checkQC.parsers.bcl_convert_parser import BclConvertParser
 
 
 class UndeterminedPercentageHandler(QCHandler):
@@ -9,6 +10,8 @@ class UndeterminedPercentageHandler(QCHandler):
     If there are no indexes specified for the lane, this will be skipped.
     """
 
+    BASELINE_METRIC = "percentage_undetermined"
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.conversion_results = None
@@ -21,11 +24,25 @@ class UndeterminedPercentageHandler(QCHandler):
         """
         return StatsJsonParser
 
+    def fallback_parsers(self):
+        """
+        If bcl2fastq has not been run, the UndeterminedPercentageHandler fetches its data from the bcl-convert reports
+
+        :returns: A list with a BclConvertParser callable
+        """
+        return [BclConvertParser]
+
     def collect(self, signal):
         key, value = signal
         if key == "ConversionResults":
             self.conversion_results = value
 
+    def metrics(self):
+        for lane_dict in self.conversion_results or []:
+            if lane_dict.get("Undetermined") and lane_dict["Yield"] > 0:
+                yield {"metric": "percentage_undetermined", "lane": int(lane_dict["LaneNumber"]), "read": None,
+                       "value": (lane_dict["Undetermined"]["Yield"] / lane_dict["Yield"])*100}
+
     def check_qc(self):
 
         for lane_dict in self.conversion_results:
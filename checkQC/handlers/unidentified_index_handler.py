@@ -0,0 +1,182 @@
+from collections import defaultdict
+
+from checkQC.handlers.qc_handler import QCHandler, QCErrorFatal, QCErrorWarning
+from checkQC.parsers.stats_json_parser import StatsJsonParser
+from checkQC.parsers.bcl_convert_parser import BclConvertParser
+
+
+class ExpectedIndexLookup(object):
+    """
+    ExpectedIndexLookup precomputes the barcodes which would be seen if one of the expected indexes of a run
+    had been e.g. reverse complemented, swapped or read with a single mismatch. Each such barcode is kept in a
+    hash table, so that any unknown barcode can be checked against all expected indexes with a single lookup,
+    instead of comparing every unknown barcode to every expected index.
+    """
+
+    COMPLEMENT = str.maketrans("ACGTN", "TGCAN")
+    BASES = "ACGTN"
+
+    EXACT = "exact"
+    ONE_MISMATCH = "one mismatch"
+    REVERSE_COMPLEMENT = "reverse complement"
+    REVERSE_COMPLEMENT_INDEX1 = "reverse complement of index 1"
+    REVERSE_COMPLEMENT_INDEX2 = "reverse complement of index 2"
+    SWAPPED = "swapped indexes"
+
+    def __init__(self):
+        self._lookup = defaultdict(list)
+
+    @staticmethod
+    def reverse_complement(sequence):
+        """
+        Reverse complement a sequence
+
+        :param sequence: the sequence to reverse complement, e.g. 'AACG'
+        :returns: the reverse complement of the sequence, e.g. 'CGTT'
+        """
+        return sequence.translate(ExpectedIndexLookup.COMPLEMENT)[::-1]
+
+    @staticmethod
+    def _one_mismatch_neighbours(sequence):
+        for i, base in enumerate(sequence):
+            if base == "+":
+                continue
+            for other_base in ExpectedIndexLookup.BASES:
+                if other_base != base:
+                    yield sequence[:i] + other_base + sequence[i + 1:]
+
+    def _variants(self, index):
+        yield self.EXACT, index
+        for neighbour in self._one_mismatch_neighbours(index):
+            yield self.ONE_MISMATCH, neighbour
+
+        if "+" in index:
+            index1, index2 = index.split("+", 1)
+            yield self.REVERSE_COMPLEMENT_INDEX1, "+".join([self.reverse_complement(index1), index2])
+            yield self.REVERSE_COMPLEMENT_INDEX2, "+".join([index1, self.reverse_complement(index2)])
+            yield self.REVERSE_COMPLEMENT, "+".join([self.reverse_complement(index1),
+                                                     self.reverse_complement(index2)])
+            yield self.SWAPPED, "+".join([index2, index1])
+        else:
+            yield self.REVERSE_COMPLEMENT, self.reverse_complement(index)
+
+    def add(self, lane, sample_id, index):
+        """
+        Add an expected index, and all its variants, to the lookup
+
+        :param lane: the lane on which the index was expected
+        :param sample_id: the sample which the index belongs to
+        :param index: the index sequence, dual indexes are given as '<index 1>+<index 2>'
+        :returns: None
+        """
+        seen = set()
+        for kind, variant in self._variants(index):
+            # A variant which e.g. is both the exact index and its reverse complement
+            # (a palindrome) is only recorded for the first kind it was generated as.
+            if variant in seen:
+                continue
+            seen.add(variant)
+            self._lookup[variant].append({"kind": kind, "lane": lane, "sample_id": sample_id, "index": index})
+
+    def find(self, barcode):
+        """
+        Find the expected indexes which the barcode is a variant of
+
+        :param barcode: the barcode to look up
+        :returns: a list of dicts with the keys `kind`, `lane`, `sample_id` and `index`
+        """
+        return self._lookup.get(barcode, [])
+
+
+class UnidentifiedIndexHandler(QCHandler):
+    """
+    This handler looks at the most common barcodes which could not be assigned to any sample on a lane (the
+    'UnknownBarcodes' of the Stats.json file), and checks if they are closely related to an index that was expected
+    on the same, or another, lane. That would e.g. indicate that an index has been reverse complemented, that index 1
+    and 2 have been swapped or that a sample has been placed on the wrong lane in the samplesheet.
+
+    The error and warning thresholds are given as the percentage of the clusters passing filter on the lane that
+    an unknown barcode must account for to be reported.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.conversion_results = None
+        self.unknown_barcodes = None
+
+    def parser(self):
+        """
+        The UnidentifiedIndexHandler fetches its data from the Stats.json file
+
+        :returns: A StatsJsonParser callable
+        """
+        return StatsJsonParser
+
+    def fallback_parsers(self):
+        """
+        If bcl2fastq has not been run, the UnidentifiedIndexHandler fetches its data from the bcl-convert reports
+
+        :returns: A list with a BclConvertParser callable
+        """
+        return [BclConvertParser]
+
+    def collect(self, signal):
+        key, value = signal
+        if key == "ConversionResults":
+            self.conversion_results = value
+        if key == "UnknownBarcodes":
+            self.unknown_barcodes = value
+
+    def _expected_index_lookup(self):
+        expected_index_lookup = ExpectedIndexLookup()
+        for lane_dict in self.conversion_results:
+            lane_nbr = int(lane_dict["LaneNumber"])
+            for sample_dict in lane_dict["DemuxResults"]:
+                for index_metric in sample_dict.get("IndexMetrics", []):
+                    expected_index_lookup.add(lane_nbr, sample_dict["SampleId"], index_metric["IndexSequence"])
+        return expected_index_lookup
+
+    def _lowest_threshold(self):
+        thresholds = [float(threshold) for threshold in (self.error(), self.warning()) if threshold != self.UNKNOWN]
+        return min(thresholds) if thresholds else None
+
+    def check_qc(self):
+        lowest_threshold = self._lowest_threshold()
+        if lowest_threshold is None or not self.unknown_barcodes:
+            return
+
+        expected_index_lookup = self._expected_index_lookup()
+        clusters_pf_per_lane = {int(lane_dict["LaneNumber"]): lane_dict["TotalClustersPF"]
+                                for lane_dict in self.conversion_results}
+
+        for lane_barcodes in self.unknown_barcodes:
+            lane_nbr = int(lane_barcodes["Lane"])
+            clusters_pf = clusters_pf_per_lane.get(lane_nbr)
+            if not clusters_pf:
+                continue
+
+            for barcode, count in lane_barcodes["Barcodes"].items():
+                percentage_of_lane = (count / clusters_pf) * 100
+                if percentage_of_lane <= lowest_threshold:
+                    continue
+
+                for match in expected_index_lookup.find(barcode):
+                    if match["kind"] == ExpectedIndexLookup.EXACT and match["lane"] == lane_nbr:
+                        continue
+                    message = ("Unknown barcode {} on lane {} ({:.2f}% of clusters) matches the {} of index {} "
+                               "for sample {} on lane {}".format(barcode, lane_nbr, percentage_of_lane,
+                                                                 match["kind"], match["index"],
+                                                                 match["sample_id"], match["lane"]))
+                    data = {"lane": lane_nbr, "barcode": barcode, "count": count,
+                            "percentage_of_lane": percentage_of_lane, "kind": match["kind"],
+                            "expected_index": match["index"], "sample_id": match["sample_id"],
+                            "sample_lane": match["lane"]}
+                    if match["kind"] == ExpectedIndexLookup.EXACT:
+                        message = ("Unknown barcode {} on lane {} ({:.2f}% of clusters) is the index of sample {} "
+                                   "on lane {}".format(barcode, lane_nbr, percentage_of_lane,
+                                                       match["sample_id"], match["lane"]))
+
+                    if self.error() != self.UNKNOWN and percentage_of_lane > float(self.error()):
+                        yield QCErrorFatal(message, ordering=lane_nbr, data=dict(data, threshold=self.error()))
+                    elif self.warning() != self.UNKNOWN and percentage_of_lane > float(self.warning()):
+                        yield QCErrorWarning(message, ordering=lane_nbr, data=dict(data, threshold=self.warning()))
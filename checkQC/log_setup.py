@@ -0,0 +1,101 @@
+import atexit
+import json
+import logging
+import queue
+import sys
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+# The attributes which all log records have, anything else on a record has been given with `extra`
+_RECORD_ATTRIBUTES = set(logging.LogRecord("", logging.INFO, "", 0, "", None, None).__dict__) | {"message",
+                                                                                                "asctime"}
+
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    The JsonFormatter formats each log record as a line of json, with the time, level, logger and message of the
+    record, and any fields given with `extra` (e.g. the handler, type and data of QC reports). E.g.:
+
+        {"time": "2017-07-26T14:01:02.391", "level": "WARNING", "logger": "root",
+         "message": "QC warning: ...", "qc_handler": "ClusterPFHandler", "qc_report_type": "warning", ...}
+    """
+
+    def format(self, record):
+        created = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(record.created))
+        entry = {"time": "{}.{:03d}".format(created, int(record.msecs)),
+                 "level": record.levelname,
+                 "logger": record.name,
+                 "message": record.getMessage()}
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def queue_handlers(logger=None):
+    """
+    Move the handlers of a logger behind a queue, so that logging only puts the records on the queue, and the
+    (possibly slow) handlers are run in a background thread. The queue is flushed when the program exits, or
+    when `stop_queue` is called.
+
+    :param logger: the logger whose handlers to move, if None the root logger
+    :returns: the QueueListener passing the records on to the handlers
+    """
+    global _listener
+    logger = logger if logger is not None else logging.getLogger()
+    handlers = [handler for handler in logger.handlers if not isinstance(handler, QueueHandler)]
+    records = queue.Queue(-1)
+    listener = QueueListener(records, *handlers, respect_handler_level=True)
+    for handler in logger.handlers[:]:
+        logger.removeHandler(handler)
+    logger.addHandler(QueueHandler(records))
+    stop_queue()
+    listener.start()
+    _listener = listener
+    return listener
+
+
+@atexit.register
+def stop_queue():
+    """
+    Write all records which are still on the queue set up by `queue_handlers`, and stop its background thread
+
+    :returns: None
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def configure_logging(level=logging.DEBUG, json_format=False, stream=None, use_queue=True):
+    """
+    Configure the root logger for the checkQC command line applications: records are written to `stream`,
+    as text or as json (see `JsonFormatter`), from a background thread (see `queue_handlers`).
+
+    The queue should not be used by applications which fork worker processes that log, since the background
+    thread is not running in the workers.
+
+    This should only be called by applications, so that checkQC does not reconfigure logging when it is
+    used as a library.
+
+    :param level: the level to log at
+    :param json_format: if True the records are written as json, else as text
+    :param stream: the stream to write to, if None stderr
+    :param use_queue: if True the records are written from a background thread
+    :returns: the QueueListener writing the records, or None if the queue is not used
+    """
+    handler = logging.StreamHandler(stream if stream is not None else sys.stderr)
+    handler.setFormatter(JsonFormatter() if json_format else logging.Formatter('%(levelname)-8s %(message)s'))
+    root_logger = logging.getLogger()
+    for existing_handler in root_logger.handlers[:]:
+        root_logger.removeHandler(existing_handler)
+    root_logger.addHandler(handler)
+    root_logger.setLevel(level)
+    if not use_queue:
+        return None
+    return queue_handlers(root_logger)
@@ -0,0 +1,194 @@
+import csv
+import logging
+import os
+from collections import OrderedDict
+
+from checkQC.parsers.parser import Parser
+from checkQC.exceptions import DemultiplexStatsNotFound, MalformedDataSource
+
+log = logging.getLogger(__name__)
+
+
+class BclConvertParser(Parser):
+    """
+    The BclConvertParser reads the reports written by bcl-convert (or DRAGEN), i.e. the `Demultiplex_Stats.csv`,
+    `Top_Unknown_Barcodes.csv` and `Quality_Metrics.csv` files in the `Reports` directory, and sends them to its
+    subscribers in the same format as the StatsJsonParser, so that handlers working on bcl2fastq output can be
+    used unchanged:
+
+        ('ConversionResults', [{'LaneNumber': 1, 'TotalClustersPF': ..., 'Yield': ..., 'DemuxResults': [...],
+                                'Undetermined': {...}}, ...])
+        ('UnknownBarcodes', [{'Lane': 1, 'Barcodes': {'ACGTACGT+TTTTCCCC': 1234, ...}}, ...])
+
+    Since bcl-convert does not report the clusters passing filter per lane, `TotalClustersPF` is the total number
+    of reads on the lane (including undetermined reads). If there is no `Quality_Metrics.csv` file, `Yield` is
+    given in number of reads rather than number of bases.
+
+    The csv files can be very large for large pools, so they are read a row at a time, and the values of each row
+    are added to the totals of its lane (and sample) as it is read, rather than keeping the columns of the files in
+    memory. If the parser has been restricted to some lanes, rows of other lanes are skipped as they are read.
+    """
+
+    DEFAULT_BCLCONVERT_OUTPUT_PATH = "Data/Intensities/BaseCalls"
+    CHUNK_SIZE = 10000
+    UNDETERMINED = "Undetermined"
+
+    def __init__(self, runfolder, parser_configurations, *args, **kwargs):
+        """
+        Create a BclConvertParser instance for the specified runfolder
+
+        :param runfolder: path to the runfolder to parse
+        :param parser_configurations: dict containing any extra configuration required by
+        the parser under class name key
+        """
+        super().__init__(*args, **kwargs)
+
+        parser_conf = (parser_configurations or {}).get(self.__class__.__name__) or {}
+        bclconvert_output_path = parser_conf.get("bclconvert_output_path", self.DEFAULT_BCLCONVERT_OUTPUT_PATH)
+
+        self.reports_path = os.path.join(runfolder, bclconvert_output_path, "Reports")
+        self.demultiplex_stats_path = os.path.join(self.reports_path, "Demultiplex_Stats.csv")
+        self.top_unknown_barcodes_path = os.path.join(self.reports_path, "Top_Unknown_Barcodes.csv")
+        self.quality_metrics_path = os.path.join(self.reports_path, "Quality_Metrics.csv")
+
+        if not os.path.exists(self.demultiplex_stats_path):
+            raise DemultiplexStatsNotFound("Could not find a Demultiplex_Stats.csv file at: {}. If bcl-convert has "
+                                           "been run, you can specify where its output is located by setting "
+                                           "'bclconvert_output_path' in the 'BclConvertParser' part of the "
+                                           "checkqc configuration file.".format(self.demultiplex_stats_path))
+
+    @staticmethod
+    def _read_rows(file_path, columns, optional_columns=(), deadline=None):
+        """
+        Read the specified columns of a csv file, a row at a time.
+
+        :param file_path: path to the csv file
+        :param columns: a dict of column names to their types, either `int`, `float` or `str`
+        :param optional_columns: names of columns which are not required to be in the file
+        :param deadline: a Deadline which will be checked every `CHUNK_SIZE` rows, or None
+        :returns: a generator of tuples of the values of the columns of each row, in the order of `columns`.
+                  Optional columns which are not in the file are given as None.
+        :raises: MalformedDataSource if the file is empty, a required column is missing, or a numeric column
+                 holds a value which is not a number
+        """
+        with open(file_path, newline="") as f:
+            reader = csv.reader(f)
+            try:
+                header = [name.strip() for name in next(reader)]
+            except StopIteration:
+                raise MalformedDataSource("{} is empty".format(file_path))
+
+            converters = []
+            for name, column_type in columns.items():
+                if name in header:
+                    converters.append((header.index(name), column_type))
+                elif name in optional_columns:
+                    converters.append((None, None))
+                else:
+                    raise MalformedDataSource("Could not find column '{}' in {}".format(name, file_path))
+
+            for row_number, row in enumerate(reader, 1):
+                if deadline is not None and row_number % BclConvertParser.CHUNK_SIZE == 0:
+                    deadline.check()
+                try:
+                    yield tuple(None if i is None else column_type(row[i]) for i, column_type in converters)
+                except (ValueError, IndexError) as e:
+                    raise MalformedDataSource("Could not read row {} of {}: {}".format(row_number, file_path, e))
+
+    def _quality_metrics(self):
+        if not os.path.exists(self.quality_metrics_path):
+            log.info("Could not find {}, yields will be given as number of reads".format(self.quality_metrics_path))
+            return None
+
+        rows = self._read_rows(self.quality_metrics_path,
+                               OrderedDict([("Lane", int), ("SampleID", str), ("ReadNumber", str),
+                                            ("Yield", int), ("YieldQ30", int), ("QualityScoreSum", int)]),
+                               optional_columns=("QualityScoreSum",),
+                               deadline=self.deadline)
+        read_metrics = {}
+        for lane, sample_id, read_number, read_yield, yield_q30, quality_score_sum in rows:
+            # Index reads are reported as e.g. 'I1' in later versions of bcl-convert
+            if not read_number.isdigit() or not self._lane_selected(lane):
+                continue
+            sample_yield, sample_read_metrics = read_metrics.get((lane, sample_id), (0, []))
+            sample_read_metrics.append({"ReadNumber": int(read_number),
+                                        "Yield": read_yield,
+                                        "YieldQ30": yield_q30,
+                                        "QualityScoreSum": quality_score_sum or 0,
+                                        "TrimmedBases": 0})
+            read_metrics[(lane, sample_id)] = (sample_yield + read_yield, sample_read_metrics)
+        return read_metrics
+
+    def _conversion_results(self):
+        read_metrics = self._quality_metrics()
+        rows = self._read_rows(self.demultiplex_stats_path,
+                               OrderedDict([("Lane", int), ("SampleID", str), ("Index", str),
+                                            ("# Reads", int), ("# Perfect Index Reads", int),
+                                            ("# One Mismatch Index Reads", int)]),
+                               optional_columns=("# Perfect Index Reads", "# One Mismatch Index Reads"),
+                               deadline=self.deadline)
+
+        lanes = OrderedDict()
+        for lane, sample_id, index, number_of_reads, perfect_reads, one_mismatch_reads in rows:
+            if not self._lane_selected(lane):
+                continue
+            lane_dict = lanes.get(lane)
+            if lane_dict is None:
+                lane_dict = {"LaneNumber": lane, "TotalClustersPF": 0, "Yield": 0, "DemuxResults": []}
+                lanes[lane] = lane_dict
+
+            if read_metrics is not None:
+                sample_yield, sample_read_metrics = read_metrics.pop((lane, sample_id), (0, []))
+            else:
+                sample_yield, sample_read_metrics = number_of_reads, []
+            lane_dict["TotalClustersPF"] += number_of_reads
+            lane_dict["Yield"] += sample_yield
+
+            if sample_id == self.UNDETERMINED:
+                lane_dict["Undetermined"] = {"NumberReads": number_of_reads,
+                                             "Yield": sample_yield,
+                                             "ReadMetrics": sample_read_metrics}
+                continue
+
+            sample_dict = {"SampleId": sample_id,
+                           "SampleName": sample_id,
+                           "NumberReads": number_of_reads,
+                           "Yield": sample_yield,
+                           "ReadMetrics": sample_read_metrics}
+            if index:
+                sample_dict["IndexMetrics"] = [{"IndexSequence": index.replace("-", "+"),
+                                                "MismatchCounts": {"0": perfect_reads or 0,
+                                                                   "1": one_mismatch_reads or 0}}]
+            lane_dict["DemuxResults"].append(sample_dict)
+        return list(lanes.values())
+
+    def _unknown_barcodes(self):
+        if not os.path.exists(self.top_unknown_barcodes_path):
+            return []
+        rows = self._read_rows(self.top_unknown_barcodes_path,
+                               OrderedDict([("Lane", int), ("index", str), ("index2", str), ("# Reads", int)]),
+                               optional_columns=("index2",),
+                               deadline=self.deadline)
+        lanes = OrderedDict()
+        for lane, index, index2, number_of_reads in rows:
+            if not self._lane_selected(lane):
+                continue
+            barcode = "+".join([index, index2]) if index2 else index
+            lanes.setdefault(lane, []).append((barcode, number_of_reads))
+
+        return [{"Lane": lane,
+                 "Barcodes": OrderedDict(sorted(barcodes, key=lambda barcode: barcode[1], reverse=True))}
+                for lane, barcodes in lanes.items()]
+
+    def run(self):
+        self._send_to_subscribers(("ConversionResults", self._conversion_results()))
+        self._send_to_subscribers(("UnknownBarcodes", self._unknown_barcodes()))
+
+    def __eq__(self, other):
+        if isinstance(other, self.__class__) and self.demultiplex_stats_path == other.demultiplex_stats_path:
+            return True
+        else:
+            return False
+
+    def __hash__(self):
+        return hash(self.__class__.__name__ + self.demultiplex_stats_path)
@@ -0,0 +1,183 @@
+import json
+import logging
+import threading
+from collections import Counter
+
+import numpy
+from interop import py_interop_run_metrics, py_interop_run
+
+log = logging.getLogger(__name__)
+
+
+def _load_interop_run_metrics_from_archive(archive, valid_to_load):
+    run_info_and_parameters = [name for name in ("RunInfo.xml", "RunParameters.xml", "runParameters.xml")
+                               if archive.members(name)]
+    interop_files = {}
+    for metric_group in range(py_interop_run.MetricCount):
+        if not valid_to_load[metric_group]:
+            continue
+        group_name = py_interop_run.to_string_metric_group(metric_group)
+        for file_name in ("{}MetricsOut.bin".format(group_name), "{}Metrics.bin".format(group_name)):
+            if archive.members("InterOp/" + file_name):
+                interop_files["InterOp/" + file_name] = metric_group
+                break
+
+    contents = archive.read(run_info_and_parameters + list(interop_files.keys()))
+    run_metrics = py_interop_run_metrics.run_metrics()
+    for name in run_info_and_parameters:
+        if name == "RunInfo.xml":
+            run_metrics.run_info().parse(contents[name].decode())
+        else:
+            run_metrics.run_parameters().parse(contents[name].decode())
+    for name, metric_group in interop_files.items():
+        run_metrics.read_metrics_from_buffer(metric_group, numpy.frombuffer(contents[name], dtype=numpy.uint8))
+    run_metrics.finalize_after_load()
+    return run_metrics
+
+
+def load_interop_run_metrics(runfolder, runfolder_archive=None):
+    """
+    Load the Interop run metrics which are needed to summarize a run. If the runfolder has been created from an
+    archive (see `ArchivedRunfolder`) the Interop files are read directly from the archive into memory.
+
+    :param runfolder: path to the runfolder to load the Interop files from
+    :param runfolder_archive: the RunfolderArchive the runfolder has been created from, or None
+    :returns: a Interop run_metrics object
+    """
+    valid_to_load = py_interop_run.uchar_vector(py_interop_run.MetricCount, 0)
+    py_interop_run_metrics.list_summary_metrics_to_load(valid_to_load)
+
+    if runfolder_archive is not None:
+        return _load_interop_run_metrics_from_archive(runfolder_archive, valid_to_load)
+
+    run_metrics = py_interop_run_metrics.run_metrics()
+    run_metrics.run_info()
+    run_metrics.read(runfolder, valid_to_load)
+    return run_metrics
+
+
+def load_json(file_path):
+    """
+    Load a json file, e.g. the Stats.json file created by bcl2fastq
+
+    :param file_path: path to the json file
+    :returns: the parsed json data
+    """
+    with open(file_path, "r") as f:
+        return json.load(f)
+
+
+def load_json_dropping(file_path, drop):
+    """
+    Load a json file, dropping the objects for which `drop` returns True while the file is decoded. Each object
+    is dropped as soon as it has been decoded, so the dropped objects are never all held in memory at once,
+    although the file is still read and decoded in full. Dropped objects are removed from the lists they are in.
+
+    :param file_path: path to the json file
+    :param drop: a callable taking a decoded json object (a dict), and returning True if it should be dropped
+    :returns: the parsed json data, without the dropped objects
+    """
+    dropped = object()
+
+    def drop_object(json_object):
+        if drop(json_object):
+            return dropped
+        for key, value in json_object.items():
+            if isinstance(value, list) and any(item is dropped for item in value):
+                json_object[key] = [item for item in value if item is not dropped]
+        return json_object
+
+    with open(file_path, "r") as f:
+        return json.load(f, object_hook=drop_object)
+
+
+class DataSourceRegistry(object):
+    """
+    The DataSourceRegistry makes sure that each data source of a runfolder (e.g. the Interop run metrics or the
+    parsed Stats.json file) is only loaded once per run, even if several Parsers read from it, and that it is
+    released as soon as the last Parser reading from it has finished.
+
+    Data sources are identified by a key, which should uniquely identify the underlying data, e.g.
+    `("Stats.json", <path to Stats.json>)`. Each Parser which needs a data source registers itself as a consumer
+    of it, and releases it once it has been run. The data is loaded the first time it is requested, and then
+    shared between all consumers, which means that consumers must not modify it.
+
+    Each data source is loaded under a lock of its own, so that loading one data source does not keep
+    consumers of other data sources waiting.
+    """
+
+    def __init__(self):
+        self._loaders = {}
+        self._consumers = Counter()
+        self._loaded = {}
+        self._load_locks = {}
+        self._lock = threading.Lock()
+
+    def register(self, key, loader):
+        """
+        Register a consumer of a data source
+
+        :param key: key identifying the data source
+        :param loader: a callable, taking no arguments, which loads the data source
+        :returns: None
+        """
+        with self._lock:
+            self._loaders.setdefault(key, loader)
+            self._load_locks.setdefault(key, threading.Lock())
+            self._consumers[key] += 1
+
+    def get(self, key):
+        """
+        Get the data of a data source, loading it if it has not been loaded already
+
+        :param key: key identifying the data source
+        :returns: the data of the data source
+        :raises: KeyError if there is no registered consumer of the data source
+        """
+        with self._lock:
+            if self._consumers[key] < 1:
+                raise KeyError("There is no registered consumer of data source: {}".format(key))
+            if key in self._loaded:
+                return self._loaded[key]
+            load_lock = self._load_locks[key]
+            loader = self._loaders[key]
+
+        with load_lock:
+            with self._lock:
+                # Another consumer may have loaded the data source while this one was waiting
+                if key in self._loaded:
+                    return self._loaded[key]
+            log.debug("Loading data source: {}".format(key))
+            data = loader()
+            with self._lock:
+                # The data is only kept if the data source has not been released while it was loaded
+                if self._consumers[key] > 0:
+                    self._loaded[key] = data
+            return data
+
+    def release(self, key):
+        """
+        Release a data source for one consumer. Once all consumers have released the data source, it is dropped.
+
+        :param key: key identifying the data source
+        :returns: None
+        """
+        with self._lock:
+            if self._consumers[key] < 1:
+                return
+            self._consumers[key] -= 1
+            if self._consumers[key] == 0:
+                log.debug("Releasing data source: {}".format(key))
+                self._loaded.pop(key, None)
+                self._loaders.pop(key, None)
+                self._load_locks.pop(key, None)
+                del self._consumers[key]
+
+    def is_loaded(self, key):
+        """
+        Check if a data source is currently loaded
+
+        :param key: key identifying the data source
+        :returns: True if the data source is loaded, else False
+        """
+        return key in self._loaded
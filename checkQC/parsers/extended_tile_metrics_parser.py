@@ -0,0 +1,148 @@
+import logging
+import os
+
+import numpy
+
+from checkQC.parsers.parser import Parser
+from checkQC.parsers.data_sources import load_interop_run_metrics
+from checkQC.exceptions import InteropNotFound
+
+log = logging.getLogger(__name__)
+
+
+class ExtendedTileMetricsParser(Parser):
+    """
+    The ExtendedTileMetricsParser reads the occupancy of each tile (the percentage of the wells of a patterned
+    flowcell which are occupied by a cluster) from the Interop ExtendedTileMetricsOut.bin file, and the percentage
+    of clusters passing filter of each tile from the TileMetricsOut.bin file, and sends the mean of each per lane:
+
+        - ("occupancy", {"lane": <lane nbr>, "tiles": <number of tiles>, "percent_occupied": <% occupied>,
+                         "percent_pf": <% passing filter>, "percent_occupied_not_pf": <% occupied - % pf>})
+
+    Only instruments with patterned flowcells (e.g. NovaSeq) write extended tile metrics. For other runs nothing
+    is sent.
+
+    The Interop files are read by the same data source as the InteropParser, so they are only read once even if
+    both are used.
+    """
+
+    # Key of a tile, made from its lane and tile number, which is unique within a run
+    LANE_SHIFT = 100000
+
+    def __init__(self, runfolder, parser_configurations, *args, **kwargs):
+        """
+        Create a ExtendedTileMetricsParser instance for the specified runfolder
+
+        :param runfolder: to create ExtendedTileMetricsParser instance for
+        :param parser_configurations: dict containing any extra configuration required by
+        the parser under class name key
+        """
+        super().__init__(*args, **kwargs)
+        self.runfolder = runfolder
+        if not os.path.isdir(os.path.join(self.runfolder, "InterOp")):
+            raise InteropNotFound("Could not find an InterOp directory in: {}".format(self.runfolder))
+
+    def data_sources(self):
+        return {("InterOp", self.runfolder): lambda: load_interop_run_metrics(self.runfolder,
+                                                                              self.runfolder_archive)}
+
+    @classmethod
+    def tile_arrays(cls, run_metrics):
+        """
+        Gather the occupancy and percentage passing filter of each tile into arrays
+
+        :param run_metrics: a Interop run_metrics object
+        :returns: a tuple of arrays of the lane number, the percentage occupied and the percentage passing filter
+                  of each tile which has both tile and extended tile metrics
+        """
+        # The values are copied a tile at a time, since Interop has no helper which copies tile or extended tile
+        # metrics into numpy arrays (`copy_focus` only handles extraction metrics), and its imaging table, which
+        # `interop.imaging` builds, is empty unless metrics per cycle are loaded. There is one metric per tile, so
+        # this is a few thousand iterations at most, and everything after it is done on the arrays.
+        extended_tile_metrics = run_metrics.extended_tile_metric_set()
+        tile_metrics = run_metrics.tile_metric_set()
+        nbr_of_extended = extended_tile_metrics.size()
+        nbr_of_tiles = tile_metrics.size()
+
+        extended_keys = numpy.empty(nbr_of_extended, dtype=numpy.int64)
+        occupied_counts = numpy.empty(nbr_of_extended)
+        percent_occupied = numpy.empty(nbr_of_extended)
+        for i in range(nbr_of_extended):
+            metric = extended_tile_metrics.at(i)
+            extended_keys[i] = metric.lane() * cls.LANE_SHIFT + metric.tile()
+            occupied_counts[i] = metric.cluster_count_occupied()
+            percent_occupied[i] = metric.percent_occupied()
+
+        tile_keys = numpy.empty(nbr_of_tiles, dtype=numpy.int64)
+        cluster_counts = numpy.empty(nbr_of_tiles)
+        percent_pf = numpy.empty(nbr_of_tiles)
+        for i in range(nbr_of_tiles):
+            metric = tile_metrics.at(i)
+            tile_keys[i] = metric.lane() * cls.LANE_SHIFT + metric.tile()
+            cluster_counts[i] = metric.cluster_count()
+            percent_pf[i] = metric.percent_pf()
+
+        if nbr_of_extended == 0 or nbr_of_tiles == 0:
+            return numpy.empty(0, dtype=numpy.int64), numpy.empty(0), numpy.empty(0)
+
+        # Match each extended tile metric with the tile metric of the same tile
+        order = numpy.argsort(tile_keys)
+        positions = numpy.clip(numpy.searchsorted(tile_keys, extended_keys, sorter=order), 0, nbr_of_tiles - 1)
+        tile_indexes = order[positions]
+        matched = tile_keys[tile_indexes] == extended_keys
+
+        extended_keys = extended_keys[matched]
+        tile_indexes = tile_indexes[matched]
+        # Older versions of the file only have the number of occupied wells, in which case the percentage is
+        # computed from the number of wells (the raw cluster count) of the tile
+        with numpy.errstate(divide="ignore", invalid="ignore"):
+            computed_percent_occupied = occupied_counts[matched] / cluster_counts[tile_indexes] * 100
+        percent_occupied = numpy.where(numpy.isfinite(percent_occupied[matched]), percent_occupied[matched],
+                                       computed_percent_occupied)
+
+        valid = numpy.isfinite(percent_occupied) & numpy.isfinite(percent_pf[tile_indexes])
+        return (extended_keys[valid] // cls.LANE_SHIFT,
+                percent_occupied[valid],
+                percent_pf[tile_indexes][valid])
+
+    @staticmethod
+    def lane_means(lanes, *values):
+        """
+        Compute the mean of a number of values per lane
+
+        :param lanes: an array of the lane of each tile
+        :param values: arrays with a value for each tile
+        :returns: a tuple of the lane numbers, the number of tiles of each lane, and the mean of each of the values
+                  per lane
+        """
+        lane_numbers, lane_indexes, tile_counts = numpy.unique(lanes, return_inverse=True, return_counts=True)
+        means = [numpy.bincount(lane_indexes, weights=value, minlength=len(lane_numbers)) / tile_counts
+                 for value in values]
+        return (lane_numbers, tile_counts) + tuple(means)
+
+    def run(self):
+        run_metrics = self._get_data_source(("InterOp", self.runfolder))
+        lanes, percent_occupied, percent_pf = self.tile_arrays(run_metrics)
+        if len(lanes) == 0:
+            log.debug("No extended tile metrics found in: {}".format(self.runfolder))
+            return
+
+        lane_numbers, tile_counts, mean_occupied, mean_pf, mean_occupied_not_pf = \
+            self.lane_means(lanes, percent_occupied, percent_pf, percent_occupied - percent_pf)
+        for i, lane in enumerate(lane_numbers):
+            if not self._lane_selected(int(lane)):
+                continue
+            self._send_to_subscribers(("occupancy", {"lane": int(lane),
+                                                     "tiles": int(tile_counts[i]),
+                                                     "percent_occupied": float(mean_occupied[i]),
+                                                     "percent_pf": float(mean_pf[i]),
+                                                     "percent_occupied_not_pf": float(mean_occupied_not_pf[i])}))
+
+    def __eq__(self, other):
+        if isinstance(other, self.__class__) and self.runfolder == other.runfolder:
+            return True
+        else:
+            return False
+
+    def __hash__(self):
+        return hash(self.__class__.__name__ + self.runfolder)
@@ -0,0 +1,158 @@
+import concurrent.futures
+import gzip
+import logging
+import os
+import re
+from collections import Counter, OrderedDict
+
+from checkQC.parsers.parser import Parser
+from checkQC.exceptions import FastqNotFound, ConfigurationError
+
+log = logging.getLogger(__name__)
+
+
+def sample_fastq(path, reads_to_sample, stride, adapters, sequence_length):
+    """
+    Sample the reads of a gzipped fastq file, and count the bases, adapters and sequences of the sampled reads.
+    Only the first `reads_to_sample * stride` reads of the file are decompressed, and only counts are kept,
+    so the time and memory used do not depend on the size of the file.
+
+    This is a module level function so that it can be run in a process pool.
+
+    :param path: path to the fastq.gz file
+    :param reads_to_sample: the maximum number of reads to sample
+    :param stride: sample every `stride`:th read, 1 samples the first reads of the file
+    :param adapters: a list of tuples of the name and (the start of the) sequence of each adapter, as bytes
+    :param sequence_length: the number of bases at the start of each read which are counted as its sequence
+    :returns: a dict with the number of reads sampled, their GC content (in percent, None if no bases were called),
+              the number of reads containing each adapter, and the most common sequences and their counts
+    """
+    reads = 0
+    called_bases = 0
+    gc_bases = 0
+    adapter_counts = OrderedDict((name, 0) for name, _ in adapters)
+    sequences = Counter()
+    with gzip.open(path, "rb") as f:
+        for index, (_, sequence, _, _) in enumerate(zip(f, f, f, f)):
+            if index % stride:
+                continue
+            sequence = sequence.rstrip()
+            gc_bases += sequence.count(b"G") + sequence.count(b"C")
+            called_bases += len(sequence) - sequence.count(b"N")
+            for name, adapter in adapters:
+                if adapter in sequence:
+                    adapter_counts[name] += 1
+            sequences[sequence[:sequence_length]] += 1
+            reads += 1
+            if reads >= reads_to_sample:
+                break
+    return {"reads_sampled": reads,
+            "gc_content": gc_bases / called_bases * 100 if called_bases else None,
+            "adapter_counts": adapter_counts,
+            "top_sequences": [[sequence.decode(), count] for sequence, count in sequences.most_common(5)]}
+
+
+class FastqParser(Parser):
+    """
+    The FastqParser samples the reads of the fastq files written by bcl2fastq (or bcl-convert). Reading entire fastq
+    files is not feasible, so only the first `reads_per_file` reads of each file are read (or, with `stride` larger
+    than 1, every `stride`:th read until `reads_per_file` reads have been sampled). The files are decompressed in
+    a pool of `processes` processes, and only counts are sent back from them, so that the memory used is bounded.
+
+    For each fastq file of a sample (index reads and undetermined reads are not sampled) a tuple with a summary of
+    the sampled reads is sent to the subscribers:
+
+        ('fastq_sample', {'sample_id': 'Sample_1', 'lane': 1, 'read': 1, 'file': 'Sample_1_S1_L001_R1_001.fastq.gz',
+                          'reads_sampled': 100000, 'gc_content': 41.2,
+                          'adapter_counts': {'Illumina Universal Adapter': 120, ...},
+                          'top_sequences': [['ACGT...', 310], ...]})
+
+    If the parser has been restricted to some lanes, the files of other lanes are not read.
+    """
+
+    DEFAULT_FASTQ_PATH = "Data/Intensities/BaseCalls"
+    DEFAULT_READS_PER_FILE = 100000
+    DEFAULT_STRIDE = 1
+    DEFAULT_PROCESSES = 4
+    DEFAULT_SEQUENCE_LENGTH = 50
+    DEFAULT_ADAPTERS = OrderedDict([("Illumina Universal Adapter", "AGATCGGAAGAG"),
+                                    ("Illumina Small RNA 3' Adapter", "TGGAATTCTCGG"),
+                                    ("Nextera Transposase Sequence", "CTGTCTCTTATA")])
+
+    FASTQ_FILE_NAME = re.compile(r"^(?P<sample_id>.+)_S\d+(_L(?P<lane>\d{3}))?_R(?P<read>\d)_\d{3}\.fastq\.gz$")
+
+    def __init__(self, runfolder, parser_configurations, *args, **kwargs):
+        """
+        Create a FastqParser instance for the specified runfolder
+
+        :param runfolder: path to the runfolder to parse
+        :param parser_configurations: dict containing any extra configuration required by
+        the parser under class name key
+        """
+        super().__init__(*args, **kwargs)
+
+        parser_conf = (parser_configurations or {}).get(self.__class__.__name__) or {}
+        self.fastq_path = os.path.join(runfolder, parser_conf.get("fastq_path", self.DEFAULT_FASTQ_PATH))
+        self.reads_per_file = parser_conf.get("reads_per_file", self.DEFAULT_READS_PER_FILE)
+        self.stride = parser_conf.get("stride", self.DEFAULT_STRIDE)
+        self.processes = parser_conf.get("processes", self.DEFAULT_PROCESSES)
+        self.sequence_length = parser_conf.get("sequence_length", self.DEFAULT_SEQUENCE_LENGTH)
+        self.adapters = parser_conf.get("adapters", self.DEFAULT_ADAPTERS)
+        for key in ("reads_per_file", "stride", "processes", "sequence_length"):
+            value = getattr(self, key)
+            if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+                raise ConfigurationError("'{}' in the FastqParser configuration should be a positive integer. "
+                                         "Value was: {}".format(key, value))
+
+        self.fastq_files = self._find_fastq_files()
+        if not self.fastq_files:
+            raise FastqNotFound("Could not find any fastq.gz files of samples under: {}. You can specify where they "
+                                "are located by setting 'fastq_path' in the 'FastqParser' part of the checkqc "
+                                "configuration file.".format(self.fastq_path))
+
+    def _find_fastq_files(self):
+        fastq_files = []
+        for directory, _, file_names in os.walk(self.fastq_path):
+            for file_name in file_names:
+                match = self.FASTQ_FILE_NAME.match(file_name)
+                if not match or match.group("sample_id").startswith("Undetermined"):
+                    continue
+                fastq_files.append({"sample_id": match.group("sample_id"),
+                                    "lane": int(match.group("lane")) if match.group("lane") else None,
+                                    "read": int(match.group("read")),
+                                    "path": os.path.join(directory, file_name)})
+        return sorted(fastq_files, key=lambda fastq_file: (fastq_file["lane"] or 0, fastq_file["path"]))
+
+    def _sample_all(self, fastq_files):
+        adapters = [(name, sequence.encode()) for name, sequence in self.adapters.items()]
+        arguments = (self.reads_per_file, self.stride, adapters, self.sequence_length)
+        if self.processes == 1 or len(fastq_files) == 1:
+            for fastq_file in fastq_files:
+                yield fastq_file, sample_fastq(fastq_file["path"], *arguments)
+            return
+        with concurrent.futures.ProcessPoolExecutor(max_workers=min(self.processes, len(fastq_files))) as executor:
+            futures = [executor.submit(sample_fastq, fastq_file["path"], *arguments) for fastq_file in fastq_files]
+            try:
+                for fastq_file, future in zip(fastq_files, futures):
+                    yield fastq_file, future.result()
+            finally:
+                for future in futures:
+                    future.cancel()
+
+    def run(self):
+        fastq_files = [fastq_file for fastq_file in self.fastq_files if self._lane_selected(fastq_file["lane"])]
+        for fastq_file, summary in self._sample_all(fastq_files):
+            summary.update(sample_id=fastq_file["sample_id"],
+                           lane=fastq_file["lane"],
+                           read=fastq_file["read"],
+                           file=os.path.basename(fastq_file["path"]))
+            self._send_to_subscribers(("fastq_sample", summary))
+
+    def __eq__(self, other):
+        if isinstance(other, self.__class__) and self.fastq_path == other.fastq_path:
+            return True
+        else:
+            return False
+
+    def __hash__(self):
+        return hash(self.__class__.__name__ + self.fastq_path)
@@ -1,7 +1,11 @@
 
+import os
+
 from checkQC.parsers.parser import Parser
+from checkQC.parsers.data_sources import load_interop_run_metrics
+from checkQC.exceptions import InteropNotFound
 
-from interop import py_interop_run_metrics, py_interop_run, py_interop_summary
+from interop import py_interop_summary, py_interop_run_metrics
 
 
 class InteropParser(Parser):
@@ -13,7 +17,11 @@ class InteropParser(Parser):
 
         - ("error_rate", {"lane": <lane nbr>, "read": <read nbr>, "error_rate": <error rate>}))
         - ("percent_q30", {"lane": <lane nbr>, "read": <read nbr>, "percent_q30": <percent q30>}))
+        - ("clusters_pf", {"lane": <lane nbr>, "clusters_pf": <number of clusters passing filter>}))
 
+    If the parser has been restricted to some lanes, only the metrics of the tiles on those lanes are summarized.
+    The Interop files are not organized by lane, and the Interop library can only read a file in full, so the
+    files are still read in full (and shared with the other parsers reading them).
     """
 
     def __init__(self, runfolder, parser_configurations, *args, **kwargs):
@@ -26,6 +34,8 @@ class InteropParser(Parser):
         """
         super().__init__(*args, **kwargs)
         self.runfolder = runfolder
+        if not os.path.isdir(os.path.join(self.runfolder, "InterOp")):
+            raise InteropNotFound("Could not find an InterOp directory in: {}".format(self.runfolder))
 
     @staticmethod
     def get_non_index_reads(summary):
@@ -41,13 +51,34 @@ class InteropParser(Parser):
                 non_index_reads.append(read_nbr)
         return non_index_reads
 
-    def run(self):
-        run_metrics = py_interop_run_metrics.run_metrics()
-        run_metrics.run_info()
+    def _selected_run_metrics(self, run_metrics):
+        """
+        Copy the metrics of the tiles on the selected lanes into a run_metrics object of their own, so that only
+        those are summarized. The shared run_metrics of the data source are not modified.
 
-        valid_to_load = py_interop_run.uchar_vector(py_interop_run.MetricCount, 0)
-        py_interop_run_metrics.list_summary_metrics_to_load(valid_to_load)
-        run_metrics.read(self.runfolder, valid_to_load)
+        :param run_metrics: a Interop run_metrics object with the metrics of all lanes
+        :returns: a Interop run_metrics object with the metrics of the selected lanes
+        """
+        if self.lanes is None:
+            return run_metrics
+        selected_run_metrics = py_interop_run_metrics.run_metrics(run_metrics.run_info(),
+                                                                  run_metrics.run_parameters())
+        tile_metrics = run_metrics.tile_metric_set()
+        for i in range(tile_metrics.size()):
+            tile_metric = tile_metrics.at(i)
+            if self._lane_selected(tile_metric.lane()):
+                selected_run_metrics.append_tiles(run_metrics, tile_metric)
+        selected_run_metrics.finalize_after_load()
+        return selected_run_metrics
+
+    def data_sources(self):
+        return {("InterOp", self.runfolder): lambda: load_interop_run_metrics(self.runfolder,
+                                                                              self.runfolder_archive)}
+
+    def run(self):
+        run_metrics = self._selected_run_metrics(self._get_data_source(("InterOp", self.runfolder)))
+        if run_metrics.tile_metric_set().size() == 0 and self.lanes is not None:
+            return
 
         summary = py_interop_summary.run_summary()
         py_interop_summary.summarize_run_metrics(run_metrics, summary)
@@ -55,6 +86,12 @@ class InteropParser(Parser):
         lanes = summary.lane_count()
         reads = self.get_non_index_reads(summary)
         for lane in range(lanes):
+            # Only the selected lanes have been summarized, so the lane number is taken from the summary
+            lane_nbr = summary.at(reads[0]).at(lane).lane()
+            # The number of clusters passing filter is the same for all reads, and comes from the tile metrics,
+            # which means that it is available even if bcl2fastq has not been run.
+            self._send_to_subscribers(("clusters_pf",
+                                       {"lane": lane_nbr, "clusters_pf": summary.at(reads[0]).at(lane).reads_pf()}))
             # The interop library uses zero based indexing, however most people uses read 1/2
             # to denote the different reads, this enumeration is used to transform from
             # zero based indexing to this form. /JD 2017-10-27
@@ -63,9 +100,10 @@ class InteropParser(Parser):
                 error_rate = read.error_rate().mean()
                 percent_q30 = read.percent_gt_q30()
                 self._send_to_subscribers(("error_rate",
-                                           {"lane": lane+1, "read": new_read_nbr+1, "error_rate": error_rate}))
+                                           {"lane": lane_nbr, "read": new_read_nbr+1, "error_rate": error_rate}))
                 self._send_to_subscribers(("percent_q30",
-                                           {"lane": lane+1, "read": new_read_nbr+1, "percent_q30": percent_q30}))
+                                           {"lane": lane_nbr, "read": new_read_nbr+1,
+                                            "percent_q30": percent_q30}))
 
     def __eq__(self, other):
         if isinstance(other, self.__class__) and self.runfolder == other.runfolder:
@@ -1,3 +1,8 @@
+import asyncio
+
+from checkQC.deadline import Deadline
+from checkQC import profiling
+
 
 class Parser(object):
     """
@@ -16,10 +21,32 @@ class Parser(object):
     Furthermore in order for Parsers to be identifiable it is necessary to implement a custom version
     of `__eq__` and `__hash__`, which provides a custom definition of equivalence, this can e.g. be based on
     which runfolder the parser is setup to get its data from.
+
+    Parsers can also be run asynchronously, using `run_async`. By default this runs `run` in an executor, but
+    Parsers which do I/O can override it to await their reads, and send their data using
+    `_send_to_subscribers_async`, so that other work can be done while they wait.
+
+    If the Parser has been given a Deadline, sending data to the subscribers will raise a `QCTimeout` once the
+    time limit has been passed. Parsers which do a lot of work between sending values should call
+    `_check_deadline` regularly.
+
+    If the Parser has been restricted to some lanes (`lanes`), it should only send the data of those lanes, which
+    it can check using `_lane_selected`.
+
+    Parsers which read data that other Parsers may also need (e.g. the Interop files) should declare this by
+    implementing `data_sources`, and get the data using `_get_data_source`. This makes it possible for the
+    QCEngine to load the data only once, and share it between the Parsers.
+
+    If the runfolder has been created from an archive (see `ArchivedRunfolder`), the Parser is given the
+    archive (`runfolder_archive`), so that data which has not been extracted can be read from it.
     """
 
     def __init__(self):
         self.subscribers = []
+        self.data_source_registry = None
+        self.deadline = None
+        self.lanes = None
+        self.runfolder_archive = None
 
     def add_subscribers(self, new_subscribers):
         """
@@ -33,6 +60,25 @@ class Parser(object):
         else:
             self.subscribers.append(new_subscribers)
 
+    def _check_deadline(self):
+        """
+        Check that the time limit of the Parser (if any) has not been passed
+
+        :returns: None
+        :raises: QCTimeout if the time limit has been passed, or if the check has been cancelled
+        """
+        if self.deadline is not None:
+            self.deadline.check()
+
+    def _lane_selected(self, lane):
+        """
+        Check if the data of a lane should be sent to the subscribers
+
+        :param lane: the lane number (starting from 1)
+        :returns: True if the Parser has not been restricted to some lanes, or if the lane is one of them
+        """
+        return self.lanes is None or lane in self.lanes
+
     def _send_to_subscribers(self, value):
         """
         Calling this method will send `value` to all subscribers
@@ -40,9 +86,59 @@ class Parser(object):
         :param value: The value to send to the subscribers
         :returns: None
         """
+        self._check_deadline()
         for subscriber in self.subscribers:
             subscriber.send(value)
 
+    async def _send_to_subscribers_async(self, value):
+        """
+        Calling this method will send `value` to all subscribers, awaiting any asynchronous subscribers
+
+        :param value: The value to send to the subscribers
+        :returns: None
+        """
+        self._check_deadline()
+        for subscriber in self.subscribers:
+            await subscriber.send_async(value)
+
+    def data_sources(self):
+        """
+        Override this method in subclass to declare the data sources which the Parser reads from. E.g.
+
+        .. code-block :: python
+
+            def data_sources(self):
+                return {("Stats.json", self.file_path): lambda: load_json(self.file_path)}
+
+        :returns: a dict of keys identifying the data sources, to callables which load them
+        """
+        return {}
+
+    def _get_data_source(self, key):
+        """
+        Get the data of one of the data sources declared by `data_sources`. If the Parser has been given a
+        DataSourceRegistry the data will be shared with any other Parser using the same data source, otherwise
+        it will be loaded directly.
+
+        :param key: key identifying the data source
+        :returns: the data of the data source
+        """
+        if self.data_source_registry is not None:
+            return self.data_source_registry.get(key)
+        return self.data_sources()[key]()
+
+    async def _get_data_source_async(self, key):
+        """
+        Get the data of one of the data sources declared by `data_sources`, loading it in an executor so that
+        the event loop is not blocked while the data is read.
+
+        :param key: key identifying the data source
+        :returns: the data of the data source
+        """
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, profiling.in_stages, [Deadline.PARSE, type(self).__name__],
+                                          self._get_data_source, key)
+
     def run(self):
         """
         All Parsers must implement this method. Calling it should parse the data, what ever that means in the
@@ -54,6 +150,16 @@ class Parser(object):
         """
         raise NotImplementedError
 
+    async def run_async(self):
+        """
+        Run the parser asynchronously. By default this will call `run` in an executor. Subclasses can override
+        this, e.g. to await reading their data and then send it using `_send_to_subscribers_async`.
+
+        :returns: None
+        """
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(None, profiling.in_stages, [Deadline.PARSE, type(self).__name__], self.run)
+
     def __eq__(self, other):
         raise NotImplementedError
 
@@ -0,0 +1,49 @@
+from checkQC.parsers.parser import Parser
+from checkQC.handlers.qc_handler import Subscriber
+
+
+class SignalRecorder(Subscriber):
+    """
+    A Subscriber which records all values a Parser sends to its subscribers, so that they can later be
+    replayed by a ReplayParser.
+    """
+
+    def __init__(self):
+        self.signals = []
+        super().__init__()
+
+    def collect(self, signal):
+        self.signals.append(signal)
+
+
+class ReplayParser(Parser):
+    """
+    The ReplayParser sends values which have earlier been recorded from another Parser (e.g. by a SignalRecorder)
+    to its subscribers, in the same order as they were originally sent. This makes it possible to re-evaluate
+    handlers without reading the data of the runfolder again.
+    """
+
+    def __init__(self, parser_name, signals, *args, **kwargs):
+        """
+        Create a ReplayParser instance
+
+        :param parser_name: name of the Parser class the signals were recorded from
+        :param signals: the recorded signals, signals which are lists (e.g. after having been stored as json)
+                        are sent as tuples
+        """
+        super().__init__(*args, **kwargs)
+        self.parser_name = parser_name
+        self.signals = signals
+
+    def run(self):
+        for signal in self.signals:
+            self._send_to_subscribers(tuple(signal) if isinstance(signal, list) else signal)
+
+    def __eq__(self, other):
+        if isinstance(other, self.__class__) and self.parser_name == other.parser_name:
+            return True
+        else:
+            return False
+
+    def __hash__(self):
+        return hash(self.__class__.__name__ + self.parser_name)
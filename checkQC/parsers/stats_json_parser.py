@@ -1,9 +1,9 @@
 
-import json
 import os
 import logging
 
 from checkQC.parsers.parser import Parser
+from checkQC.parsers.data_sources import load_json, load_json_dropping
 from checkQC.exceptions import StatsJsonNotFound, ConfigurationError
 
 log = logging.getLogger(__name__)
@@ -19,8 +19,18 @@ class StatsJsonParser(Parser):
         ('RunId', '170726_D00118_0303_BCB1TVANXX')
 
     The subscribers decide which of these values they are iterested in.
+
+    If the parser has been restricted to some lanes, the entries of other lanes of the values which are given per
+    lane (e.g. `ConversionResults`) are dropped while the file is decoded, so that only the entries of the selected
+    lanes (and their samples) are kept (see `load_json_dropping`). The file itself is still read and decoded in
+    full, since the json module cannot skip parts of a document.
     """
 
+    # The keys of each kind of per lane entry, which identify it, and the key of its lane number
+    LANE_ENTRY_KEYS = (("DemuxResults", "LaneNumber"),   # ConversionResults
+                       ("ReadInfos", "LaneNumber"),      # ReadInfosForLanes
+                       ("Barcodes", "Lane"))             # UnknownBarcodes
+
     def __init__(self, runfolder, parser_configurations, *args, **kwargs):
         """
         Create a StatsJsonParser instance for the specified runfolder
@@ -54,11 +64,32 @@ class StatsJsonParser(Parser):
                       "checkqc configuration file.".format(self.file_path))
             raise StatsJsonNotFound("Could not find a Stats.json file at: {}".format(self.file_path))
 
+    def _data_source_key(self):
+        return "Stats.json", self.file_path, tuple(sorted(self.lanes)) if self.lanes is not None else None
+
+    def _is_unselected_lane_entry(self, json_object):
+        for entry_key, lane_key in self.LANE_ENTRY_KEYS:
+            if entry_key in json_object and lane_key in json_object:
+                return not self._lane_selected(json_object[lane_key])
+        return False
+
+    def _load(self):
+        if self.lanes is None:
+            return load_json(self.file_path)
+        return load_json_dropping(self.file_path, self._is_unselected_lane_entry)
+
+    def data_sources(self):
+        return {self._data_source_key(): self._load}
+
     def run(self):
-        with open(self.file_path, "r") as f:
-            data = json.load(f)
-            for key_value in data.items():
-                self._send_to_subscribers(key_value)
+        data = self._get_data_source(self._data_source_key())
+        for key_value in data.items():
+            self._send_to_subscribers(key_value)
+
+    async def run_async(self):
+        data = await self._get_data_source_async(self._data_source_key())
+        for key_value in data.items():
+            await self._send_to_subscribers_async(key_value)
 
     def __eq__(self, other):
         if isinstance(other, self.__class__) and self.file_path == other.file_path:
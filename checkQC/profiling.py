@@ -0,0 +1,265 @@
+import cProfile
+import contextlib
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+log = logging.getLogger(__name__)
+
+# The current stage of each thread, as a list of the names of the nested stages, keyed by thread identifier
+_stages = {}
+_stage_listeners = []
+
+
+def current_stage(thread_ident=None):
+    """
+    Get the stage which a thread is currently in
+
+    :param thread_ident: identifier of the thread, if None the current thread
+    :returns: a list of the names of the nested stages, the outermost first
+    """
+    return list(_stages.get(thread_ident if thread_ident is not None else threading.get_ident(), []))
+
+
+@contextlib.contextmanager
+def stage(name):
+    """
+    Label the work done by the current thread within the context as belonging to a stage of the check, e.g.
+    a QCEngine stage or the name of a parser or handler, so that profiles can be mapped back to checkQC.
+    Stages can be nested.
+
+    Note that since the stage is kept per thread, it should not be used around an `await`.
+
+    :param name: name of the stage
+    """
+    thread_ident = threading.get_ident()
+    previous = _stages.get(thread_ident)
+    stages = (previous or []) + [name]
+    _stages[thread_ident] = stages
+    for listener in list(_stage_listeners):
+        listener.stage_changed(thread_ident, stages)
+    try:
+        yield
+    finally:
+        if previous is None:
+            _stages.pop(thread_ident, None)
+        else:
+            _stages[thread_ident] = previous
+        for listener in list(_stage_listeners):
+            listener.stage_changed(thread_ident, previous or [])
+
+
+def in_stages(names, function, *args, **kwargs):
+    """
+    Call a function within a number of nested stages, e.g. when it is run in another thread
+
+    :param names: the names of the nested stages, the outermost first
+    :param function: the function to call
+    :returns: the return value of the function
+    """
+    with contextlib.ExitStack() as stack:
+        for name in names:
+            stack.enter_context(stage(name))
+        return function(*args, **kwargs)
+
+
+class StageProfiler(object):
+    """
+    The StageProfiler profiles a thread with cProfile, keeping a separate profile for each stage (see `stage`),
+    which can be written as pstats files.
+    """
+
+    ROOT_STAGE = "checkqc"
+
+    def __init__(self):
+        self.thread_ident = None
+        self.profiles = {}
+        self._active = None
+
+    def _switch(self, stages):
+        if self._active is not None:
+            self._active.disable()
+        label = ".".join([self.ROOT_STAGE] + stages)
+        self._active = self.profiles.setdefault(label, cProfile.Profile())
+        self._active.enable()
+
+    def stage_changed(self, thread_ident, stages):
+        if thread_ident == self.thread_ident:
+            self._switch(stages)
+
+    def start(self):
+        """
+        Start profiling the current thread
+
+        :returns: None
+        """
+        self.thread_ident = threading.get_ident()
+        self._switch(current_stage())
+        _stage_listeners.append(self)
+
+    def stop(self):
+        """
+        Stop profiling
+
+        :returns: None
+        """
+        _stage_listeners.remove(self)
+        if self._active is not None:
+            self._active.disable()
+            self._active = None
+
+    def write(self, output_dir):
+        """
+        Write the profile of each stage as a pstats file, named `<stage>.pstats`
+
+        :param output_dir: the directory to write the files to
+        :returns: a list of the paths of the files written
+        """
+        paths = []
+        for label, profile in sorted(self.profiles.items()):
+            path = os.path.join(output_dir, "{}.pstats".format(label))
+            profile.dump_stats(path)
+            paths.append(path)
+        return paths
+
+
+class StackSampler(object):
+    """
+    The StackSampler samples the stacks of all threads of the process at regular intervals, and counts how often
+    each stack is seen. The stacks are labelled with the stage (see `stage`) the thread was in, and can be
+    written in the collapsed format used by flame graph tools, e.g.:
+
+        checkqc;parse;InteropParser;app.py:start;...;interop_parser.py:run 42
+    """
+
+    def __init__(self, interval=0.005):
+        """
+        Create a StackSampler instance
+
+        :param interval: the number of seconds between two samples
+        """
+        self.interval = interval
+        self.samples = Counter()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def _frame_name(frame):
+        code = frame.f_code
+        return "{}:{}".format(os.path.basename(code.co_filename), code.co_name)
+
+    def _sample(self):
+        own_ident = threading.get_ident()
+        for thread_ident, frame in sys._current_frames().items():
+            if thread_ident == own_ident:
+                continue
+            frames = []
+            while frame is not None:
+                frames.append(self._frame_name(frame))
+                frame = frame.f_back
+            stack = [StageProfiler.ROOT_STAGE] + current_stage(thread_ident) + list(reversed(frames))
+            self.samples[";".join(stack)] += 1
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        """
+        Start sampling in a background thread
+
+        :returns: None
+        """
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="checkqc-stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop sampling
+
+        :returns: None
+        """
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def collapsed(self):
+        """
+        The samples in the collapsed stack format
+
+        :returns: a string with one line per distinct stack, with the number of times it was seen
+        """
+        return "".join("{} {}\n".format(stack, count) for stack, count in sorted(self.samples.items()))
+
+    def sample_for(self, seconds):
+        """
+        Sample the process for a number of seconds
+
+        :param seconds: the number of seconds to sample for
+        :returns: the samples in the collapsed stack format
+        """
+        self.start()
+        try:
+            time.sleep(seconds)
+        finally:
+            self.stop()
+        return self.collapsed()
+
+
+class Profiler(object):
+    """
+    The Profiler profiles a check run in the current thread: it writes a cProfile (pstats) file for each stage of
+    the check, and a `checkqc.collapsed` file with the sampled stacks of the check, which can be turned into a
+    flame graph (e.g. with `flamegraph.pl` or speedscope).
+
+    It is used as a context manager:
+
+    .. code-block :: python
+
+        with Profiler("/tmp/profile"):
+            app.configure_and_run()
+    """
+
+    COLLAPSED_FILE_NAME = "checkqc.collapsed"
+
+    def __init__(self, output_dir, interval=0.005):
+        """
+        Create a Profiler instance
+
+        :param output_dir: the directory to write the profiles to, it is created if it does not exist
+        :param interval: the number of seconds between two stack samples
+        """
+        self.output_dir = output_dir
+        self.stage_profiler = StageProfiler()
+        self.stack_sampler = StackSampler(interval)
+
+    def __enter__(self):
+        self.stack_sampler.start()
+        self.stage_profiler.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stage_profiler.stop()
+        self.stack_sampler.stop()
+        self.write()
+        return False
+
+    def write(self):
+        """
+        Write the profiles
+
+        :returns: a list of the paths of the files written
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        paths = self.stage_profiler.write(self.output_dir)
+        collapsed_path = os.path.join(self.output_dir, self.COLLAPSED_FILE_NAME)
+        with open(collapsed_path, "w") as f:
+            f.write(self.stack_sampler.collapsed())
+        paths.append(collapsed_path)
+        log.info("Wrote profiles to: {}".format(self.output_dir))
+        return paths
@@ -1,9 +1,15 @@
 
 from collections import defaultdict
+import asyncio
 import logging
 
 from checkQC.handlers.qc_handler_factory import QCHandlerFactory
-from checkQC.exceptions import ConfigurationError
+from checkQC.handlers.qc_handler import QCErrorFatal
+from checkQC.parsers.data_sources import DataSourceRegistry
+from checkQC.parsers.replay_parser import ReplayParser, SignalRecorder
+from checkQC.deadline import Deadline
+from checkQC import profiling
+from checkQC.exceptions import ConfigurationError, DataSourceNotFound
 
 log = logging.getLogger(__name__)
 
@@ -15,17 +21,54 @@ class QCEngine(object):
     Internally it will run a number of methods which will do the following:
      - create all handlers specified in the handler config
      - validate all the configs provided, so that all necessary values are preset
-     - initiate the parsers based on which parsers are found in the handlers
+     - initiate the parsers based on which parsers are found in the handlers. If the data source of a
+       handler's parser is not available its fallback parsers are tried, and if none of them are available
+       the handler is reported as not checked, which is a fatal qc error (or, if `skip_unavailable_handlers`
+       is set, the handler is skipped)
      - connect the handlers and parsers so that each parser gets the correct
-       subscribers
-     - run the parsers, i.e. pick up data and pass it to the handlers
+       subscribers, and register the data sources which each parser reads from, so that data
+       which is read by several parsers is only loaded once
+     - run the parsers, i.e. pick up data and pass it to the handlers. Each data source is released
+       as soon as the last parser reading from it has been run
+     - let the handlers of each parser report as soon as the parser has been run, and keep only their reports,
+       exit status and metrics. The handlers (and the data they have collected) are then dropped, so that the
+       peak memory use is bounded by the largest data source rather than the sum of all of them
      - compile all reports from the handlers
+     - compile the metrics which the handlers have collected
+
+    The engine can also be run from a coroutine using `run_async`, in which case the parsers are run concurrently
+    (see `Parser.run_async`), and the handlers report in an executor, so that the event loop is not blocked.
+    Parsers reading different data sources are not run at the same time though, so that at most one data
+    source is loaded at a time.
+
+    The values which the parsers send to the handlers can be recorded (`record_signals`), and later be given
+    back to the engine (`recorded_signals`). The recorded values are then replayed to the handlers, instead of
+    running the parsers, so that the handlers can be re-evaluated without reading the runfolder again.
+
+    The handlers can also be given as a compiled ExecutionPlan, in which case the handlers have already been
+    found and validated, and are only created for the run.
+
+    The check can be restricted to some lanes (`lanes`), in which case the parsers only send the data of
+    those lanes to the handlers.
+
+    The work done is labelled with the stage of the engine (`setup`, `parse`, `report` and `compile`) and the
+    name of the parser or handler, so that profiles (see `checkQC.profiling`) can be mapped back to them.
+
+    If the engine is given a Deadline, it will be checked between each parser and handler, and passed on to the
+    parsers, which check it as they send their data. A `QCTimeout` is raised if a time limit is passed.
 
     The QCEngine has a `exit_status` field which can be checked after calling the `run` method,
-    to determine if all handlers were successful or not (zero indicates success, 1 indicates failure)
+    to determine if all handlers were successful or not (zero indicates success, 1 indicates failure),
+    and a `metrics` field which will contain the metrics collected by the handlers once `run` has finished.
     """
 
-    def __init__(self, runfolder, parser_configurations, handler_config, qc_handler_factory=None):
+    SETUP = "setup"
+    REPORT = "report"
+    COMPILE = "compile"
+
+    def __init__(self, runfolder, parser_configurations, handler_config, qc_handler_factory=None, deadline=None,
+                 recorded_signals=None, record_signals=False, execution_plan=None, lanes=None,
+                 skip_unavailable_handlers=False, runfolder_archive=None):
         """
         Create a instance of QCEngine
 
@@ -33,13 +76,40 @@ class QCEngine(object):
         :param parser_configurations: dict containing configurations for the parsers
         :param handler_config: a dict which configurations for the handlers
         :param qc_handler_factory: A QCHandlerFactory, if None default QCHandlerFactory will be used
+        :param deadline: A Deadline limiting the time the engine may run, if None there is no limit
+        :param recorded_signals: a dict of Parser class names to the values they have sent earlier, if a parser
+                                 needed by a handler is found here its values will be replayed instead
+        :param record_signals: if True the values sent by the parsers are recorded in `recorded_signals`
+        :param execution_plan: A ExecutionPlan to create the handlers from, if None the handlers are created
+                               from `handler_config`
+        :param lanes: the numbers of the lanes to check, if None all lanes are checked
+        :param skip_unavailable_handlers: if True handlers for which none of the data sources are available are
+                                          skipped, otherwise they are reported as not checked, which is a fatal
+                                          qc error
+        :param runfolder_archive: the RunfolderArchive the runfolder has been created from (see
+                                  `ArchivedRunfolder`), which is given to the parsers, or None
         """
         self.runfolder = runfolder
         self.parser_configurations = parser_configurations
         self.handlers_config = handler_config
         self._handlers = []
         self._parsers_and_handlers = defaultdict(list)
+        self._unavailable_parsers = set()
+        self._data_source_registry = DataSourceRegistry()
+        self._handler_results = {}
+        self._unchecked_results = []
+        self.skip_unavailable_handlers = skip_unavailable_handlers
+        self.deadline = deadline if deadline is not None else Deadline()
+        self._replayed_signals = recorded_signals or {}
+        self._record_signals = record_signals
+        self._signal_recorders = {}
+        self.recorded_signals = {}
+        self._execution_plan = execution_plan
+        self._parser_factories = {}
+        self.lanes = set(lanes) if lanes else None
+        self.runfolder_archive = runfolder_archive
         self.exit_status = 0
+        self.metrics = []
         if qc_handler_factory:
             self._qc_handler_factory = qc_handler_factory
         else:
@@ -53,22 +123,57 @@ class QCEngine(object):
         :return: a dict representing the reports gathers.
         """
         try:
+            self._setup()
+            self.deadline.start_stage(Deadline.PARSE)
+            self._run_parsers()
+            return self._compile()
+        except ConfigurationError:
+            self.exit_status = 1
+
+    async def run_async(self):
+        """
+        Run the specified parsers and handlers and compile their reports, like `run`, but run the
+        parsers concurrently. Only parsers sharing a data source, or not reading any data source,
+        are run at the same time, so that at most one data source is loaded at a time.
+
+        :return: a dict representing the reports gathers.
+        """
+        try:
+            self._setup()
+            self.deadline.start_stage(Deadline.PARSE)
+            await self._run_parsers_async()
+            return await asyncio.get_event_loop().run_in_executor(None, self._compile)
+        except ConfigurationError:
+            self.exit_status = 1
+
+    def _setup(self):
+        with profiling.stage(self.SETUP):
             self._create_handlers()
             self._validate_configurations()
             self._initiate_parsers()
             self._subscribe_handlers_to_parsers()
-            self._run_parsers()
+
+    def _compile(self):
+        with profiling.stage(self.COMPILE):
             reports = self._compile_reports()
+            self._compile_metrics()
+            self._compile_recorded_signals()
             return reports
-        except ConfigurationError:
-            self.exit_status = 1
 
     def _create_handlers(self):
+        if self._execution_plan is not None:
+            for handler, parser_factories in self._execution_plan.create_handlers():
+                self._handlers.append(handler)
+                self._parser_factories[id(handler)] = parser_factories
+            return
         for clazz_config in self.handlers_config:
             self._handlers.append(self._qc_handler_factory.
                                   create_subclass_instance(clazz_config["name"], clazz_config))
 
     def _validate_configurations(self):
+        if self._execution_plan is not None:
+            # The configurations were validated when the plan was compiled
+            return True
         try:
             for handler in self._handlers:
                 handler.validate_configuration()
@@ -77,28 +182,183 @@ class QCEngine(object):
             log.error("Error in configuration found for handler: {}. {}".format(type(handler).__name__, e))
             raise e
 
+    def _handler_parser_factories(self, handler):
+        parser_factories = self._parser_factories.get(id(handler))
+        if parser_factories is None:
+            parser_factories = [handler.parser()] + list(handler.fallback_parsers())
+        return parser_factories
+
+    def _create_parser(self, handler):
+        for parser_factory in self._handler_parser_factories(handler):
+            if parser_factory.__name__ in self._replayed_signals:
+                return ReplayParser(parser_factory.__name__, self._replayed_signals[parser_factory.__name__])
+            if parser_factory in self._unavailable_parsers:
+                continue
+            try:
+                return parser_factory(runfolder=self.runfolder,
+                                      parser_configurations=self.parser_configurations)
+            except DataSourceNotFound as e:
+                log.warning("Data source of {} is not available: {}".format(parser_factory.__name__, e))
+                self._unavailable_parsers.add(parser_factory)
+        return None
+
     def _initiate_parsers(self):
+        available_handlers = []
         for handler in self._handlers:
-            parser_factory = handler.parser()
-            parser_instance = parser_factory(runfolder=self.runfolder,
-                                             parser_configurations=self.parser_configurations)
+            parser_instance = self._create_parser(handler)
+            if parser_instance is None:
+                if self.skip_unavailable_handlers:
+                    log.warning("Skipping {} since none of the data sources it "
+                                "needs are available.".format(type(handler).__name__))
+                else:
+                    self._unchecked_results.append(self._unchecked_handler_result(handler))
+                continue
             self._parsers_and_handlers[parser_instance].append(handler)
+            available_handlers.append(handler)
+        self._handlers = available_handlers
 
     def _subscribe_handlers_to_parsers(self):
         for parser, handlers in self._parsers_and_handlers.items():
             parser.add_subscribers(handlers)
+            parser.data_source_registry = self._data_source_registry
+            parser.deadline = self.deadline
+            parser.lanes = self.lanes
+            parser.runfolder_archive = self.runfolder_archive
+            if self._record_signals:
+                recorder = SignalRecorder()
+                self._signal_recorders[self._parser_name(parser)] = recorder
+                parser.add_subscribers(recorder)
+            for key, loader in parser.data_sources().items():
+                self._data_source_registry.register(key, loader)
+
+    def _handler_positions(self):
+        return {id(handler): position for position, handler in enumerate(self._handlers)}
+
+    def _release_data_sources(self, parser):
+        for key in parser.data_sources():
+            self._data_source_registry.release(key)
+
+    def _handler_results_of(self, handlers):
+        handler_results = []
+        for handler in handlers:
+            self.deadline.check()
+            with profiling.stage(self.REPORT), profiling.stage(type(handler).__name__):
+                handler_results.append(self._handler_result(handler))
+        return handler_results
+
+    def _drop_reported_handlers(self, parser, handlers, positions, handler_results):
+        for handler, handler_result in zip(handlers, handler_results):
+            self._handler_results[positions[id(handler)]] = handler_result
+        reported = set(id(handler) for handler in handlers)
+        # Drop all references to the handlers which have reported, so that the data
+        # they have collected can be freed before the next parser is run.
+        parser.subscribers = []
+        self._parsers_and_handlers[parser] = []
+        self._handlers = [handler for handler in self._handlers if id(handler) not in reported]
+
+    def _report_handlers(self, parser, handlers, positions):
+        self._drop_reported_handlers(parser, handlers, positions, self._handler_results_of(handlers))
 
     def _run_parsers(self):
-        for parser in self._parsers_and_handlers.keys():
-            parser.run()
+        positions = self._handler_positions()
+        for parser, handlers in self._parsers_and_handlers.items():
+            self.deadline.check()
+            try:
+                with profiling.stage(Deadline.PARSE), profiling.stage(self._parser_name(parser)):
+                    parser.run()
+            finally:
+                self._release_data_sources(parser)
+            self._report_handlers(parser, handlers, positions)
+
+    async def _run_parser_async(self, parser, handlers, positions):
+        try:
+            await parser.run_async()
+        finally:
+            self._release_data_sources(parser)
+        handler_results = await asyncio.get_event_loop().run_in_executor(None, self._handler_results_of, handlers)
+        self._drop_reported_handlers(parser, handlers, positions, handler_results)
+
+    def _parser_groups(self):
+        """
+        Group the parsers by the data sources they read, so that parsers sharing a data source end up in the
+        same group.
+
+        :returns: a tuple of the groups of (parser, handlers) pairs which read data sources, and the list of
+                  (parser, handlers) pairs which do not read any data source
+        """
+        groups = []
+        without_data_sources = []
+        for parser, handlers in list(self._parsers_and_handlers.items()):
+            keys = set(parser.data_sources())
+            if not keys:
+                without_data_sources.append((parser, handlers))
+                continue
+            overlapping = [group for group in groups if group[0] & keys]
+            for group in overlapping:
+                groups.remove(group)
+                keys |= group[0]
+            groups.append((keys, [pair for group in overlapping for pair in group[1]] + [(parser, handlers)]))
+        return [pairs for _, pairs in groups], without_data_sources
+
+    async def _run_parsers_async(self):
+        positions = self._handler_positions()
+        groups, without_data_sources = self._parser_groups()
+
+        async def run_groups():
+            # Only the parsers sharing a data source are run at the same time, so that at most one data source
+            # is loaded at a time, as when the parsers are run one after the other.
+            for group in groups:
+                await asyncio.gather(*[self._run_parser_async(parser, handlers, positions)
+                                       for parser, handlers in group])
+
+        await asyncio.gather(run_groups(), *[self._run_parser_async(parser, handlers, positions)
+                                             for parser, handlers in without_data_sources])
+
+    @staticmethod
+    def _parser_name(parser):
+        return parser.parser_name if isinstance(parser, ReplayParser) else type(parser).__name__
+
+    @staticmethod
+    def _handler_result(handler):
+        handler_report = handler.report()
+        return {"name": type(handler).__name__,
+                "report": list(map(lambda x: x.as_dict(), handler_report)) if handler_report else None,
+                "exit_status": handler.exit_status(),
+                "metrics": list(handler.metrics())}
+
+    def _unchecked_handler_result(self, handler):
+        parser_names = [parser_factory.__name__ for parser_factory in self._handler_parser_factories(handler)]
+        message = "{} could not be checked, since none of the data sources it needs are available " \
+                  "(tried: {})".format(type(handler).__name__, ", ".join(parser_names))
+        log.error(message)
+        return {"name": type(handler).__name__,
+                "report": [QCErrorFatal(message, data={"not_checked": True, "parsers": parser_names}).as_dict()],
+                "exit_status": 1,
+                "metrics": []}
 
     def _compile_reports(self):
         reports = {"exit_status": 0}
-        for handler in self._handlers:
-            handler_report = handler.report()
-            if handler_report:
-                reports[type(handler).__name__] = list(map(lambda x: x.as_dict(), handler_report))
-            if handler.exit_status() != 0:
+        handler_results = [self._handler_results[position] for position in sorted(self._handler_results)]
+        # Handlers which have not already reported while running the parsers
+        handler_results.extend(self._handler_result(handler) for handler in self._handlers)
+        handler_results.extend(self._unchecked_results)
+        for handler_result in handler_results:
+            if handler_result["report"] is not None:
+                reports[handler_result["name"]] = handler_result["report"]
+            if handler_result["exit_status"] != 0:
                 self.exit_status = 1
                 reports["exit_status"] = 1
         return reports
+
+    def _compile_recorded_signals(self):
+        self.recorded_signals = {parser_name: recorder.signals
+                                 for parser_name, recorder in self._signal_recorders.items()}
+        return self.recorded_signals
+
+    def _compile_metrics(self):
+        self.metrics = []
+        for position in sorted(self._handler_results):
+            self.metrics.extend(self._handler_results[position]["metrics"])
+        for handler in self._handlers:
+            self.metrics.extend(handler.metrics())
+        return self.metrics
@@ -0,0 +1,133 @@
+import copy
+import datetime
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+from pkg_resources import Requirement, resource_filename
+
+from checkQC.config import ConfigFactory
+from checkQC.sidecar import Sidecar
+from checkQC import __version__ as checkqc_version
+
+log = logging.getLogger(__name__)
+
+
+class ReportVersion(object):
+    """
+    ReportVersion identifies the version of the report of a runfolder without checking it, so that a client
+    which already has the report can be told that it has not changed (e.g. using the ETag and Last-Modified
+    headers of HTTP).
+
+    The version is computed from the fingerprint (size and modification time) of the input files of the
+    runfolder, the content of the configuration, the version of checkQC and any other arguments which affect
+    the report. Note that if a results database is used, relative thresholds may change as other runs are
+    stored, which is not reflected in the version.
+    """
+
+    _configs = {}
+    _configs_lock = threading.Lock()
+
+    def __init__(self, runfolder, config_file=None, arguments=None):
+        """
+        Create a ReportVersion instance
+
+        :param runfolder: path to the runfolder (or runfolder archive)
+        :param config_file: path to the checkQC configuration file, if None the default configuration is used
+        :param arguments: a dict of any other arguments which affect the report
+        """
+        self.runfolder = runfolder
+        self.config_file = config_file
+        self.arguments = arguments or {}
+
+    @classmethod
+    def _load_config(cls, config_file):
+        """
+        Load the configuration, unless it has not changed since it was last loaded
+
+        :returns: a tuple of the digest of the configuration, the modification time of the configuration file
+                  and the parser configurations
+        """
+        config_path = config_file or resource_filename(Requirement.parse('checkQC'),
+                                                       'checkQC/default_config/config.yaml')
+        stat = os.stat(config_path)
+        with cls._configs_lock:
+            cached = cls._configs.get(config_path)
+            if cached and cached[0] == (stat.st_size, stat.st_mtime):
+                return cached[1]
+        with open(config_path, "rb") as f:
+            digest = hashlib.sha1(f.read()).hexdigest()
+        config = ConfigFactory.from_config_path(config_path)
+        loaded = (digest, stat.st_mtime, config.get("parser_configurations", None))
+        with cls._configs_lock:
+            cls._configs[config_path] = ((stat.st_size, stat.st_mtime), loaded)
+        return loaded
+
+    def compute(self):
+        """
+        Compute the version of the report
+
+        :returns: a tuple of the ETag (a quoted string) and the time of the last modification of any of the
+                  inputs (a datetime.datetime in UTC), or None if the runfolder could not be fingerprinted
+        """
+        try:
+            config_digest, config_mtime, parser_configurations = self._load_config(self.config_file)
+            fingerprint = Sidecar(self.runfolder, parser_configurations).fingerprint()
+        except OSError as e:
+            log.debug("Could not compute the report version of {}: {}".format(self.runfolder, e))
+            return None
+        if not fingerprint:
+            return None
+
+        content = json.dumps([checkqc_version, config_digest, fingerprint, self.arguments],
+                             sort_keys=True, default=str)
+        etag = '"{}"'.format(hashlib.sha1(content.encode()).hexdigest())
+        last_modified = max([mtime for _, mtime in fingerprint.values()] + [config_mtime])
+        return etag, datetime.datetime.utcfromtimestamp(int(last_modified))
+
+
+class ReportCache(object):
+    """
+    ReportCache keeps the most recent reports in memory, keyed by their version (see `ReportVersion`), so that
+    a runfolder which has not changed since it was last checked does not have to be checked again.
+    """
+
+    def __init__(self, max_reports=256):
+        """
+        Create a ReportCache instance
+
+        :param max_reports: the maximum number of reports to keep
+        """
+        self.max_reports = max_reports
+        self._reports = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, etag):
+        """
+        Get a cached report
+
+        :param etag: the version of the report, as computed by `ReportVersion`
+        :returns: the reports, or None if they are not cached
+        """
+        with self._lock:
+            if etag not in self._reports:
+                return None
+            self._reports.move_to_end(etag)
+            return copy.deepcopy(self._reports[etag])
+
+    def put(self, etag, reports):
+        """
+        Cache a report
+
+        :param etag: the version of the report, as computed by `ReportVersion`
+        :param reports: the reports
+        :returns: None
+        """
+        with self._lock:
+            self._reports[etag] = copy.deepcopy(reports)
+            self._reports.move_to_end(etag)
+            while len(self._reports) > self.max_reports:
+                self._reports.popitem(last=False)
@@ -0,0 +1,254 @@
+import contextlib
+import datetime
+import json
+import logging
+import sqlite3
+import sys
+
+import click
+
+from checkQC.baselines import TDigest
+
+log = logging.getLogger(__name__)
+
+
+class ResultsStore(object):
+    """
+    The ResultsStore keeps the results of previous checkQC runs in an SQLite database, so that questions
+    about trends over time, e.g. "which runs on instrument X had a lane with a %Q30 below Y in the last
+    six months", can be answered without having to re-read the data of the runfolders.
+
+    For each run the reports, the run summary and the metrics collected by the handlers are stored.
+    A run is identified by its run id, so re-checking a runfolder will replace the earlier results for it.
+
+    The store also keeps baselines for the metrics, i.e. a TDigest of the distribution of each metric per
+    instrument, instrument and reagent type, and read length (as well as across all instruments of a type).
+    These are updated incrementally the first time a run is added, and are used to resolve relative thresholds.
+    """
+
+    ALL_INSTRUMENTS = "*"
+
+    SCHEMA = [
+        """CREATE TABLE IF NOT EXISTS runs (
+               id INTEGER PRIMARY KEY,
+               run_id TEXT NOT NULL UNIQUE,
+               runfolder TEXT NOT NULL,
+               instrument TEXT,
+               instrument_and_reagent_type TEXT,
+               read_length TEXT,
+               run_date TEXT,
+               checked_at TEXT NOT NULL,
+               exit_status INTEGER NOT NULL,
+               run_summary TEXT,
+               reports TEXT)""",
+        """CREATE TABLE IF NOT EXISTS lane_metrics (
+               run INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+               metric TEXT NOT NULL,
+               lane INTEGER NOT NULL,
+               read INTEGER,
+               value REAL)""",
+        """CREATE TABLE IF NOT EXISTS baselines (
+               instrument TEXT NOT NULL,
+               instrument_and_reagent_type TEXT NOT NULL,
+               read_length TEXT NOT NULL,
+               metric TEXT NOT NULL,
+               digest TEXT NOT NULL,
+               percentiles TEXT NOT NULL,
+               PRIMARY KEY (instrument, instrument_and_reagent_type, read_length, metric))""",
+        "CREATE INDEX IF NOT EXISTS runs_instrument_run_date ON runs(instrument, run_date)",
+        "CREATE INDEX IF NOT EXISTS runs_run_date ON runs(run_date)",
+        "CREATE INDEX IF NOT EXISTS lane_metrics_run_metric_value ON lane_metrics(run, metric, value)",
+        "CREATE INDEX IF NOT EXISTS lane_metrics_metric_value ON lane_metrics(metric, value)",
+    ]
+
+    def __init__(self, db_path):
+        """
+        Create a ResultsStore instance. The database (and its tables) will be created if it does not exist.
+
+        :param db_path: path to the SQLite database file
+        """
+        self.db_path = db_path
+        with self._connect() as connection:
+            for statement in self.SCHEMA:
+                connection.execute(statement)
+
+    @contextlib.contextmanager
+    def _connect(self):
+        connection = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA foreign_keys = ON")
+            connection.execute("PRAGMA journal_mode = WAL")
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def add_run(self, run_id, runfolder, instrument, run_date, reports, metrics, checked_at=None):
+        """
+        Store the results of checking a run.
+
+        :param run_id: the id of the run, e.g. '170726_D00118_0303_BCB1TVANXX'
+        :param runfolder: path to the runfolder that was checked
+        :param instrument: name of the instrument, e.g. 'D00118'
+        :param run_date: a datetime.date on which the run was started, or None if not known
+        :param reports: the reports dict from the QCEngine, including the `run_summary`
+        :param metrics: an iterable of metric dicts, as given by `QCHandler.metrics`
+        :param checked_at: a datetime.datetime on which the check was done, if None the current time is used
+        :returns: None
+        """
+        if not checked_at:
+            checked_at = datetime.datetime.now()
+        run_summary = reports.get("run_summary", {})
+
+        metrics = list(metrics)
+        with self._connect() as connection:
+            is_new_run = connection.execute("DELETE FROM runs WHERE run_id = ?", (run_id,)).rowcount == 0
+            cursor = connection.execute(
+                "INSERT INTO runs (run_id, runfolder, instrument, instrument_and_reagent_type, read_length, "
+                "run_date, checked_at, exit_status, run_summary, reports) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (run_id, runfolder, instrument,
+                 run_summary.get("instrument_and_reagent_type"), run_summary.get("read_length"),
+                 run_date.isoformat() if run_date else None, checked_at.strftime("%Y-%m-%dT%H:%M:%S"),
+                 reports.get("exit_status", 0), json.dumps(run_summary), json.dumps(reports)))
+            run = cursor.lastrowid
+            connection.executemany("INSERT INTO lane_metrics (run, metric, lane, read, value) VALUES (?, ?, ?, ?, ?)",
+                                   [(run, metric["metric"], metric["lane"], metric.get("read"), metric["value"])
+                                    for metric in metrics])
+            if is_new_run and instrument and run_summary.get("instrument_and_reagent_type") \
+                    and run_summary.get("read_length"):
+                self._update_baselines(connection, instrument, run_summary["instrument_and_reagent_type"],
+                                       run_summary.get("read_length"), metrics)
+
+    def _update_baselines(self, connection, instrument, instrument_and_reagent_type, read_length, metrics):
+        values_per_metric = {}
+        for metric in metrics:
+            if metric["value"] is not None:
+                values_per_metric.setdefault(metric["metric"], []).append(metric["value"])
+
+        for metric, values in values_per_metric.items():
+            for baseline_instrument in (instrument, self.ALL_INSTRUMENTS):
+                key = (baseline_instrument, instrument_and_reagent_type, read_length, metric)
+                row = connection.execute("SELECT digest FROM baselines WHERE instrument = ? AND "
+                                         "instrument_and_reagent_type = ? AND read_length = ? AND metric = ?",
+                                         key).fetchone()
+                digest = TDigest.from_dict(json.loads(row["digest"])) if row else TDigest()
+                for value in values:
+                    digest.update(value)
+                connection.execute("INSERT OR REPLACE INTO baselines (instrument, instrument_and_reagent_type, "
+                                   "read_length, metric, digest, percentiles) VALUES (?, ?, ?, ?, ?, ?)",
+                                   key + (json.dumps(digest.to_dict()), json.dumps(digest.percentiles())))
+
+    def get_baseline_percentiles(self, instrument, instrument_and_reagent_type, read_length, metric):
+        """
+        Get the precomputed percentiles of the baseline for a metric. If there is no baseline for the
+        specific instrument, the baseline for all instruments of the same type and read length will be used.
+
+        :param instrument: name of the instrument, e.g. 'D00118'
+        :param instrument_and_reagent_type: the instrument and reagent type, e.g. 'hiseq2500_rapidhighoutput_v4'
+        :param read_length: the read length(s) of the run, e.g. '125-125'
+        :param metric: name of the metric, e.g. 'percent_q30'
+        :returns: a list with the values of the percentiles 0 to 100, or None if there is no baseline
+        """
+        with self._connect() as connection:
+            for baseline_instrument in (instrument, self.ALL_INSTRUMENTS):
+                row = connection.execute("SELECT percentiles FROM baselines WHERE instrument = ? AND "
+                                         "instrument_and_reagent_type = ? AND read_length = ? AND metric = ?",
+                                         (baseline_instrument, instrument_and_reagent_type,
+                                          read_length, metric)).fetchone()
+                if row:
+                    return json.loads(row["percentiles"])
+        return None
+
+    def get_run(self, run_id):
+        """
+        Get the stored results for a run.
+
+        :param run_id: the id of the run
+        :returns: a dict with the stored information about the run, or None if it has not been stored
+        """
+        with self._connect() as connection:
+            row = connection.execute("SELECT * FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        if not row:
+            return None
+        run = dict(row)
+        run["run_summary"] = json.loads(run["run_summary"])
+        run["reports"] = json.loads(run["reports"])
+        del run["id"]
+        return run
+
+    def query_metrics(self, metric, instrument=None, below=None, above=None, since=None):
+        """
+        Find the lanes (and reads) of stored runs where `metric` lies outside of the given limits, e.g.
+        all lanes of runs on instrument 'D00118' with a `percent_q30` below 80 since 2017-01-01.
+
+        :param metric: name of the metric, e.g. 'percent_q30'
+        :param instrument: only include runs on this instrument, if None include runs on all instruments
+        :param below: only include metrics with a value below this
+        :param above: only include metrics with a value above this
+        :param since: a datetime.date, only include runs started on, or after, this date
+        :returns: a list of dicts, one for each matching metric, with the most recent runs first
+        """
+        conditions = ["lane_metrics.metric = ?"]
+        parameters = [metric]
+        if instrument:
+            conditions.append("runs.instrument = ?")
+            parameters.append(instrument)
+        if since:
+            conditions.append("runs.run_date >= ?")
+            parameters.append(since.isoformat())
+        if below is not None:
+            conditions.append("lane_metrics.value < ?")
+            parameters.append(below)
+        if above is not None:
+            conditions.append("lane_metrics.value > ?")
+            parameters.append(above)
+
+        query = ("SELECT runs.run_id, runs.runfolder, runs.instrument, runs.instrument_and_reagent_type, "
+                 "runs.read_length, runs.run_date, runs.exit_status, "
+                 "lane_metrics.metric, lane_metrics.lane, lane_metrics.read, lane_metrics.value "
+                 "FROM runs JOIN lane_metrics ON lane_metrics.run = runs.id "
+                 "WHERE {} ORDER BY runs.run_date DESC, runs.run_id, lane_metrics.lane, lane_metrics.read"
+                 ).format(" AND ".join(conditions))
+
+        with self._connect() as connection:
+            return [dict(row) for row in connection.execute(query, parameters)]
+
+    @staticmethod
+    def months_ago(months, today=None):
+        """
+        Utility method to get the date a number of months back in time.
+
+        :param months: number of months back in time
+        :param today: the date to count from, if None today's date is used
+        :returns: a datetime.date
+        """
+        if not today:
+            today = datetime.date.today()
+        month_index = today.year * 12 + (today.month - 1) - months
+        year, month = divmod(month_index, 12)
+        for day in range(today.day, 0, -1):
+            try:
+                return datetime.date(year, month + 1, day)
+            except ValueError:
+                continue
+
+
+@click.command("checkqc-query")
+@click.argument("results_db", type=click.Path(exists=True))
+@click.option("--metric", help="Name of the metric to query, e.g. percent_q30, error_rate or clusters_pf",
+              default="percent_q30")
+@click.option("--instrument", help="Only include runs on this instrument, e.g. D00118")
+@click.option("--below", help="Only include lanes where the metric was below this value", type=click.FLOAT)
+@click.option("--above", help="Only include lanes where the metric was above this value", type=click.FLOAT)
+@click.option("--months", help="Only include runs from the last number of months", type=click.INT)
+def start(results_db, metric, instrument, below, above, months):
+    """
+    Query the results of earlier checkQC runs stored in RESULTS_DB, and print the matching
+    lanes as json to stdout.
+    """
+    since = ResultsStore.months_ago(months) if months else None
+    results = ResultsStore(results_db).query_metrics(metric, instrument=instrument,
+                                                     below=below, above=above, since=since)
+    print(json.dumps(results))
+    sys.exit(0)
@@ -1,6 +1,8 @@
 
+import asyncio
 import os
 import logging
+import datetime
 import xmltodict
 
 from checkQC.exceptions import *
@@ -167,6 +169,19 @@ class RunTypeRecognizer(object):
         except FileNotFoundError:
             raise RunParametersNotFound("Could not find [R|r]unParameters.xml for runfolder {}".format(self._runfolder))
 
+    @staticmethod
+    async def create_async(config, runfolder):
+        """
+        Create a RunTypeRecognizer instance, reading the files of the runfolder in an executor so that
+        the event loop is not blocked
+
+        :param config: dictionary containing the app configuration
+        :param runfolder: to gather data about
+        :returns: a RunTypeRecognizer instance
+        """
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, RunTypeRecognizer, config, runfolder)
+
     def _find_run_parameters_xml(self):
         first_option = os.path.join(self._runfolder, "RunParameters.xml")
         second_option = os.path.join(self._runfolder, "runParameters.xml")
@@ -226,5 +241,32 @@ class RunTypeRecognizer(object):
 
         return "-".join(map(str, read_lengths))
 
+    def instrument_name(self):
+        """
+        The name of the instrument which the run was sequenced on, as specified in the RunInfo.xml,
+        e.g. 'D00118'.
 
+        :returns: the instrument name as a string
+        """
+        return self.run_info["RunInfo"]["Run"]["Instrument"]
 
+    def run_id(self):
+        """
+        The id of the run as specified in the RunInfo.xml, e.g. '170726_D00118_0303_BCB1TVANXX'
+
+        :returns: the run id as a string
+        """
+        return self.run_info["RunInfo"]["Run"]["@Id"]
+
+    def run_date(self):
+        """
+        The date on which the run was started. This is picked up from the first part of the
+        run id, which Illumina instruments format as YYMMDD.
+
+        :returns: a datetime.date, or None if the date could not be determined
+        """
+        try:
+            return datetime.datetime.strptime(self.run_id().split("_")[0], "%y%m%d").date()
+        except (ValueError, KeyError):
+            log.warning("Could not determine run date from run id of runfolder: {}".format(self._runfolder))
+            return None
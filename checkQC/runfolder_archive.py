@@ -0,0 +1,217 @@
+import fnmatch
+import json
+import logging
+import os
+import shutil
+import tarfile
+import tempfile
+import zipfile
+
+from checkQC.runfolder_io import RunfolderPrefetcher
+
+log = logging.getLogger(__name__)
+
+
+class RunfolderArchive(object):
+    """
+    A RunfolderArchive gives random access to the members of a runfolder which has been archived as a tar (possibly
+    compressed) or zip file, without extracting the archive.
+
+    To find the members of a tar file all of its headers have to be read, which for a large archive means reading
+    through (or, if it is compressed, decompressing) a large part of the archive. Therefore an index of the offsets
+    and sizes of the members is built once, and cached in a file next to the archive (`<archive>.checkqc_index.json`).
+    The cached index is used as long as the size and modification time of the archive are unchanged.
+
+    Member paths are given relative to the runfolder, i.e. if all members are located in a single top-level
+    directory (e.g. `170726_D00118_0303_BCB1TVANXX/RunInfo.xml`), that directory is left out (`RunInfo.xml`).
+    """
+
+    INDEX_SUFFIX = ".checkqc_index.json"
+
+    def __init__(self, archive_path):
+        """
+        Create a RunfolderArchive instance
+
+        :param archive_path: path to the tar or zip file
+        """
+        self.archive_path = archive_path
+        self.index_path = archive_path + self.INDEX_SUFFIX
+        self.is_zip = zipfile.is_zipfile(archive_path)
+        self.runfolder_name = None
+        self._members = None
+
+    @staticmethod
+    def is_archive(path):
+        """
+        Check if a path is a tar or zip archive
+
+        :param path: the path to check
+        :returns: True if the path is a tar or zip file, else False
+        """
+        return os.path.isfile(path) and (zipfile.is_zipfile(path) or tarfile.is_tarfile(path))
+
+    def _fingerprint(self):
+        stat = os.stat(self.archive_path)
+        return [stat.st_size, stat.st_mtime]
+
+    def _load_index(self):
+        try:
+            with open(self.index_path) as f:
+                index = json.load(f)
+        except (IOError, ValueError):
+            return None
+        if index.get("fingerprint") != self._fingerprint():
+            log.info("The archive {} has changed since it was indexed".format(self.archive_path))
+            return None
+        return index
+
+    def _build_index(self):
+        log.info("Indexing the members of {}".format(self.archive_path))
+        members = {}
+        if self.is_zip:
+            with zipfile.ZipFile(self.archive_path) as archive:
+                for info in archive.infolist():
+                    if not info.filename.endswith("/"):
+                        members[info.filename] = [info.header_offset, info.file_size]
+        else:
+            with tarfile.open(self.archive_path) as archive:
+                for member in archive:
+                    if member.isfile():
+                        members[member.name] = [member.offset_data, member.size]
+
+        top_level_names = set(name.split("/", 1)[0] for name in members)
+        runfolder_name = None
+        if len(top_level_names) == 1 and all("/" in name for name in members):
+            runfolder_name = top_level_names.pop()
+
+        index = {"fingerprint": self._fingerprint(), "runfolder_name": runfolder_name, "members": members}
+        try:
+            with open(self.index_path, "w") as f:
+                json.dump(index, f)
+        except IOError as e:
+            log.warning("Could not cache the index of {}: {}".format(self.archive_path, e))
+        return index
+
+    def _index(self):
+        if self._members is None:
+            index = self._load_index() or self._build_index()
+            self.runfolder_name = index["runfolder_name"]
+            prefix = self.runfolder_name + "/" if self.runfolder_name else ""
+            self._members = {name[len(prefix):]: (name, offset, size)
+                             for name, (offset, size) in index["members"].items()}
+        return self._members
+
+    def members(self, pattern="*"):
+        """
+        List the members of the archive
+
+        :param pattern: a glob pattern which the members should match, e.g. 'InterOp/*'
+        :returns: a sorted list of paths to the members, relative to the runfolder
+        """
+        return sorted(name for name in self._index() if fnmatch.fnmatchcase(name, pattern))
+
+    def read(self, paths):
+        """
+        Read members of the archive
+
+        :param paths: the paths of the members to read, relative to the runfolder
+        :returns: a dict of the paths to the content of the members (as bytes)
+        :raises: KeyError if a path is not a member of the archive
+        """
+        members = self._index()
+        # Reading the members in the order they are stored means that a compressed
+        # archive only has to be decompressed once, by seeking forwards.
+        paths = sorted(paths, key=lambda path: members[path][1])
+        contents = {}
+        if self.is_zip:
+            with zipfile.ZipFile(self.archive_path) as archive:
+                for path in paths:
+                    contents[path] = archive.read(members[path][0])
+        else:
+            with tarfile.open(self.archive_path) as archive:
+                for path in paths:
+                    _, offset, size = members[path]
+                    archive.fileobj.seek(offset)
+                    contents[path] = archive.fileobj.read(size)
+        return contents
+
+
+class ArchivedRunfolder(object):
+    """
+    An ArchivedRunfolder makes a runfolder archive available to checkQC. The small files which are read as files
+    (the run info and parameters xml files, Stats.json and the bcl-convert reports) are written to a temporary
+    runfolder in a scratch directory. The Interop files are not written to disk, instead the InterOp metrics are
+    loaded from in-memory buffers read from the archive (`archive`), which is given to the parsers by the QCEngine
+    (see `checkQC.parsers.data_sources`).
+
+    It should be used as a context manager, which gives the path of the temporary runfolder, e.g.:
+
+    .. code-block :: python
+
+        with ArchivedRunfolder("/archive/170726_D00118_0303_BCB1TVANXX.tar", parser_configurations) as runfolder:
+            ...
+    """
+
+    def __init__(self, archive_path, parser_configurations=None, scratch_dir=None):
+        """
+        Create a ArchivedRunfolder instance
+
+        :param archive_path: path to the tar or zip file
+        :param parser_configurations: dict containing the parser configurations, used to find the
+                                      bcl2fastq and bcl-convert output
+        :param scratch_dir: directory in which to create the temporary runfolder, if None the default
+                            temporary directory is used
+        """
+        self.archive = RunfolderArchive(archive_path)
+        self.parser_configurations = parser_configurations or {}
+        self.scratch_dir = scratch_dir
+        self.runfolder = None
+
+    def _files_to_extract(self):
+        patterns = list(RunfolderPrefetcher.TOP_LEVEL_FILES)
+        output_paths = [(RunfolderPrefetcher.STATS_JSON, "StatsJsonParser", "bcl2fastq_output_path")] + \
+                       [(report, "BclConvertParser", "bclconvert_output_path")
+                        for report in RunfolderPrefetcher.BCLCONVERT_REPORTS]
+        for path, parser_name, key in output_paths:
+            parser_conf = self.parser_configurations.get(parser_name) or {}
+            output_path = parser_conf.get(key) or RunfolderPrefetcher.DEFAULT_OUTPUT_PATH
+            patterns.append(os.path.normpath(os.path.join(output_path, path)))
+        members = set(self.archive.members())
+        return [pattern for pattern in patterns if pattern in members]
+
+    def open(self):
+        """
+        Create the temporary runfolder
+
+        :returns: path to the temporary runfolder
+        """
+        files = self._files_to_extract()
+        runfolder_name = self.archive.runfolder_name or os.path.basename(self.archive.archive_path).split(".")[0]
+        self.runfolder = os.path.join(tempfile.mkdtemp(prefix="checkqc_", dir=self.scratch_dir), runfolder_name)
+        os.makedirs(self.runfolder)
+        if self.archive.members("InterOp/*"):
+            os.makedirs(os.path.join(self.runfolder, "InterOp"))
+
+        for path, content in self.archive.read(files).items():
+            destination = os.path.join(self.runfolder, path)
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            with open(destination, "wb") as f:
+                f.write(content)
+        log.info("Extracted {} files from {} to {}".format(len(files), self.archive.archive_path, self.runfolder))
+        return self.runfolder
+
+    def close(self):
+        """
+        Remove the temporary runfolder
+
+        :returns: None
+        """
+        if self.runfolder:
+            shutil.rmtree(os.path.dirname(self.runfolder), ignore_errors=True)
+            self.runfolder = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,167 @@
+import datetime
+import logging
+import os
+import threading
+import time
+from xml.parsers.expat import ExpatError
+
+from checkQC.run_type_recognizer import RunTypeRecognizer
+from checkQC.results_store import ResultsStore
+from checkQC.exceptions import CheckQCException
+
+log = logging.getLogger(__name__)
+
+
+class RunfolderCatalogue(object):
+    """
+    The RunfolderCatalogue keeps an in-memory index of the runfolders in a directory (e.g. the monitor path of
+    checkqc-ws), with the run type, completion state and last QC status of each runfolder.
+
+    The index is updated incrementally: each refresh lists the directory once with `os.scandir`, and only the
+    runfolders which are new, or whose modification time has changed since they were indexed (e.g. because
+    `RTAComplete.txt` has been written), are read again. Runfolders which have been removed are dropped.
+    Runfolders which could not be read (e.g. since their RunInfo.xml is still being written) are listed with
+    the error, and are read again on the next refresh.
+
+    The last QC status of a runfolder is what was recorded with `record_qc_status`, or if a results database is
+    used, what was stored there the last time the runfolder was checked.
+    """
+
+    COMPLETION_MARKERS = (("sequencing_complete", "RTAComplete.txt"),
+                          ("copy_complete", "CopyComplete.txt"))
+
+    def __init__(self, monitor_path, config=None, results_db=None, min_refresh_interval=5):
+        """
+        Create a RunfolderCatalogue instance
+
+        :param monitor_path: path to the directory containing the runfolders
+        :param config: the checkQC configuration
+        :param results_db: path to a results database to get the last QC status of runfolders from (optional)
+        :param min_refresh_interval: minimum number of seconds between two refreshes of the index
+        """
+        self.monitor_path = monitor_path
+        self.config = config
+        self.results_db = results_db
+        self.min_refresh_interval = min_refresh_interval
+        self._entries = {}
+        self._mtimes = {}
+        self._qc_statuses = {}
+        self._last_refresh = None
+        self._lock = threading.Lock()
+
+    def _index_runfolder(self, name, path):
+        entry = {"runfolder": name,
+                 "run_id": None,
+                 "instrument": None,
+                 "instrument_and_reagent_type": None,
+                 "read_length": None,
+                 "error": None}
+        for key, marker in self.COMPLETION_MARKERS:
+            entry[key] = os.path.isfile(os.path.join(path, marker))
+
+        try:
+            run_type_recognizer = RunTypeRecognizer(config=self.config, runfolder=path)
+            entry["run_id"] = run_type_recognizer.run_id()
+            entry["instrument"] = run_type_recognizer.instrument_name()
+            entry["read_length"] = run_type_recognizer.read_length()
+            entry["instrument_and_reagent_type"] = run_type_recognizer.instrument_and_reagent_version()
+        except (CheckQCException, ExpatError, OSError, ValueError, KeyError, TypeError) as e:
+            entry["error"] = "Could not determine the run type: {}".format(e)
+
+        if name not in self._qc_statuses:
+            stored_qc_status = self._stored_qc_status(entry["run_id"])
+            if stored_qc_status:
+                self._qc_statuses[name] = stored_qc_status
+        return entry
+
+    def _stored_qc_status(self, run_id):
+        if not self.results_db or not run_id:
+            return None
+        run = ResultsStore(self.results_db).get_run(run_id)
+        if not run:
+            return None
+        return {"exit_status": run["exit_status"], "checked_at": run["checked_at"]}
+
+    def refresh(self, force=False):
+        """
+        Update the index with the runfolders which have been added, changed or removed since the last refresh
+
+        :param force: if True refresh the index even if it was refreshed less than `min_refresh_interval`
+                      seconds ago
+        :returns: None
+        """
+        with self._lock:
+            now = time.monotonic()
+            if not force and self._last_refresh is not None and \
+                    now - self._last_refresh < self.min_refresh_interval:
+                return
+
+            seen = set()
+            for dir_entry in os.scandir(self.monitor_path):
+                if not dir_entry.is_dir():
+                    continue
+                seen.add(dir_entry.name)
+                mtime = dir_entry.stat().st_mtime
+                if self._mtimes.get(dir_entry.name) == mtime:
+                    continue
+                entry = self._index_runfolder(dir_entry.name, dir_entry.path)
+                self._entries[dir_entry.name] = entry
+                if entry["error"] is None:
+                    self._mtimes[dir_entry.name] = mtime
+                else:
+                    # The modification time is not kept, so that the runfolder is read again on the next refresh
+                    self._mtimes.pop(dir_entry.name, None)
+
+            for name in set(self._entries) - seen:
+                del self._entries[name]
+                self._mtimes.pop(name, None)
+                self._qc_statuses.pop(name, None)
+            self._last_refresh = now
+
+    def record_qc_status(self, runfolder, exit_status, checked_at=None):
+        """
+        Record the result of checking a runfolder
+
+        :param runfolder: name of the runfolder (relative to the monitor path)
+        :param exit_status: the exit status of the check
+        :param checked_at: a datetime.datetime on which the check was done, if None the current time is used
+        :returns: None
+        """
+        checked_at = checked_at if checked_at is not None else datetime.datetime.now()
+        with self._lock:
+            self._qc_statuses[runfolder] = {"exit_status": exit_status,
+                                            "checked_at": checked_at.strftime("%Y-%m-%dT%H:%M:%S")}
+
+    def query(self, instrument=None, instrument_and_reagent_type=None, complete=None, status=None,
+              offset=0, limit=100):
+        """
+        List the indexed runfolders, newest first (by name, since runfolder names start with the run date)
+
+        :param instrument: only list runfolders sequenced on this instrument, e.g. 'D00118'
+        :param instrument_and_reagent_type: only list runfolders of this run type, e.g. 'hiseqx_v2'
+        :param complete: if True only list runfolders where sequencing is complete, if False only those where it
+                         is not
+        :param status: only list runfolders with this QC status, one of 'passed', 'failed' or 'unchecked'
+        :param offset: number of matching runfolders to skip
+        :param limit: maximum number of runfolders to list
+        :returns: a dict with the total number of matching runfolders, and the runfolders of the requested page
+        """
+        with self._lock:
+            entries = [dict(self._entries[name], qc_status=self._qc_statuses.get(name))
+                       for name in sorted(self._entries, reverse=True)]
+
+        def qc_status(entry):
+            if not entry["qc_status"]:
+                return "unchecked"
+            return "passed" if entry["qc_status"]["exit_status"] == 0 else "failed"
+
+        matching = [entry for entry in entries
+                    if (instrument is None or entry["instrument"] == instrument) and
+                    (instrument_and_reagent_type is None or
+                     entry["instrument_and_reagent_type"] == instrument_and_reagent_type) and
+                    (complete is None or entry["sequencing_complete"] == complete) and
+                    (status is None or qc_status(entry) == status)]
+        return {"total": len(matching),
+                "offset": offset,
+                "limit": limit,
+                "runfolders": matching[offset:offset + limit]}
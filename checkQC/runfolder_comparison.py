@@ -0,0 +1,272 @@
+import array
+import concurrent.futures
+import csv
+import itertools
+import json
+import logging
+import os
+import statistics
+import sys
+
+import click
+
+from checkQC.app import App
+from checkQC.log_setup import configure_logging
+from checkQC import __version__ as checkqc_version
+
+log = logging.getLogger(__name__)
+
+
+def check_runfolder(runfolder, config_file=None):
+    """
+    Run checkQC on a single runfolder. This is what each of the worker processes of a RunfolderComparison
+    will run, so it should only return the (small) results, not any of the parsed data.
+
+    :param runfolder: path to the runfolder to check
+    :param config_file: path to the checkQC configuration file, or None to use the default configuration
+    :returns: a dict with the runfolder, its exit status, its reports and the metrics collected by the handlers
+    """
+    app = App(runfolder=runfolder, config_file=config_file)
+    reports = app.configure_and_run()
+    return {"runfolder": runfolder,
+            "exit_status": app.exit_status,
+            "reports": reports or {},
+            "metrics": app.metrics}
+
+
+class MetricsTable(object):
+    """
+    A columnar table of the metrics collected for a number of runfolders. Each row holds a single metric
+    for a lane (and read) of one runfolder. The columns are kept as compact arrays, so that the table
+    stays small even when it holds the metrics of hundreds of runs.
+    """
+
+    NO_READ = 0
+
+    def __init__(self):
+        self.runfolders = []
+        self.metric_names = []
+        self._metric_indexes = {}
+        self.runfolder_column = array.array("I")
+        self.metric_column = array.array("I")
+        self.lane_column = array.array("I")
+        self.read_column = array.array("I")
+        self.value_column = array.array("d")
+
+    def __len__(self):
+        return len(self.value_column)
+
+    def add_runfolder(self, runfolder, metrics):
+        """
+        Add the metrics of a runfolder to the table
+
+        :param runfolder: the runfolder the metrics were collected for
+        :param metrics: an iterable of metric dicts, as given by `QCHandler.metrics`
+        :returns: None
+        """
+        runfolder_index = len(self.runfolders)
+        self.runfolders.append(runfolder)
+        for metric in metrics:
+            if metric["value"] is None:
+                continue
+            metric_index = self._metric_indexes.get(metric["metric"])
+            if metric_index is None:
+                metric_index = len(self.metric_names)
+                self._metric_indexes[metric["metric"]] = metric_index
+                self.metric_names.append(metric["metric"])
+            self.runfolder_column.append(runfolder_index)
+            self.metric_column.append(metric_index)
+            self.lane_column.append(metric["lane"])
+            self.read_column.append(metric.get("read") or self.NO_READ)
+            self.value_column.append(metric["value"])
+
+    def row(self, i):
+        """
+        Get a row of the table
+
+        :param i: index of the row
+        :returns: a dict representing the row
+        """
+        read = self.read_column[i]
+        return {"runfolder": self.runfolders[self.runfolder_column[i]],
+                "metric": self.metric_names[self.metric_column[i]],
+                "lane": self.lane_column[i],
+                "read": read if read != self.NO_READ else None,
+                "value": self.value_column[i]}
+
+    def robust_z_scores(self):
+        """
+        Compute a robust z-score for each row, i.e. how many (scaled) median absolute deviations the value
+        is from the median of all values of the same metric and read across all runfolders.
+
+        :returns: an array with the z-score of each row, the z-score is 0 if the deviation is 0 for the group
+        """
+        groups = {}
+        for i, key in enumerate(zip(self.metric_column, self.read_column)):
+            groups.setdefault(key, array.array("I")).append(i)
+
+        z_scores = array.array("d", itertools.repeat(0.0, len(self)))
+        for indexes in groups.values():
+            values = [self.value_column[i] for i in indexes]
+            median = statistics.median(values)
+            median_absolute_deviation = statistics.median([abs(value - median) for value in values])
+            if median_absolute_deviation == 0:
+                continue
+            for i, value in zip(indexes, values):
+                # 0.6745 is the 75th percentile of the standard normal distribution,
+                # making the score comparable to a normal z-score
+                z_scores[i] = 0.6745 * (value - median) / median_absolute_deviation
+        return z_scores
+
+    def write_tsv(self, stream, z_scores, outlier_threshold):
+        """
+        Write the table as tab separated values
+
+        :param stream: a writable file-like object
+        :param z_scores: the robust z-score for each row
+        :param outlier_threshold: rows with an absolute z-score above this are flagged as outliers
+        :returns: None
+        """
+        writer = csv.writer(stream, delimiter="\t", lineterminator="\n")
+        writer.writerow(["runfolder", "metric", "lane", "read", "value", "robust_z_score", "outlier"])
+        for i in range(len(self)):
+            row = self.row(i)
+            writer.writerow([row["runfolder"], row["metric"], row["lane"],
+                             row["read"] if row["read"] is not None else "",
+                             row["value"], "{:.3f}".format(z_scores[i]), int(abs(z_scores[i]) > outlier_threshold)])
+
+
+class RunfolderComparison(object):
+    """
+    RunfolderComparison runs checkQC over a number of runfolders in parallel, e.g. all runs from one flowcell
+    lot, and gathers their metrics into a single MetricsTable. Each runfolder is checked in a separate process,
+    and only a bounded number of runfolders are in flight at once. As soon as a runfolder has been checked its
+    results are added to the aggregate, so memory use does not grow with the parsed data of every run.
+
+    Once all runfolders have been checked, values which deviate strongly from the values of the other runs
+    (as measured by a robust z-score) are flagged as outliers.
+
+    If checking a runfolder fails, the error is recorded for that runfolder, and the other runfolders are still
+    compared. If a worker process dies, the runfolders which were being checked by the pool at that time get an
+    error, and new worker processes are started for the remaining runfolders.
+    """
+
+    def __init__(self, runfolders, config_file=None, processes=None, outlier_threshold=3.5):
+        """
+        Create a RunfolderComparison instance
+
+        :param runfolders: a list of paths to the runfolders to compare
+        :param config_file: path to the checkQC configuration file, or None to use the default configuration
+        :param processes: the number of worker processes, if None the number of CPUs is used
+        :param outlier_threshold: values with an absolute robust z-score above this are flagged as outliers
+        """
+        self.runfolders = runfolders
+        self.config_file = config_file
+        self.processes = processes
+        self.outlier_threshold = outlier_threshold
+        self.metrics_table = MetricsTable()
+        self.runs = []
+        self.z_scores = None
+        self.exit_status = 0
+
+    def _checked_runfolders(self):
+        processes = self.processes or os.cpu_count() or 1
+        max_in_flight = 2 * processes
+        runfolders = iter(self.runfolders)
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers=processes)
+        pending = {}
+        try:
+            while True:
+                for runfolder in itertools.islice(runfolders, max_in_flight - len(pending)):
+                    try:
+                        future = executor.submit(check_runfolder, runfolder, self.config_file)
+                    except concurrent.futures.process.BrokenProcessPool:
+                        log.warning("A worker process died, starting new worker processes")
+                        executor.shutdown(wait=False)
+                        executor = concurrent.futures.ProcessPoolExecutor(max_workers=processes)
+                        future = executor.submit(check_runfolder, runfolder, self.config_file)
+                    pending[future] = runfolder
+                if not pending:
+                    break
+                done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    runfolder = pending.pop(future)
+                    try:
+                        yield future.result()
+                    except Exception as e:
+                        log.error("Could not check {}: {}".format(runfolder, e))
+                        yield {"runfolder": runfolder,
+                               "exit_status": 1,
+                               "reports": {},
+                               "metrics": [],
+                               "error": "{}: {}".format(type(e).__name__, e)}
+        finally:
+            executor.shutdown()
+
+    def _add_result(self, result):
+        self.metrics_table.add_runfolder(result["runfolder"], result["metrics"])
+        reports = result["reports"]
+        report_types = [report["type"]
+                        for handler_reports in reports.values() if isinstance(handler_reports, list)
+                        for report in handler_reports]
+        run = {"runfolder": result["runfolder"],
+               "exit_status": result["exit_status"],
+               "errors": report_types.count("error"),
+               "warnings": report_types.count("warning"),
+               "reports": reports}
+        if "error" in result:
+            run["error"] = result["error"]
+        self.runs.append(run)
+        if result["exit_status"] != 0:
+            self.exit_status = 1
+
+    def run(self):
+        """
+        Check all runfolders and compile a combined report
+
+        :returns: a dict with the per run results, and the outliers found when comparing the runs
+        """
+        for result in self._checked_runfolders():
+            log.info("Finished checking {}".format(result["runfolder"]))
+            self._add_result(result)
+
+        self.z_scores = self.metrics_table.robust_z_scores()
+        outliers = []
+        for i, z_score in enumerate(self.z_scores):
+            if abs(z_score) > self.outlier_threshold:
+                outlier = self.metrics_table.row(i)
+                outlier["robust_z_score"] = z_score
+                outliers.append(outlier)
+
+        order = {runfolder: i for i, runfolder in enumerate(self.runfolders)}
+        self.runs.sort(key=lambda run: order[run["runfolder"]])
+        return {"exit_status": self.exit_status,
+                "runs": self.runs,
+                "outliers": outliers,
+                "version": checkqc_version}
+
+
+@click.command("checkqc-compare")
+@click.option("--config", help="Path to the checkQC configuration file", type=click.Path())
+@click.option("--processes", help="Number of runfolders to check in parallel (default: number of CPUs)",
+              type=click.INT)
+@click.option("--outlier_threshold", help="Flag values with a robust z-score above this as outliers (default: 3.5)",
+              type=click.FLOAT, default=3.5)
+@click.option("--tsv", help="Write the metrics of all runfolders to this file as tab separated values",
+              type=click.Path())
+@click.argument('runfolders', type=click.Path(), nargs=-1, required=True)
+def start(config, processes, outlier_threshold, tsv, runfolders):
+    """
+    Run checkQC on a set of runfolders in parallel, compare their metrics and print a combined report
+    as json to stdout. Will exit with a non-zero exit status if any of the runfolders had fatal qc errors.
+    """
+    # The runfolders are checked in worker processes, which would not run the thread of a logging queue
+    configure_logging(use_queue=False)
+    comparison = RunfolderComparison(list(runfolders), config_file=config, processes=processes,
+                                     outlier_threshold=outlier_threshold)
+    report = comparison.run()
+    if tsv:
+        with open(tsv, "w") as f:
+            comparison.metrics_table.write_tsv(f, comparison.z_scores, outlier_threshold)
+    print(json.dumps(report))
+    sys.exit(comparison.exit_status)
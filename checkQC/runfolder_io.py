@@ -0,0 +1,166 @@
+import concurrent.futures
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+log = logging.getLogger(__name__)
+
+
+class RunfolderPrefetcher(object):
+    """
+    The RunfolderPrefetcher reads all files of a runfolder which checkQC needs (the run info and parameters,
+    the InterOp files, and the Stats.json or bcl-convert reports) up front, using large sequential reads which
+    can be run in parallel. This is useful when the runfolder is located on a network filesystem, such as NFS
+    or Lustre, where the many small stat/open/read calls of the parsers would otherwise each cost a round-trip
+    to the server.
+
+    The files are either only read, to get them into the page cache of the local node, or copied into a mirror
+    of the runfolder in a local scratch directory. In the mirror, all other entries of the runfolder are
+    symlinked to the original, so that the mirror can be used in place of the runfolder.
+
+    It can be used as a context manager, which gives the path of the runfolder to read from, and removes the
+    mirror (if any) on exit:
+
+    .. code-block :: python
+
+        with RunfolderPrefetcher(runfolder, parser_configurations, scratch_dir="/scratch") as local_runfolder:
+            ...
+    """
+
+    TOP_LEVEL_FILES = ("RunInfo.xml", "RunParameters.xml", "runParameters.xml",
+                       "RTAComplete.txt", "CopyComplete.txt")
+    DIRECTORIES = ("InterOp",)
+    STATS_JSON = "Stats/Stats.json"
+    BCLCONVERT_REPORTS = ("Reports/Demultiplex_Stats.csv", "Reports/Top_Unknown_Barcodes.csv",
+                          "Reports/Quality_Metrics.csv")
+    DEFAULT_OUTPUT_PATH = "Data/Intensities/BaseCalls"
+    BLOCK_SIZE = 4 * 1024 * 1024
+
+    def __init__(self, runfolder, parser_configurations=None, scratch_dir=None, threads=4):
+        """
+        Create a RunfolderPrefetcher instance
+
+        :param runfolder: path to the runfolder to prefetch
+        :param parser_configurations: dict containing the parser configurations, used to find the
+                                      bcl2fastq and bcl-convert output
+        :param scratch_dir: a local directory in which to create a mirror of the runfolder. If None, the files
+                            will only be read into the page cache.
+        :param threads: number of files to read in parallel
+        """
+        self.runfolder = runfolder
+        self.parser_configurations = parser_configurations or {}
+        self.scratch_dir = scratch_dir
+        self.threads = threads
+        self.mirror = None
+        self.files = []
+        self.bytes_read = 0
+        self.seconds = 0.0
+
+    def _output_path(self, parser_name, key):
+        parser_conf = self.parser_configurations.get(parser_name) or {}
+        return parser_conf.get(key) or self.DEFAULT_OUTPUT_PATH
+
+    def _files_in(self, relative_dir, names=None):
+        try:
+            return [os.path.join(relative_dir, entry.name)
+                    for entry in os.scandir(os.path.join(self.runfolder, relative_dir))
+                    if entry.is_file() and (names is None or entry.name in names)]
+        except (FileNotFoundError, NotADirectoryError):
+            return []
+
+    def required_files(self):
+        """
+        Find the files of the runfolder which checkQC will read
+
+        :returns: a list of paths to the files, relative to the runfolder
+        """
+        files = self._files_in("", self.TOP_LEVEL_FILES)
+        for directory in self.DIRECTORIES:
+            files.extend(self._files_in(directory))
+
+        for path, parser_name, key in [(self.STATS_JSON, "StatsJsonParser", "bcl2fastq_output_path")] + \
+                                      [(report, "BclConvertParser", "bclconvert_output_path")
+                                       for report in self.BCLCONVERT_REPORTS]:
+            relative_dir, name = os.path.split(os.path.join(self._output_path(parser_name, key), path))
+            files.extend(self._files_in(relative_dir, (name, )))
+        return sorted(set(os.path.normpath(f) for f in files))
+
+    def _fetch(self, relative_path):
+        bytes_read = 0
+        destination = None
+        try:
+            if self.mirror:
+                destination = open(os.path.join(self.mirror, relative_path), "wb")
+            with open(os.path.join(self.runfolder, relative_path), "rb", buffering=0) as source:
+                while True:
+                    block = source.read(self.BLOCK_SIZE)
+                    if not block:
+                        break
+                    bytes_read += len(block)
+                    if destination:
+                        destination.write(block)
+        finally:
+            if destination:
+                destination.close()
+        return bytes_read
+
+    def _link_remaining_entries(self):
+        directories = {""}
+        for relative_path in self.files:
+            directory = os.path.dirname(relative_path)
+            while directory:
+                directories.add(directory)
+                directory = os.path.dirname(directory)
+
+        for directory in directories:
+            for entry in os.scandir(os.path.join(self.runfolder, directory)):
+                link = os.path.join(self.mirror, directory, entry.name)
+                if not os.path.lexists(link):
+                    os.symlink(os.path.abspath(entry.path), link)
+
+    def prefetch(self):
+        """
+        Read all files required by checkQC, and copy them into the scratch directory if one has been given
+
+        :returns: the path to the runfolder which should be read from, i.e. the mirror or the original runfolder
+        """
+        start = time.time()
+        self.files = self.required_files()
+
+        if self.scratch_dir:
+            self.mirror = os.path.join(tempfile.mkdtemp(prefix="checkqc_", dir=self.scratch_dir),
+                                       os.path.basename(os.path.normpath(self.runfolder)))
+            os.makedirs(self.mirror)
+            for directory in set(os.path.dirname(f) for f in self.files):
+                os.makedirs(os.path.join(self.mirror, directory), exist_ok=True)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.threads) as executor:
+            self.bytes_read = sum(executor.map(self._fetch, self.files))
+
+        if self.mirror:
+            self._link_remaining_entries()
+
+        self.seconds = time.time() - start
+        log.info("Prefetched {} files ({} bytes) from {} in {:.2f} seconds".format(len(self.files),
+                                                                               self.bytes_read,
+                                                                               self.runfolder,
+                                                                               self.seconds))
+        return self.mirror or self.runfolder
+
+    def cleanup(self):
+        """
+        Remove the mirror of the runfolder, if one has been created
+
+        :returns: None
+        """
+        if self.mirror:
+            shutil.rmtree(os.path.dirname(self.mirror), ignore_errors=True)
+            self.mirror = None
+
+    def __enter__(self):
+        return self.prefetch()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.cleanup()
@@ -0,0 +1,172 @@
+import gzip
+import json
+import logging
+import os
+from collections import OrderedDict
+
+from checkQC.runfolder_io import RunfolderPrefetcher
+from checkQC.parsers.fastq_parser import FastqParser
+from checkQC.exceptions import FastqNotFound
+from checkQC import __version__ as checkqc_version
+
+log = logging.getLogger(__name__)
+
+
+class Sidecar(object):
+    """
+    A Sidecar is a compact summary of a checked runfolder, written next to the data as `checkqc_summary.json.gz`.
+    It holds the values the parsers extracted from the runfolder, the run type, the reports and metrics of the
+    check, and a fingerprint (size and modification time) of each input file, including the sampled fastq files
+    if the values of the FastqParser are recorded.
+
+    Only the parts of the values which the handlers read are written, e.g. the number of reads and index of each
+    sample rather than all of DemuxResults, and values no handler reads (like the Flowcell) are left out.
+
+    As long as the fingerprint matches the runfolder, the recorded parser values can be replayed into the
+    handlers, so that a runfolder can be checked again (e.g. with a different configuration) without re-reading
+    the InterOp files or Stats.json.
+
+    For a runfolder which is an archive, the sidecar is written next to the archive as
+    `<archive>.checkqc_summary.json.gz`.
+    """
+
+    FILE_NAME = "checkqc_summary.json.gz"
+    FORMAT_VERSION = 2
+
+    # Values sent by the StatsJsonParser which no handler reads
+    UNUSED_SIGNALS = ("Flowcell", "RunNumber", "RunId", "ReadInfosForLanes")
+    LANE_KEYS = ("LaneNumber", "TotalClustersPF", "Yield")
+    SAMPLE_KEYS = ("SampleId", "NumberReads")
+
+    def __init__(self, runfolder, parser_configurations=None):
+        """
+        Create a Sidecar instance
+
+        :param runfolder: path to the runfolder (or runfolder archive)
+        :param parser_configurations: dict containing the parser configurations, used to find the
+                                      bcl2fastq and bcl-convert output
+        """
+        self.runfolder = runfolder
+        self.parser_configurations = parser_configurations
+        if os.path.isfile(runfolder):
+            self.path = "{}.{}".format(runfolder, self.FILE_NAME)
+        else:
+            self.path = os.path.join(runfolder, self.FILE_NAME)
+
+    def _fastq_files(self):
+        try:
+            fastq_parser = FastqParser(self.runfolder, self.parser_configurations)
+        except FastqNotFound:
+            return []
+        return [fastq_file["path"] for fastq_file in fastq_parser.fastq_files]
+
+    def fingerprint(self, parser_names=()):
+        """
+        Compute the fingerprint of the input files of the runfolder
+
+        :param parser_names: names of the Parsers whose values are recorded. The fastq files are only part of the
+                             fingerprint if the values of the FastqParser are recorded, since finding them means
+                             walking the output directory.
+        :returns: a dict of paths (relative to the runfolder) to the size and modification time of the file
+        """
+        if os.path.isfile(self.runfolder):
+            files = {os.path.basename(self.runfolder): self.runfolder}
+        else:
+            files = {f: os.path.join(self.runfolder, f)
+                     for f in RunfolderPrefetcher(self.runfolder, self.parser_configurations).required_files()}
+            if FastqParser.__name__ in parser_names:
+                files.update((os.path.relpath(path, self.runfolder), path) for path in self._fastq_files())
+
+        fingerprint = {}
+        for relative_path, path in files.items():
+            stat = os.stat(path)
+            fingerprint[relative_path] = [stat.st_size, stat.st_mtime]
+        return fingerprint
+
+    def load(self):
+        """
+        Load the sidecar
+
+        :returns: a dict with the content of the sidecar, or None if there is no sidecar or if it is out of
+                  date, i.e. if the input files of the runfolder have changed since it was written
+        """
+        if not os.path.isfile(self.path):
+            return None
+        try:
+            with gzip.open(self.path, "rt") as f:
+                sidecar = json.load(f, object_pairs_hook=OrderedDict)
+        except (IOError, ValueError) as e:
+            log.warning("Could not read the sidecar {}: {}".format(self.path, e))
+            return None
+
+        if sidecar.get("format_version") != self.FORMAT_VERSION:
+            log.info("Ignoring sidecar {} written in an old format".format(self.path))
+            return None
+        if sidecar.get("fingerprint") != self.fingerprint(sidecar.get("signals", {})):
+            log.info("Ignoring sidecar {} since the runfolder has changed since it was written".format(self.path))
+            return None
+        log.info("Using the values recorded in {}".format(self.path))
+        return sidecar
+
+    @classmethod
+    def _compact_conversion_results(cls, conversion_results):
+        compact_lanes = []
+        for lane_dict in conversion_results:
+            compact_lane = OrderedDict((key, lane_dict[key]) for key in cls.LANE_KEYS if key in lane_dict)
+            if lane_dict.get("Undetermined"):
+                compact_lane["Undetermined"] = {"Yield": lane_dict["Undetermined"]["Yield"]}
+            compact_lane["DemuxResults"] = []
+            for sample_dict in lane_dict.get("DemuxResults", []):
+                compact_sample = OrderedDict((key, sample_dict[key]) for key in cls.SAMPLE_KEYS)
+                if "IndexMetrics" in sample_dict:
+                    compact_sample["IndexMetrics"] = [{"IndexSequence": index_metric["IndexSequence"]}
+                                                      for index_metric in sample_dict["IndexMetrics"]]
+                compact_lane["DemuxResults"].append(compact_sample)
+            compact_lanes.append(compact_lane)
+        return compact_lanes
+
+    @classmethod
+    def compact_signals(cls, signals):
+        """
+        Keep only the values, and the parts of them, which the handlers read
+
+        :param signals: a dict of Parser class names to the values they sent to the handlers
+        :returns: a dict of Parser class names to the compacted values
+        """
+        compact_signals = {}
+        for parser_name, parser_signals in signals.items():
+            compact_signals[parser_name] = []
+            for key, value in parser_signals:
+                if key in cls.UNUSED_SIGNALS:
+                    continue
+                if key == "ConversionResults":
+                    value = cls._compact_conversion_results(value)
+                compact_signals[parser_name].append((key, value))
+        return compact_signals
+
+    def write(self, run_type, signals, reports, metrics):
+        """
+        Write the sidecar
+
+        :param run_type: a dict describing the run type, e.g. the instrument and reagent type and read length
+        :param signals: a dict of Parser class names to the values they sent to the handlers, only the parts
+                        of them which the handlers read are written
+        :param reports: the reports of the check
+        :param metrics: the metrics collected by the handlers
+        :returns: True if the sidecar was written, else False
+        """
+        sidecar = {"format_version": self.FORMAT_VERSION,
+                   "checkqc_version": checkqc_version,
+                   "fingerprint": self.fingerprint(signals),
+                   "run_type": run_type,
+                   "signals": self.compact_signals(signals),
+                   "reports": reports,
+                   "metrics": metrics}
+        try:
+            with gzip.open(self.path, "wt") as f:
+                json.dump(sidecar, f, separators=(",", ":"))
+        except IOError as e:
+            log.warning("Could not write the sidecar {}: {}".format(self.path, e))
+            return False
+        log.info("Wrote sidecar: {}".format(self.path))
+        return True
@@ -1,4 +1,7 @@
 
+import asyncio
+import email.utils
+import json
 import logging
 import logging.config
 import os
@@ -11,32 +14,313 @@ from tornado.web import url
 
 from checkQC.app import App
 from checkQC.config import ConfigFactory
+from checkQC.results_store import ResultsStore
+from checkQC.runfolder_catalogue import RunfolderCatalogue
+from checkQC.report_version import ReportVersion, ReportCache
+from checkQC.exceptions import CheckQCException, QCTimeout
+from checkQC.profiling import StackSampler
+from checkQC.handlers.qc_handler import ReportLogging
+from checkQC.log_setup import JsonFormatter, queue_handlers
 
 log = logging.getLogger(__name__)
 
 from checkQC import __version__ as checkqc_version
 
 class CheckQCHandler(tornado.web.RequestHandler):
+    """
+    Check a runfolder in the monitor path, e.g. `/qc/170726_D00118_0303_BCB1TVANXX`, or only some of its lanes,
+    e.g. `/qc/170726_D00118_0303_BCB1TVANXX?lanes=1,3`
 
+    The response has an ETag and a Last-Modified header, computed from the input files of the runfolder and the
+    configuration. If the request has a matching If-None-Match (or If-Modified-Since) header, the runfolder is
+    not checked, and the response is `304 Not Modified`.
+    """
 
     def initialize(self, **kwargs):
         self.monitor_path = kwargs["monitoring_path"]
         self.qc_config_file = kwargs["qc_config_file"]
+        self.results_db = kwargs.get("results_db")
+        self.catalogue = kwargs.get("catalogue")
+        self.report_cache = kwargs.get("report_cache")
 
     @staticmethod
-    def _run_check_qc(monitor_path, qc_config_file, runfolder):
+    async def _run_check_qc_async(monitor_path, qc_config_file, runfolder, results_db=None, only=None, skip=None,
+                                  lanes=None):
         path_to_runfolder = os.path.join(monitor_path, runfolder)
-        checkqc_app = App(config_file=qc_config_file, runfolder=path_to_runfolder)
-        reports = checkqc_app.configure_and_run()
+        checkqc_app = App(config_file=qc_config_file, runfolder=path_to_runfolder, results_db=results_db,
+                          only=only, skip=skip, lanes=lanes)
+        reports = await checkqc_app.configure_and_run_async()
+        if checkqc_app.timed_out:
+            raise QCTimeout("Checking {} did not finish within the configured time limits".format(runfolder))
+        if reports is None:
+            raise CheckQCException("Could not check {}, see the log for details".format(runfolder))
         reports["version"] = checkqc_version
         return reports
 
-    def get(self, runfolder):
-        reports = self._run_check_qc(self.monitor_path, self.qc_config_file, runfolder)
+    @staticmethod
+    def _parse_lanes(lanes):
+        if lanes is None:
+            return None
+        if isinstance(lanes, str):
+            lanes = lanes.split(",")
+        lanes = sorted(set(int(lane) for lane in lanes))
+        if any(lane < 1 for lane in lanes):
+            raise ValueError("lane numbers start from 1")
+        return lanes
+
+    async def _report_version(self, runfolder, only=None, skip=None, lanes=None):
+        arguments = None
+        if only or skip or lanes:
+            arguments = {"only": sorted(only or []), "skip": sorted(skip or []), "lanes": lanes}
+        report_version = ReportVersion(os.path.join(self.monitor_path, runfolder), self.qc_config_file, arguments)
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, report_version.compute)
+
+    async def _check(self, runfolder, report_version, only=None, skip=None, lanes=None):
+        """
+        Check a runfolder, unless there are cached reports for the current version of it
+
+        :returns: a tuple of the reports, and True if they were cached, else False
+        """
+        if report_version and self.report_cache:
+            reports = self.report_cache.get(report_version[0])
+            if reports is not None:
+                return reports, True
+        reports = await self._run_check_qc_async(self.monitor_path, self.qc_config_file, runfolder, self.results_db,
+                                                 only=only, skip=skip, lanes=lanes)
+        if report_version and self.report_cache:
+            self.report_cache.put(report_version[0], reports)
+        if self.catalogue and not (only or skip or lanes):
+            self.catalogue.record_qc_status(runfolder, reports["exit_status"])
+        return reports, False
+
+    def _not_modified(self, last_modified):
+        if self.request.headers.get("If-None-Match"):
+            return self.check_etag_header()
+        if_modified_since = self.request.headers.get("If-Modified-Since")
+        if if_modified_since:
+            try:
+                since = email.utils.parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                return False
+            return last_modified <= since.replace(tzinfo=None)
+        return False
+
+    async def get(self, runfolder):
+        try:
+            lanes = self._parse_lanes(self.get_query_argument("lanes", None))
+        except ValueError as e:
+            raise tornado.web.HTTPError(400, reason="Invalid query argument: {}".format(e))
+
+        report_version = await self._report_version(runfolder, lanes=lanes)
+        if report_version:
+            etag, last_modified = report_version
+            self.set_header("Etag", etag)
+            if self._not_modified(last_modified):
+                self.set_header("Last-Modified", last_modified)
+                self.set_status(304)
+                return
+
         self.set_header("Content-Type", "application/json")
+        try:
+            reports, _ = await self._check(runfolder, report_version, lanes=lanes)
+        except QCTimeout as e:
+            self.clear_header("Etag")
+            self.set_status(504)
+            self.write({"exit_status": 1, "timed_out": True, "message": str(e), "version": checkqc_version})
+            return
+        if report_version:
+            self.set_header("Last-Modified", last_modified)
         self.write(reports)
 
 
+class BatchHandler(CheckQCHandler):
+    """
+    Check several runfolders in the monitor path, by posting a json document like this to `/qc/batch`:
+
+    .. code-block :: json
+
+        {"runfolders": ["170726_D00118_0303_BCB1TVANXX",
+                        {"runfolder": "170727_D00118_0304_BCB1TVANXX", "skip": ["ReadsPerSampleHandler"]}],
+         "only": ["ClusterPFHandler", "ReadsPerSampleHandler"]}
+
+    where `only`, `skip` and `lanes` are optional, and can be given either for all runfolders or for a single one.
+    `only` and `skip` are lists of handler names, and `lanes` is a list of lane numbers (as numbers or strings).
+
+    The runfolders are checked concurrently, and the result of each runfolder is sent back as a line of json as
+    soon as it is done (i.e. not necessarily in the order they were posted). Runfolders which have not changed
+    since they were last checked are not checked again.
+    """
+
+    SUPPORTED_METHODS = ("POST",)
+
+    def initialize(self, **kwargs):
+        super().initialize(**kwargs)
+        self.max_concurrent_checks = kwargs.get("max_concurrent_checks") or 4
+
+    @staticmethod
+    def _list_of(name, value, item_types):
+        if value is None:
+            return None
+        if not isinstance(value, list) or \
+                any(isinstance(item, bool) or not isinstance(item, item_types) for item in value):
+            raise ValueError("'{}' should be a list of {}, it was: {}".format(
+                name, " or ".join(item_type.__name__ for item_type in item_types), json.dumps(value)))
+        return value
+
+    @staticmethod
+    def _parse_batch(body):
+        batch = json.loads(body.decode())
+        if not isinstance(batch, dict) or not isinstance(batch.get("runfolders"), list):
+            raise ValueError("Expected a json object with a list of runfolders")
+        items = []
+        for item in batch["runfolders"]:
+            if not isinstance(item, dict):
+                item = {"runfolder": item}
+            if not isinstance(item.get("runfolder"), str):
+                raise ValueError("Invalid runfolder: {}".format(item.get("runfolder")))
+            lanes = BatchHandler._list_of("lanes", item.get("lanes", batch.get("lanes")), (int, str))
+            items.append({"runfolder": item["runfolder"],
+                          "only": BatchHandler._list_of("only", item.get("only", batch.get("only")), (str,)),
+                          "skip": BatchHandler._list_of("skip", item.get("skip", batch.get("skip")), (str,)),
+                          "lanes": CheckQCHandler._parse_lanes(lanes)})
+        return items
+
+    async def _batch_result(self, item):
+        runfolder = item["runfolder"]
+        result = {"runfolder": runfolder}
+        if not runfolder or runfolder in (os.curdir, os.pardir) or os.sep in runfolder:
+            result["error"] = "Invalid runfolder name"
+            return result
+        try:
+            report_version = await self._report_version(runfolder, item["only"], item["skip"], item["lanes"])
+            result["reports"], result["cached"] = await self._check(runfolder, report_version, only=item["only"],
+                                                                    skip=item["skip"], lanes=item["lanes"])
+        except QCTimeout as e:
+            result["timed_out"] = True
+            result["error"] = str(e)
+        except CheckQCException as e:
+            result["error"] = str(e)
+        return result
+
+    async def post(self):
+        try:
+            items = self._parse_batch(self.request.body)
+        except (ValueError, TypeError) as e:
+            raise tornado.web.HTTPError(400, reason="Invalid batch: {}".format(e))
+
+        self.set_header("Content-Type", "application/x-ndjson")
+        semaphore = asyncio.Semaphore(self.max_concurrent_checks)
+
+        async def check(item):
+            async with semaphore:
+                return await self._batch_result(item)
+
+        for result in asyncio.as_completed([check(item) for item in items]):
+            self.write(json.dumps(await result) + "\n")
+            await self.flush()
+
+
+class RunfoldersHandler(tornado.web.RequestHandler):
+    """
+    List the runfolders in the monitor path, with their run type, completion state and last QC status, e.g.
+    `/runfolders?instrument=D00118&complete=true&status=failed&offset=0&limit=50`
+    """
+
+    STATUSES = ("passed", "failed", "unchecked")
+
+    def initialize(self, **kwargs):
+        self.catalogue = kwargs["catalogue"]
+
+    async def get(self):
+        try:
+            complete = self.get_query_argument("complete", None)
+            if complete is not None:
+                if complete.lower() not in ("true", "false"):
+                    raise ValueError("complete must be true or false")
+                complete = complete.lower() == "true"
+            status = self.get_query_argument("status", None)
+            if status is not None and status not in self.STATUSES:
+                raise ValueError("status must be one of: {}".format(", ".join(self.STATUSES)))
+            offset = int(self.get_query_argument("offset", 0))
+            limit = int(self.get_query_argument("limit", 100))
+            if offset < 0 or limit < 0:
+                raise ValueError("offset and limit must not be negative")
+        except ValueError as e:
+            raise tornado.web.HTTPError(400, reason="Invalid query argument: {}".format(e))
+
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(None, self.catalogue.refresh)
+        runfolders = self.catalogue.query(instrument=self.get_query_argument("instrument", None),
+                                          instrument_and_reagent_type=self.get_query_argument(
+                                              "instrument_and_reagent_type", None),
+                                          complete=complete,
+                                          status=status,
+                                          offset=offset,
+                                          limit=limit)
+        runfolders["version"] = checkqc_version
+        self.set_header("Content-Type", "application/json")
+        self.write(runfolders)
+
+
+class ResultsHandler(tornado.web.RequestHandler):
+    """
+    Query the results of earlier runs stored in the results database, e.g.
+    `/results?metric=percent_q30&instrument=D00118&below=80&months=6`
+    """
+
+    def initialize(self, **kwargs):
+        self.results_db = kwargs.get("results_db")
+
+    def get(self):
+        if not self.results_db:
+            raise tornado.web.HTTPError(404, reason="No results database has been configured for checkqc-ws")
+
+        try:
+            below = self.get_query_argument("below", None)
+            above = self.get_query_argument("above", None)
+            months = self.get_query_argument("months", None)
+            below = float(below) if below is not None else None
+            above = float(above) if above is not None else None
+            since = ResultsStore.months_ago(int(months)) if months is not None else None
+        except ValueError as e:
+            raise tornado.web.HTTPError(400, reason="Invalid query argument: {}".format(e))
+
+        results = ResultsStore(self.results_db).query_metrics(metric=self.get_query_argument("metric", "percent_q30"),
+                                                              instrument=self.get_query_argument("instrument", None),
+                                                              below=below, above=above, since=since)
+        self.set_header("Content-Type", "application/json")
+        self.write({"results": results, "version": checkqc_version})
+
+
+class ProfileHandler(tornado.web.RequestHandler):
+    """
+    Sample the stacks of all threads of checkqc-ws for a number of seconds, e.g. `/debug/profile?seconds=10`, and
+    return them in the collapsed format of flame graph tools. The stacks are labelled with the stage of the
+    check, and the parser or handler, which they belong to.
+
+    This is only available if checkqc-ws was started with `--enable_profiling`.
+    """
+
+    MAX_SECONDS = 60
+
+    def initialize(self, **kwargs):
+        pass
+
+    async def get(self):
+        try:
+            seconds = float(self.get_query_argument("seconds", 10))
+            if not 0 < seconds <= self.MAX_SECONDS:
+                raise ValueError("seconds must be larger than 0 and at most {}".format(self.MAX_SECONDS))
+        except ValueError as e:
+            raise tornado.web.HTTPError(400, reason="Invalid query argument: {}".format(e))
+
+        loop = asyncio.get_event_loop()
+        collapsed = await loop.run_in_executor(None, StackSampler().sample_for, seconds)
+        self.set_header("Content-Type", "text/plain")
+        self.write(collapsed)
+
+
 class WebApp(object):
 
     def __init__(self):
@@ -44,15 +328,35 @@ class WebApp(object):
 
     @staticmethod
     def _routes(**kwargs):
-        return [url(r"/qc/([^/]+)", CheckQCHandler, name="checkqc", kwargs=kwargs)]
+        if "catalogue" not in kwargs:
+            kwargs["catalogue"] = RunfolderCatalogue(kwargs["monitoring_path"],
+                                                     config=ConfigFactory.from_config_path(kwargs["qc_config_file"]),
+                                                     results_db=kwargs.get("results_db"))
+        if "report_cache" not in kwargs:
+            kwargs["report_cache"] = ReportCache()
+        routes = [url(r"/qc/batch", BatchHandler, name="batch", kwargs=kwargs),
+                  url(r"/qc/([^/]+)", CheckQCHandler, name="checkqc", kwargs=kwargs),
+                  url(r"/results", ResultsHandler, name="results", kwargs=kwargs),
+                  url(r"/runfolders", RunfoldersHandler, name="runfolders", kwargs=kwargs)]
+        if kwargs.get("enable_profiling"):
+            routes.append(url(r"/debug/profile", ProfileHandler, name="profile", kwargs=kwargs))
+        return routes
 
     @staticmethod
     def _make_app(debug=False, **kwargs):
         return tornado.web.Application(WebApp._routes(**kwargs), debug=debug)
 
-    def start_web_app(self, monitoring_path, port, config_file, log_config, debug):
+    def start_web_app(self, monitoring_path, port, config_file, log_config, debug, results_db=None,
+                      max_concurrent_checks=None, enable_profiling=False, log_format="text",
+                      report_logging=ReportLogging.ALL):
         logging_config_path = ConfigFactory.get_logging_config_dict(log_config)
         logging.config.dictConfig(logging_config_path)
+        if log_format == "json":
+            for handler in logging.getLogger().handlers:
+                handler.setFormatter(JsonFormatter())
+        # Write the log from a background thread, so that a slow log destination does not block the event loop
+        queue_handlers()
+        ReportLogging.configure(report_logging)
 
         log.info("Starting checkqc-ws at port: {}".format(port))
 
@@ -60,7 +364,9 @@ class WebApp(object):
             log.error("{} is not a directory".format(monitoring_path))
             raise AssertionError("{} is not a directory".format(monitoring_path))
 
-        web_app = self._make_app(monitoring_path=monitoring_path, qc_config_file=config_file, debug=debug)
+        web_app = self._make_app(monitoring_path=monitoring_path, qc_config_file=config_file,
+                                 results_db=results_db, max_concurrent_checks=max_concurrent_checks,
+                                 enable_profiling=enable_profiling, debug=debug)
         web_app.listen(port=port)
         tornado.ioloop.IOLoop.instance().start()
 
@@ -70,7 +376,20 @@ class WebApp(object):
 @click.option("--port", help="Port which checkqc-ws will listen to (default: 9999).", type=click.INT, default=9999)
 @click.option("--config", help="Path to the checkQC configuration file (optional)", type=click.Path())
 @click.option("--log_config", help="Path to the checkQC logging configuration file (optional)", type=click.Path())
+@click.option("--results_db", help="Path to a database where results will be stored and queried (optional)",
+              type=click.Path())
+@click.option("--max_concurrent_checks", help="Maximum number of runfolders of a batch which are checked at the same "
+                                              "time (default: 4).", type=click.INT, default=4)
+@click.option("--enable_profiling", is_flag=True, default=False,
+              help="Enable the /debug/profile endpoint, which samples the stacks of checkqc-ws.")
+@click.option("--log_format", type=click.Choice(["text", "json"]), default="text",
+              help="Write the log as text or as one json object per line (default: text)")
+@click.option("--report_logging", type=click.Choice(ReportLogging.MODES), default=ReportLogging.ALL,
+              help="Log all errors and warnings found, a summary per handler, a sample of them per handler, or "
+                   "none of them (default: all)")
 @click.option('--debug', is_flag=True, default=False, help="Enable debug mode.")
-def start(monitor_path, port=9999, config=None, log_config=None, debug=False):
+def start(monitor_path, port=9999, config=None, log_config=None, results_db=None, max_concurrent_checks=4,
+          enable_profiling=False, log_format="text", report_logging=ReportLogging.ALL, debug=False):
     webapp = WebApp()
-    webapp.start_web_app(monitor_path, port, config, log_config, debug)
+    webapp.start_web_app(monitor_path, port, config, log_config, debug, results_db, max_concurrent_checks,
+                         enable_profiling, log_format, report_logging)
@@ -16,7 +16,8 @@ setup(
         "PyYAML>=3.12",
         "interop",
         "xmltodict",
-        "tornado"],
+        "tornado",
+        "numpy"],
     packages=find_packages(exclude=["tests*"]),
     test_suite="tests",
     package_data={'checkQC': ['default_config/config.yaml', 'default_config/logger.yaml']},
@@ -24,6 +25,23 @@ setup(
     license='GPLv3',
     entry_points={
         'console_scripts': ['checkqc = checkQC.app:start',
-                            'checkqc-ws = checkQC.web_app:start']
+                            'checkqc-ws = checkQC.web_app:start',
+                            'checkqc-query = checkQC.results_store:start',
+                            'checkqc-compare = checkQC.runfolder_comparison:start',
+                            'checkqc-diff-config = checkQC.config_diff:start'],
+        'checkqc.handlers': ['AdapterContentHandler = checkQC.handlers.adapter_content_handler:AdapterContentHandler',
+                             'ClusterPFHandler = checkQC.handlers.cluster_pf_handler:ClusterPFHandler',
+                             'ErrorRateHandler = checkQC.handlers.error_rate_handler:ErrorRateHandler',
+                             'GCContentHandler = checkQC.handlers.gc_content_handler:GCContentHandler',
+                             'OccupancyHandler = checkQC.handlers.occupancy_handler:OccupancyHandler',
+                             'OverrepresentedSequencesHandler = '
+                             'checkQC.handlers.overrepresented_sequences_handler:OverrepresentedSequencesHandler',
+                             'Q30Handler = checkQC.handlers.q30_handler:Q30Handler',
+                             'ReadsPerSampleHandler = checkQC.handlers.reads_per_sample_handler:ReadsPerSampleHandler',
+                             'SampleBalanceHandler = checkQC.handlers.sample_balance_handler:SampleBalanceHandler',
+                             'UndeterminedPercentageHandler = '
+                             'checkQC.handlers.undetermined_percentage_handler:UndeterminedPercentageHandler',
+                             'UnidentifiedIndexHandler = '
+                             'checkQC.handlers.unidentified_index_handler:UnidentifiedIndexHandler']
     },
 )
@@ -0,0 +1,46 @@
+import unittest
+
+from checkQC.handlers.adapter_content_handler import AdapterContentHandler
+
+from tests.handlers.handler_test_base import HandlerTestBase
+
+
+class TestAdapterContentHandler(HandlerTestBase):
+
+    def setUp(self):
+        qc_config = {'name': 'AdapterContentHandler', 'error': 'unknown', 'warning': 'unknown'}
+        adapter_content_handler = AdapterContentHandler(qc_config)
+        for sample_id, lane, adapter_count in (("Sample_1", 1, 5), ("Sample_2", 1, 20), ("Sample_3", 2, 50)):
+            adapter_content_handler.collect(("fastq_sample", {
+                "sample_id": sample_id, "lane": lane, "read": 1,
+                "file": "{}_S1_L00{}_R1_001.fastq.gz".format(sample_id, lane),
+                "reads_sampled": 100, "gc_content": 40.0,
+                "adapter_counts": {"Illumina Universal Adapter": adapter_count, "Nextera Transposase Sequence": 1},
+                "top_sequences": [["ACGT", 2]]}))
+        self.adapter_content_handler = adapter_content_handler
+
+    def set_qc_config(self, qc_config):
+        self.adapter_content_handler.qc_config = qc_config
+
+    def test_all_is_fine(self):
+        self.set_qc_config({'name': 'AdapterContentHandler', 'error': 60, 'warning': 55})
+        errors_and_warnings = list(self.adapter_content_handler.check_qc())
+        self.assertEqual(errors_and_warnings, [])
+
+    def test_warning_and_error(self):
+        self.set_qc_config({'name': 'AdapterContentHandler', 'error': 30, 'warning': 10})
+        errors_and_warnings = list(self.adapter_content_handler.check_qc())
+        class_names = self.map_errors_and_warnings_to_class_names(errors_and_warnings)
+        self.assertListEqual(class_names, ['QCErrorWarning', 'QCErrorFatal'])
+        self.assertEqual(errors_and_warnings[0].data["sample_id"], "Sample_2")
+        self.assertEqual(errors_and_warnings[0].data["adapter"], "Illumina Universal Adapter")
+        self.assertEqual(errors_and_warnings[0].data["percentage_with_adapter"], 20)
+
+    def test_metrics(self):
+        self.assertListEqual(list(self.adapter_content_handler.metrics()),
+                             [{"metric": "adapter_content", "lane": 1, "read": 1, "value": 20},
+                              {"metric": "adapter_content", "lane": 2, "read": 1, "value": 50}])
+
+
+if __name__ == '__main__':
+    unittest.main()
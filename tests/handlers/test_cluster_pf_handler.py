@@ -52,6 +52,22 @@ class TestClusterPFHandler(HandlerTestBase):
         class_names = self.map_errors_and_warnings_to_class_names(errors_and_warnings)
         self.assertListEqual(class_names, ['QCErrorWarning', 'QCErrorWarning'])
 
+    def test_metrics(self):
+        metrics = list(self.cluster_pf_handler.metrics())
+        self.assertEqual(len(metrics), 2)
+        self.assertEqual(metrics[0]["metric"], "clusters_pf")
+        self.assertIsNone(metrics[0]["read"])
+        self.assertAlmostEqual(metrics[0]["value"], 162.72644)
+
+    def test_collect_from_interop(self):
+        qc_config = {'name': 'TotalClustersPF', 'error': '100', 'warning': '170'}
+        cluster_pf_handler = ClusterPFHandler(qc_config)
+        cluster_pf_handler.collect(("clusters_pf", {"lane": 1, "clusters_pf": 180000000}))
+        cluster_pf_handler.collect(("clusters_pf", {"lane": 2, "clusters_pf": 150000000}))
+        errors_and_warnings = list(cluster_pf_handler.check_qc())
+        self.assertEqual(len(errors_and_warnings), 1)
+        self.assertEqual(errors_and_warnings[0].data["lane"], 2)
+
 
 if __name__ == '__main__':
     unittest.main()
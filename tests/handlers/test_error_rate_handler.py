@@ -75,5 +75,15 @@ class TestErrorRateHandler(HandlerTestBase):
         errors_and_warnings = list(self.error_handler.check_qc())
         self.assertEqual(len(errors_and_warnings), 0)
 
+    def test_is_disabled(self):
+        self.set_qc_config({'name': 'ErrorHandler', 'error': 'unknown', 'warning': 'unknown',
+                            'allow_missing_error_rate': False})
+        # Missing error rates are still reported
+        self.assertFalse(self.error_handler.is_disabled())
+        self.set_qc_config({'name': 'ErrorHandler', 'error': 'unknown', 'warning': 'unknown',
+                            'allow_missing_error_rate': True})
+        self.assertTrue(self.error_handler.is_disabled())
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+
+from checkQC.handlers.gc_content_handler import GCContentHandler
+
+from tests.handlers.handler_test_base import HandlerTestBase
+
+
+class TestGCContentHandler(HandlerTestBase):
+
+    def setUp(self):
+        qc_config = {'name': 'GCContentHandler', 'error': 'unknown', 'warning': 'unknown'}
+        gc_content_handler = GCContentHandler(qc_config)
+        for sample_id, lane, gc_content in (("Sample_1", 1, 40.0), ("Sample_2", 1, 41.0), ("Sample_3", 1, 55.0),
+                                            ("Sample_4", 2, 60.0), ("Sample_5", 2, None)):
+            gc_content_handler.collect(("fastq_sample", {
+                "sample_id": sample_id, "lane": lane, "read": 1,
+                "file": "{}_S1_L00{}_R1_001.fastq.gz".format(sample_id, lane),
+                "reads_sampled": 100, "gc_content": gc_content, "adapter_counts": {}, "top_sequences": []}))
+        self.gc_content_handler = gc_content_handler
+
+    def set_qc_config(self, qc_config):
+        self.gc_content_handler.qc_config = qc_config
+
+    def test_all_is_fine(self):
+        self.set_qc_config({'name': 'GCContentHandler', 'error': 20, 'warning': 15})
+        errors_and_warnings = list(self.gc_content_handler.check_qc())
+        self.assertEqual(errors_and_warnings, [])
+
+    def test_warning(self):
+        self.set_qc_config({'name': 'GCContentHandler', 'error': 'unknown', 'warning': 5})
+        errors_and_warnings = list(self.gc_content_handler.check_qc())
+        class_names = self.map_errors_and_warnings_to_class_names(errors_and_warnings)
+        self.assertListEqual(class_names, ['QCErrorWarning'])
+        self.assertEqual(errors_and_warnings[0].data["sample_id"], "Sample_3")
+        self.assertEqual(errors_and_warnings[0].data["median_gc_content"], 41.0)
+        self.assertEqual(errors_and_warnings[0].data["deviation"], 14.0)
+
+    def test_metrics(self):
+        self.assertListEqual(list(self.gc_content_handler.metrics()),
+                             [{"metric": "gc_content_deviation", "lane": 1, "read": 1, "value": 14.0},
+                              {"metric": "gc_content_deviation", "lane": 2, "read": 1, "value": 0}])
+
+
+if __name__ == '__main__':
+    unittest.main()
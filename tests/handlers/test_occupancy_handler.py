@@ -0,0 +1,71 @@
+import unittest
+
+from checkQC.handlers.occupancy_handler import OccupancyHandler
+from checkQC.exceptions import ConfigurationError
+
+from tests.handlers.handler_test_base import HandlerTestBase
+
+
+class TestOccupancyHandler(HandlerTestBase):
+
+    def setUp(self):
+        qc_config = {'name': 'OccupancyHandler', 'error': 'unknown', 'warning': 'unknown'}
+        occupancy_handler = OccupancyHandler(qc_config)
+        for lane, percent_occupied, percent_pf in ((1, 95.0, 85.0), (2, 60.0, 58.0), (3, 98.0, 60.0)):
+            occupancy_handler.collect(("occupancy", {"lane": lane, "tiles": 88,
+                                                     "percent_occupied": percent_occupied, "percent_pf": percent_pf,
+                                                     "percent_occupied_not_pf": percent_occupied - percent_pf}))
+        self.occupancy_handler = occupancy_handler
+
+    def set_qc_config(self, qc_config):
+        self.occupancy_handler.qc_config = qc_config
+
+    def test_all_is_fine(self):
+        self.set_qc_config({'name': 'OccupancyHandler', 'error': 50, 'warning': 55,
+                            'max_percent_occupied_not_pf': 40})
+        errors_and_warnings = list(self.occupancy_handler.check_qc())
+        self.assertEqual(errors_and_warnings, [])
+
+    def test_low_occupancy(self):
+        self.set_qc_config({'name': 'OccupancyHandler', 'error': 50, 'warning': 80})
+        errors_and_warnings = list(self.occupancy_handler.check_qc())
+        class_names = self.map_errors_and_warnings_to_class_names(errors_and_warnings)
+        self.assertListEqual(class_names, ['QCErrorWarning'])
+        self.assertEqual(errors_and_warnings[0].data["lane"], 2)
+
+        self.set_qc_config({'name': 'OccupancyHandler', 'error': 70, 'warning': 80})
+        errors_and_warnings = list(self.occupancy_handler.check_qc())
+        class_names = self.map_errors_and_warnings_to_class_names(errors_and_warnings)
+        self.assertListEqual(class_names, ['QCErrorFatal'])
+
+    def test_high_occupied_not_pf(self):
+        self.set_qc_config({'name': 'OccupancyHandler', 'error': 'unknown', 'warning': 'unknown',
+                            'max_percent_occupied_not_pf': 20})
+        errors_and_warnings = list(self.occupancy_handler.check_qc())
+        class_names = self.map_errors_and_warnings_to_class_names(errors_and_warnings)
+        self.assertListEqual(class_names, ['QCErrorWarning'])
+        self.assertEqual(errors_and_warnings[0].data["lane"], 3)
+        self.assertEqual(errors_and_warnings[0].data["threshold"], 20)
+
+    def test_is_disabled(self):
+        self.assertTrue(self.occupancy_handler.is_disabled())
+        self.set_qc_config({'name': 'OccupancyHandler', 'error': 'unknown', 'warning': 'unknown',
+                            'max_percent_occupied_not_pf': 5})
+        self.assertFalse(self.occupancy_handler.is_disabled())
+
+    def test_validate_max_percent_occupied_not_pf(self):
+        self.set_qc_config({'name': 'OccupancyHandler', 'error': 50, 'warning': 55,
+                            'max_percent_occupied_not_pf': 'high'})
+        with self.assertRaises(ConfigurationError):
+            self.occupancy_handler.validate_configuration()
+
+    def test_metrics(self):
+        metrics = list(self.occupancy_handler.metrics())
+        self.assertEqual(len(metrics), 6)
+        self.assertDictEqual(metrics[0], {"metric": "percent_occupied", "lane": 1, "read": None, "value": 95.0})
+        self.assertDictEqual(metrics[1], {"metric": "percent_occupied_not_pf", "lane": 1, "read": None,
+                                          "value": 10.0})
+
+
+if __name__ == '__main__':
+    unittest.main()
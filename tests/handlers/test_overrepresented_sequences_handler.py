@@ -0,0 +1,45 @@
+import unittest
+
+from checkQC.handlers.overrepresented_sequences_handler import OverrepresentedSequencesHandler
+
+from tests.handlers.handler_test_base import HandlerTestBase
+
+
+class TestOverrepresentedSequencesHandler(HandlerTestBase):
+
+    def setUp(self):
+        qc_config = {'name': 'OverrepresentedSequencesHandler', 'error': 'unknown', 'warning': 'unknown'}
+        overrepresented_sequences_handler = OverrepresentedSequencesHandler(qc_config)
+        for sample_id, top_sequences in (("Sample_1", [["ACGT", 2], ["TTTT", 1]]),
+                                         ("Sample_2", [["GATCGGAAGAGC", 30]]),
+                                         ("Sample_3", [])):
+            overrepresented_sequences_handler.collect(("fastq_sample", {
+                "sample_id": sample_id, "lane": 1, "read": 2,
+                "file": "{}_S1_L001_R2_001.fastq.gz".format(sample_id),
+                "reads_sampled": 200, "gc_content": 40.0, "adapter_counts": {},
+                "top_sequences": top_sequences}))
+        self.overrepresented_sequences_handler = overrepresented_sequences_handler
+
+    def set_qc_config(self, qc_config):
+        self.overrepresented_sequences_handler.qc_config = qc_config
+
+    def test_all_is_fine(self):
+        self.set_qc_config({'name': 'OverrepresentedSequencesHandler', 'error': 'unknown', 'warning': 20})
+        errors_and_warnings = list(self.overrepresented_sequences_handler.check_qc())
+        self.assertEqual(errors_and_warnings, [])
+
+    def test_error(self):
+        self.set_qc_config({'name': 'OverrepresentedSequencesHandler', 'error': 10, 'warning': 'unknown'})
+        errors_and_warnings = list(self.overrepresented_sequences_handler.check_qc())
+        class_names = self.map_errors_and_warnings_to_class_names(errors_and_warnings)
+        self.assertListEqual(class_names, ['QCErrorFatal'])
+        self.assertEqual(errors_and_warnings[0].data["sequence"], "GATCGGAAGAGC")
+        self.assertEqual(errors_and_warnings[0].data["percentage"], 15)
+
+    def test_metrics(self):
+        self.assertListEqual(list(self.overrepresented_sequences_handler.metrics()),
+                             [{"metric": "overrepresented_sequence_percentage", "lane": 1, "read": 2, "value": 15}])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -44,5 +44,11 @@ class TestQ30Handler(HandlerTestBase):
         class_names = self.map_errors_and_warnings_to_class_names(errors_and_warnings)
         self.assertListEqual(class_names, ['QCErrorFatal', 'QCErrorFatal'])
 
+    def test_metrics(self):
+        self.assertListEqual(list(self.q30_handler.metrics()),
+                             [{"metric": "percent_q30", "lane": 1, "read": 1, "value": 82},
+                              {"metric": "percent_q30", "lane": 1, "read": 2, "value": 90}])
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,7 +1,9 @@
 
 import unittest
 
-from checkQC.handlers.qc_handler import QCHandler, QCErrorWarning, QCErrorFatal
+import mock
+
+from checkQC.handlers.qc_handler import QCHandler, QCErrorWarning, QCErrorFatal, ReportLogging
 from checkQC.exceptions import ConfigurationError
 
 
@@ -23,6 +25,9 @@ class TestQCHandler(unittest.TestCase):
         qc_config = {}
         self.qc_handler = self.MockQCHandler(qc_config)
 
+    def tearDown(self):
+        ReportLogging.configure(ReportLogging.ALL, sample_size=10)
+
     def test_report_logging_is_ordered(self):
         def fix_names(obj):
             if isinstance(obj, QCErrorFatal):
@@ -37,10 +42,52 @@ class TestQCHandler(unittest.TestCase):
 
         self.assertEqual(log_checker.output, expected_logs)
 
+    def test_report_logging_summarized(self):
+        ReportLogging.configure(ReportLogging.SUMMARIZED)
+        with self.assertLogs() as log_checker:
+            reports = self.qc_handler.report()
+        self.assertEqual(log_checker.output, ["ERROR:root:MockQCHandler: 2 fatal qc error(s) and 2 qc warning(s)"])
+        self.assertEqual(len(reports), 4)
+        self.assertEqual(self.qc_handler.exit_status(), 1)
+
+    def test_report_logging_sampled(self):
+        ReportLogging.configure(ReportLogging.SAMPLED, sample_size=2)
+        with self.assertLogs() as log_checker:
+            self.qc_handler.report()
+        self.assertEqual(log_checker.output, ["ERROR:root:Fatal QC error: 1",
+                                              "WARNING:root:QC warning: 2",
+                                              "INFO:root:MockQCHandler: 2 more error(s) and warning(s) were not "
+                                              "logged"])
+        self.assertEqual(log_checker.records[0].qc_handler, "MockQCHandler")
+        self.assertEqual(log_checker.records[0].qc_report_type, "error")
+
+    def test_report_logging_off(self):
+        ReportLogging.configure(ReportLogging.OFF)
+        with mock.patch("checkQC.handlers.qc_handler.log") as log_mock:
+            self.qc_handler.report()
+        self.assertEqual(log_mock.mock_calls, [])
+        self.assertEqual(self.qc_handler.exit_status(), 1)
+
+    def test_report_logging_unknown_mode(self):
+        with self.assertRaises(ConfigurationError):
+            ReportLogging.configure("verbose")
+
     def test_validate_configuration(self):
         mock_handler = self.MockQCHandler({})
         with self.assertRaises(ConfigurationError):
             mock_handler.validate_configuration()
 
+    def test_validate_configuration_with_unresolved_relative_threshold(self):
+        mock_handler = self.MockQCHandler({"error": "unknown", "warning": "p5"})
+        with self.assertRaises(ConfigurationError):
+            mock_handler.validate_configuration()
+
+    def test_is_relative_threshold(self):
+        self.assertTrue(QCHandler.is_relative_threshold("p5"))
+        self.assertTrue(QCHandler.is_relative_threshold("p100"))
+        self.assertFalse(QCHandler.is_relative_threshold("unknown"))
+        self.assertFalse(QCHandler.is_relative_threshold("p101"))
+        self.assertFalse(QCHandler.is_relative_threshold(5))
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+
+import mock
+
+from checkQC.handlers.qc_handler import QCHandler
+from checkQC.handlers.qc_handler_factory import QCHandlerFactory
+from checkQC.handlers.cluster_pf_handler import ClusterPFHandler
+from checkQC.exceptions import QCHandlerNotFound
+
+
+class PluginHandler(QCHandler):
+
+    def parser(self):
+        return None
+
+    def check_qc(self):
+        return []
+
+
+class TestQCHandlerFactory(unittest.TestCase):
+
+    def setUp(self):
+        QCHandlerFactory._entry_points = None
+
+    def tearDown(self):
+        QCHandlerFactory._entry_points = None
+
+    @staticmethod
+    def _entry_point(name, clazz):
+        entry_point = mock.MagicMock()
+        entry_point.name = name
+        entry_point.module_name = clazz.__module__
+        entry_point.load.return_value = clazz
+        return entry_point
+
+    def test_get_subclass_from_entry_point(self):
+        plugin = self._entry_point("PluginHandler", PluginHandler)
+        other_plugin = self._entry_point("OtherHandler", PluginHandler)
+        with mock.patch("pkg_resources.iter_entry_points", return_value=[plugin, other_plugin]) as iter_entry_points:
+            self.assertEqual(QCHandlerFactory.get_subclass("PluginHandler"), PluginHandler)
+            self.assertEqual(QCHandlerFactory.get_subclass("PluginHandler"), PluginHandler)
+        # The index should only be read once, and only the handlers asked for should be loaded
+        iter_entry_points.assert_called_once_with(QCHandlerFactory.ENTRY_POINT_GROUP)
+        plugin.load.assert_called_with()
+        other_plugin.load.assert_not_called()
+
+    def test_get_subclass_falls_back_to_handlers_package(self):
+        with mock.patch("pkg_resources.iter_entry_points", return_value=[]):
+            self.assertEqual(QCHandlerFactory.get_subclass("ClusterPFHandler"), ClusterPFHandler)
+            with self.assertRaises(QCHandlerNotFound):
+                QCHandlerFactory.get_subclass("NoSuchHandler")
+
+    def test_get_subclass_entry_point_is_not_a_handler(self):
+        with mock.patch("pkg_resources.iter_entry_points", return_value=[self._entry_point("NotAHandler", dict)]):
+            with self.assertRaises(QCHandlerNotFound):
+                QCHandlerFactory.get_subclass("NotAHandler")
+
+    def test_create_subclass_instance(self):
+        with mock.patch("pkg_resources.iter_entry_points",
+                        return_value=[self._entry_point("PluginHandler", PluginHandler)]):
+            handler = QCHandlerFactory.create_subclass_instance("PluginHandler", {"warning": 1, "error": 2})
+        self.assertIsInstance(handler, PluginHandler)
+
+
+if __name__ == '__main__':
+    unittest.main()
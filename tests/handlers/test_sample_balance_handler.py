@@ -0,0 +1,88 @@
+import unittest
+
+import numpy
+
+from checkQC.handlers.sample_balance_handler import SampleBalanceHandler
+from checkQC.exceptions import ConfigurationError
+
+from tests.test_utils import get_stats_json
+from tests.handlers.handler_test_base import HandlerTestBase
+
+
+class TestSampleBalanceHandler(HandlerTestBase):
+
+    def setUp(self):
+        key = "ConversionResults"
+        qc_config = {'name': 'SampleBalanceHandler', 'error': 'unknown', 'warning': 'unknown'}
+        value = get_stats_json()["ConversionResults"]
+        sample_balance_handler = SampleBalanceHandler(qc_config)
+        sample_balance_handler.collect((key, value))
+        self.sample_balance_handler = sample_balance_handler
+
+    def set_qc_config(self, qc_config):
+        self.sample_balance_handler.qc_config = qc_config
+
+    def test_all_is_fine(self):
+        # The coefficients of variation of the test data are 2.81% and 2.79%
+        qc_config = {'name': 'SampleBalanceHandler', 'error': 10, 'warning': 5}
+        self.set_qc_config(qc_config)
+        errors_and_warnings = list(self.sample_balance_handler.check_qc())
+        self.assertEqual(errors_and_warnings, [])
+
+    def test_warning(self):
+        qc_config = {'name': 'SampleBalanceHandler', 'error': 10, 'warning': 2}
+        self.set_qc_config(qc_config)
+        errors_and_warnings = list(self.sample_balance_handler.check_qc())
+        class_names = self.map_errors_and_warnings_to_class_names(errors_and_warnings)
+        self.assertListEqual(class_names, ['QCErrorWarning', 'QCErrorWarning'])
+        self.assertEqual(errors_and_warnings[0].data["lane"], 1)
+        self.assertEqual(errors_and_warnings[0].data["number_of_samples"], 2)
+
+    def test_error(self):
+        qc_config = {'name': 'SampleBalanceHandler', 'error': 2, 'warning': 'unknown'}
+        self.set_qc_config(qc_config)
+        errors_and_warnings = list(self.sample_balance_handler.check_qc())
+        class_names = self.map_errors_and_warnings_to_class_names(errors_and_warnings)
+        self.assertListEqual(class_names, ['QCErrorFatal', 'QCErrorFatal'])
+
+    def test_lanes_with_one_sample_are_not_checked(self):
+        self.sample_balance_handler.collect(("ConversionResults",
+                                             [{"LaneNumber": 1, "DemuxResults": [{"NumberReads": 10}]}]))
+        self.set_qc_config({'name': 'SampleBalanceHandler', 'error': 0, 'warning': 0})
+        self.assertListEqual(list(self.sample_balance_handler.check_qc()), [])
+        self.assertListEqual(list(self.sample_balance_handler.metrics()), [])
+
+    def test_metrics(self):
+        metrics = list(self.sample_balance_handler.metrics())
+        self.assertListEqual([(metric["metric"], metric["lane"]) for metric in metrics],
+                             [("sample_balance_cv", 1), ("sample_balance_gini", 1),
+                              ("sample_balance_cv", 2), ("sample_balance_gini", 2)])
+        self.assertAlmostEqual(metrics[0]["value"], 2.8125, places=3)
+
+    def test_balance_statistics(self):
+        statistics = SampleBalanceHandler.balance_statistics(numpy.array([100.0, 100.0, 100.0, 100.0]))
+        self.assertAlmostEqual(statistics["coefficient_of_variation"], 0)
+        self.assertAlmostEqual(statistics["gini"], 0)
+        self.assertAlmostEqual(statistics["min_max_ratio"], 1)
+        self.assertAlmostEqual(statistics["fraction_below_median_percentage"], 0)
+
+        statistics = SampleBalanceHandler.balance_statistics(numpy.array([0.0, 0.0, 0.0, 400.0]), 50)
+        self.assertAlmostEqual(statistics["coefficient_of_variation"], 173.205, places=3)
+        self.assertAlmostEqual(statistics["gini"], 0.75)
+        self.assertAlmostEqual(statistics["min_max_ratio"], 0)
+        self.assertAlmostEqual(statistics["fraction_below_median_percentage"], 0)
+
+        statistics = SampleBalanceHandler.balance_statistics(numpy.array([10.0, 100.0, 100.0, 100.0]), 50)
+        self.assertAlmostEqual(statistics["fraction_below_median_percentage"], 0.25)
+
+        self.assertIsNone(SampleBalanceHandler.balance_statistics(numpy.array([0.0, 0.0])))
+
+    def test_validate_below_median_percentage(self):
+        self.set_qc_config({'name': 'SampleBalanceHandler', 'error': 10, 'warning': 5,
+                            'below_median_percentage': 150})
+        with self.assertRaises(ConfigurationError):
+            self.sample_balance_handler.validate_configuration()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+
+from checkQC.handlers.unidentified_index_handler import UnidentifiedIndexHandler, ExpectedIndexLookup
+
+from tests.handlers.handler_test_base import HandlerTestBase
+
+
+class TestExpectedIndexLookup(unittest.TestCase):
+
+    def setUp(self):
+        self.lookup = ExpectedIndexLookup()
+        self.lookup.add(1, "Sample_A", "AACC+GGTA")
+        self.lookup.add(2, "Sample_B", "ACGT")
+
+    def kinds(self, barcode):
+        return [(match["kind"], match["sample_id"]) for match in self.lookup.find(barcode)]
+
+    def test_reverse_complement(self):
+        self.assertEqual(ExpectedIndexLookup.reverse_complement("AACGN"), "NCGTT")
+
+    def test_find_dual_index_variants(self):
+        self.assertListEqual(self.kinds("AACC+GGTA"), [(ExpectedIndexLookup.EXACT, "Sample_A")])
+        self.assertListEqual(self.kinds("AACC+TACC"), [(ExpectedIndexLookup.REVERSE_COMPLEMENT_INDEX2, "Sample_A")])
+        self.assertListEqual(self.kinds("GGTT+GGTA"), [(ExpectedIndexLookup.REVERSE_COMPLEMENT_INDEX1, "Sample_A")])
+        self.assertListEqual(self.kinds("GGTA+AACC"), [(ExpectedIndexLookup.SWAPPED, "Sample_A")])
+        self.assertListEqual(self.kinds("AACC+GGTN"), [(ExpectedIndexLookup.ONE_MISMATCH, "Sample_A")])
+        self.assertListEqual(self.kinds("AATT+GGTA"), [])
+
+    def test_find_palindromic_single_index(self):
+        # ACGT is its own reverse complement, so it should only be found once
+        self.assertListEqual(self.kinds("ACGT"), [(ExpectedIndexLookup.EXACT, "Sample_B")])
+        self.assertListEqual(self.kinds("ACGA"), [(ExpectedIndexLookup.ONE_MISMATCH, "Sample_B")])
+
+
+class TestUnidentifiedIndexHandler(HandlerTestBase):
+
+    def setUp(self):
+        conversion_results = [
+            {"LaneNumber": 1, "TotalClustersPF": 1000000,
+             "DemuxResults": [{"SampleId": "Sample_A", "IndexMetrics": [{"IndexSequence": "AACC+GGTA"}]}]},
+            {"LaneNumber": 2, "TotalClustersPF": 1000000,
+             "DemuxResults": [{"SampleId": "Sample_B", "IndexMetrics": [{"IndexSequence": "TTTT+CCCC"}]}]}]
+        unknown_barcodes = [
+            {"Lane": 1, "Barcodes": {"AACC+TACC": 50000, "TTTT+CCCC": 20000, "GGTA+AACC": 5000, "NNNN+NNNN": 90000}},
+            {"Lane": 2, "Barcodes": {"TTTT+CCCA": 15000, "AACC+GGTA": 100}}]
+
+        qc_config = {"name": "UnidentifiedIndexHandler", "error": 4, "warning": 1}
+        self.handler = UnidentifiedIndexHandler(qc_config)
+        self.handler.collect(("ConversionResults", conversion_results))
+        self.handler.collect(("UnknownBarcodes", unknown_barcodes))
+
+    def test_errors_and_warnings(self):
+        errors_and_warnings = list(self.handler.check_qc())
+        class_names = self.map_errors_and_warnings_to_class_names(errors_and_warnings)
+        self.assertListEqual(class_names, ["QCErrorFatal", "QCErrorWarning", "QCErrorWarning"])
+        self.assertListEqual([(report.data["barcode"], report.data["kind"], report.data["sample_lane"])
+                              for report in errors_and_warnings],
+                             [("AACC+TACC", ExpectedIndexLookup.REVERSE_COMPLEMENT_INDEX2, 1),
+                              ("TTTT+CCCC", ExpectedIndexLookup.EXACT, 2),
+                              ("TTTT+CCCA", ExpectedIndexLookup.ONE_MISMATCH, 2)])
+
+    def test_all_unknown(self):
+        self.handler.qc_config = {"name": "UnidentifiedIndexHandler", "error": "unknown", "warning": "unknown"}
+        self.assertListEqual(list(self.handler.check_qc()), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
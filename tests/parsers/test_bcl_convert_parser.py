@@ -0,0 +1,114 @@
+import os
+import shutil
+import tempfile
+
+import unittest
+
+from checkQC.parsers.bcl_convert_parser import BclConvertParser
+from checkQC.exceptions import DemultiplexStatsNotFound, MalformedDataSource
+
+
+class TestBclConvertParser(unittest.TestCase):
+
+    class Receiver(object):
+        def __init__(self):
+            self.values = {}
+
+        def send(self, value):
+            key, data = value
+            self.values[key] = data
+
+    runfolder = os.path.join(os.path.dirname(__file__), "..", "resources", "BclConvertDemo")
+    parser_configs = {"BclConvertParser": {"bclconvert_output_path": "."}}
+
+    def setUp(self):
+        self.subscriber = self.Receiver()
+        bcl_convert_parser = BclConvertParser(runfolder=self.runfolder, parser_configurations=self.parser_configs)
+        bcl_convert_parser.add_subscribers(self.subscriber)
+        bcl_convert_parser.run()
+
+    def test_conversion_results(self):
+        conversion_results = self.subscriber.values["ConversionResults"]
+        self.assertListEqual([lane["LaneNumber"] for lane in conversion_results], [1, 2])
+
+        lane_1 = conversion_results[0]
+        self.assertEqual(lane_1["TotalClustersPF"], 10000000)
+        self.assertEqual(lane_1["Yield"], 3000000000)
+        self.assertEqual(lane_1["Undetermined"]["NumberReads"], 1000000)
+        self.assertEqual(lane_1["Undetermined"]["Yield"], 300000000)
+        self.assertListEqual([sample["SampleId"] for sample in lane_1["DemuxResults"]], ["Sample_A", "Sample_B"])
+
+        sample_a = lane_1["DemuxResults"][0]
+        self.assertEqual(sample_a["NumberReads"], 6000000)
+        self.assertEqual(sample_a["Yield"], 1800000000)
+        self.assertListEqual(sample_a["IndexMetrics"],
+                             [{"IndexSequence": "AACCGGTT+TTGGCCAA",
+                               "MismatchCounts": {"0": 5800000, "1": 200000}}])
+        self.assertListEqual([read["YieldQ30"] for read in sample_a["ReadMetrics"]], [810000000, 792000000])
+
+    def test_unknown_barcodes(self):
+        unknown_barcodes = self.subscriber.values["UnknownBarcodes"]
+        self.assertListEqual([lane["Lane"] for lane in unknown_barcodes], [1, 2])
+        self.assertListEqual(list(unknown_barcodes[1]["Barcodes"].items()),
+                             [("GGTTAACC+TTGGCCAA", 2000000), ("AACCGGTT+TTGGCCAA", 300000),
+                              ("NNNNNNNN+NNNNNNNN", 250000)])
+
+    def test_read_rows_in_chunks(self):
+        chunk_size = BclConvertParser.CHUNK_SIZE
+        try:
+            BclConvertParser.CHUNK_SIZE = 4
+            subscriber = self.Receiver()
+            bcl_convert_parser = BclConvertParser(runfolder=self.runfolder,
+                                                  parser_configurations=self.parser_configs)
+            bcl_convert_parser.add_subscribers(subscriber)
+            bcl_convert_parser.run()
+        finally:
+            BclConvertParser.CHUNK_SIZE = chunk_size
+        self.assertListEqual(subscriber.values["ConversionResults"],
+                             self.subscriber.values["ConversionResults"])
+
+    def test_conversion_results_without_quality_metrics(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            runfolder = os.path.join(tmp_dir, "BclConvertDemo")
+            shutil.copytree(self.runfolder, runfolder)
+            os.remove(os.path.join(runfolder, "Reports", "Quality_Metrics.csv"))
+            subscriber = self.Receiver()
+            bcl_convert_parser = BclConvertParser(runfolder=runfolder, parser_configurations=self.parser_configs)
+            bcl_convert_parser.add_subscribers(subscriber)
+            bcl_convert_parser.run()
+        finally:
+            shutil.rmtree(tmp_dir)
+        lane_1 = subscriber.values["ConversionResults"][0]
+        self.assertEqual(lane_1["Yield"], 10000000)
+        self.assertListEqual([(sample["NumberReads"], sample["Yield"]) for sample in lane_1["DemuxResults"]],
+                             [(6000000, 6000000), (3000000, 3000000)])
+
+    def test_read_rows_malformed(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            csv_file = os.path.join(tmp_dir, "Demultiplex_Stats.csv")
+            for content in ("", "Lane,SampleID\n1,Sample_A\n", "Lane,# Reads\nfirst,100\n"):
+                with open(csv_file, "w") as f:
+                    f.write(content)
+                with self.assertRaises(MalformedDataSource):
+                    list(BclConvertParser._read_rows(csv_file, {"Lane": int, "# Reads": int}))
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    def test_run_with_lanes(self):
+        subscriber = self.Receiver()
+        bcl_convert_parser = BclConvertParser(runfolder=self.runfolder, parser_configurations=self.parser_configs)
+        bcl_convert_parser.lanes = {2}
+        bcl_convert_parser.add_subscribers(subscriber)
+        bcl_convert_parser.run()
+        self.assertListEqual([lane["LaneNumber"] for lane in subscriber.values["ConversionResults"]], [2])
+        self.assertListEqual([lane["Lane"] for lane in subscriber.values["UnknownBarcodes"]], [2])
+
+    def test_init_bcl_convert_parser_without_reports(self):
+        with self.assertRaises(DemultiplexStatsNotFound):
+            BclConvertParser(runfolder=self.runfolder, parser_configurations={})
+
+
+if __name__ == '__main__':
+    unittest.main()
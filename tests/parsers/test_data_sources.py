@@ -0,0 +1,102 @@
+import os
+import threading
+
+import unittest
+
+from checkQC.parsers.data_sources import DataSourceRegistry, load_json, load_json_dropping
+
+
+class TestDataSourceRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.loaded = 0
+        self.registry = DataSourceRegistry()
+
+    def loader(self):
+        self.loaded += 1
+        return {"foo": "bar"}
+
+    def test_get_loads_once(self):
+        self.registry.register("foo", self.loader)
+        self.registry.register("foo", self.loader)
+        first = self.registry.get("foo")
+        second = self.registry.get("foo")
+        self.assertIs(first, second)
+        self.assertEqual(self.loaded, 1)
+
+    def test_release_after_last_consumer(self):
+        self.registry.register("foo", self.loader)
+        self.registry.register("foo", self.loader)
+        self.registry.get("foo")
+
+        self.registry.release("foo")
+        self.assertTrue(self.registry.is_loaded("foo"))
+
+        self.registry.release("foo")
+        self.assertFalse(self.registry.is_loaded("foo"))
+        with self.assertRaises(KeyError):
+            self.registry.get("foo")
+
+    def test_get_loads_data_sources_concurrently(self):
+        bar_loaded = threading.Event()
+
+        def slow_loader():
+            # Only finishes once the other data source has been loaded while this one is loading
+            self.assertTrue(bar_loaded.wait(timeout=5))
+            return "foo"
+
+        self.registry.register("foo", slow_loader)
+        self.registry.register("bar", self.loader)
+        results = {}
+        thread = threading.Thread(target=lambda: results.update(foo=self.registry.get("foo")))
+        thread.start()
+        results["bar"] = self.registry.get("bar")
+        bar_loaded.set()
+        thread.join(timeout=5)
+        self.assertDictEqual(results, {"foo": "foo", "bar": {"foo": "bar"}})
+
+    def test_get_loads_once_from_several_threads(self):
+        def loader():
+            self.loaded += 1
+            return object()
+
+        self.registry.register("foo", loader)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.registry.get("foo"))) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=5)
+        self.assertEqual(self.loaded, 1)
+        self.assertEqual(len(set(map(id, results))), 1)
+
+    def test_get_without_consumer(self):
+        with self.assertRaises(KeyError):
+            self.registry.get("foo")
+
+    def test_load_json(self):
+        stats_json = os.path.join(os.path.dirname(__file__), "..", "resources",
+                                  "170726_D00118_0303_BCB1TVANXX", "Data", "Intensities", "BaseCalls",
+                                  "Stats", "Stats.json")
+        self.assertEqual(load_json(stats_json)["RunId"], "170726_D00118_0303_BCB1TVANXX")
+
+    def test_load_json_dropping(self):
+        stats_json = os.path.join(os.path.dirname(__file__), "..", "resources",
+                                  "170726_D00118_0303_BCB1TVANXX", "Data", "Intensities", "BaseCalls",
+                                  "Stats", "Stats.json")
+        dropped = []
+
+        def drop(json_object):
+            if "DemuxResults" in json_object and json_object["LaneNumber"] != 2:
+                dropped.append(json_object["LaneNumber"])
+                return True
+            return False
+
+        data = load_json_dropping(stats_json, drop)
+        self.assertListEqual([lane["LaneNumber"] for lane in data["ConversionResults"]], [2])
+        self.assertEqual(len(dropped), 7)
+        self.assertEqual(len(data["UnknownBarcodes"]), 8)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import os
+
+import unittest
+
+import mock
+from interop import py_interop_metrics, py_interop_run_metrics
+
+from checkQC.parsers.extended_tile_metrics_parser import ExtendedTileMetricsParser
+from checkQC.exceptions import InteropNotFound
+
+
+class TestExtendedTileMetricsParser(unittest.TestCase):
+
+    class Receiver(object):
+        def __init__(self):
+            self.values = []
+
+        def send(self, value):
+            key, data = value
+            if key == "occupancy":
+                self.values.append(data)
+
+    runfolder = os.path.join(os.path.dirname(__file__), "..", "resources", "MiSeqDemo")
+
+    @staticmethod
+    def create_run_metrics(tiles):
+        run_metrics = py_interop_run_metrics.run_metrics()
+        for lane, tile, wells, clusters_pf, occupied in tiles:
+            run_metrics.tile_metric_set().insert(
+                py_interop_metrics.tile_metric(lane, tile, 0.0, 0.0, wells, clusters_pf,
+                                               py_interop_metrics.read_metric_vector()))
+            if occupied is not None:
+                run_metrics.extended_tile_metric_set().insert(
+                    py_interop_metrics.extended_tile_metric(lane, tile, occupied))
+        return run_metrics
+
+    def run_parser(self, run_metrics, lanes=None):
+        parser = ExtendedTileMetricsParser(runfolder=self.runfolder, parser_configurations=None)
+        parser.lanes = lanes
+        subscriber = self.Receiver()
+        parser.add_subscribers(subscriber)
+        with mock.patch("checkQC.parsers.extended_tile_metrics_parser.load_interop_run_metrics",
+                        return_value=run_metrics):
+            parser.run()
+        return subscriber.values
+
+    def test_run(self):
+        run_metrics = self.create_run_metrics([(1, 1101, 1000.0, 700.0, 800.0),
+                                               (1, 1102, 1000.0, 500.0, 900.0),
+                                               (2, 1101, 1000.0, 600.0, 600.0),
+                                               # A tile without extended tile metrics is not included
+                                               (2, 1102, 1000.0, 100.0, None)])
+        values = self.run_parser(run_metrics)
+        self.assertEqual(len(values), 2)
+        self.assertDictEqual(values[0], {"lane": 1, "tiles": 2, "percent_occupied": 85.0, "percent_pf": 60.0,
+                                         "percent_occupied_not_pf": 25.0})
+        self.assertDictEqual(values[1], {"lane": 2, "tiles": 1, "percent_occupied": 60.0, "percent_pf": 60.0,
+                                         "percent_occupied_not_pf": 0.0})
+
+    def test_run_with_lanes(self):
+        run_metrics = self.create_run_metrics([(1, 1101, 1000.0, 700.0, 800.0), (2, 1101, 1000.0, 600.0, 600.0)])
+        values = self.run_parser(run_metrics, lanes={2})
+        self.assertListEqual([value["lane"] for value in values], [2])
+
+    def test_run_without_extended_tile_metrics(self):
+        run_metrics = self.create_run_metrics([(1, 1101, 1000.0, 700.0, None)])
+        self.assertListEqual(self.run_parser(run_metrics), [])
+
+    def test_run_on_miseq_runfolder(self):
+        # MiSeq runs have no extended tile metrics
+        parser = ExtendedTileMetricsParser(runfolder=self.runfolder, parser_configurations=None)
+        subscriber = self.Receiver()
+        parser.add_subscribers(subscriber)
+        parser.run()
+        self.assertListEqual(subscriber.values, [])
+
+    def test_missing_interop(self):
+        with self.assertRaises(InteropNotFound):
+            ExtendedTileMetricsParser(runfolder=os.path.join(self.runfolder, "InterOp"), parser_configurations=None)
+
+
+if __name__ == '__main__':
+    unittest.main()
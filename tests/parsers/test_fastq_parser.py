@@ -0,0 +1,96 @@
+import gzip
+import os
+import shutil
+import tempfile
+
+import unittest
+
+from checkQC.parsers.fastq_parser import FastqParser, sample_fastq
+from checkQC.exceptions import FastqNotFound, ConfigurationError
+
+
+class TestFastqParser(unittest.TestCase):
+
+    class Receiver(object):
+        def __init__(self):
+            self.values = []
+
+        def send(self, value):
+            key, data = value
+            if key == "fastq_sample":
+                self.values.append(data)
+
+    ADAPTER = "AGATCGGAAGAGCACACGTCT"
+
+    @staticmethod
+    def write_fastq(path, sequences):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with gzip.open(path, "wt") as f:
+            for i, sequence in enumerate(sequences):
+                f.write("@read{}\n{}\n+\n{}\n".format(i, sequence, "I" * len(sequence)))
+
+    def setUp(self):
+        self.runfolder = tempfile.mkdtemp()
+        fastq_dir = os.path.join(self.runfolder, "Data", "Intensities", "BaseCalls", "Project_1")
+        # Sample_1: every other read is an adapter dimer
+        self.write_fastq(os.path.join(fastq_dir, "Sample_1", "Sample_1_S1_L001_R1_001.fastq.gz"),
+                         [self.ADAPTER, "ACGTACGTAA"] * 50)
+        self.write_fastq(os.path.join(fastq_dir, "Sample_1", "Sample_1_S1_L001_I1_001.fastq.gz"), ["ACGTAC"] * 10)
+        # Sample_2: only GC
+        self.write_fastq(os.path.join(fastq_dir, "Sample_2", "Sample_2_S2_L002_R1_001.fastq.gz"),
+                         ["GGCCNN"] * 20)
+        self.write_fastq(os.path.join(self.runfolder, "Data", "Intensities", "BaseCalls",
+                                      "Undetermined_S0_L001_R1_001.fastq.gz"), ["AAAA"] * 10)
+
+    def tearDown(self):
+        shutil.rmtree(self.runfolder)
+
+    def run_parser(self, parser_configuration=None, lanes=None):
+        parser = FastqParser(runfolder=self.runfolder,
+                             parser_configurations={"FastqParser": parser_configuration or {}})
+        parser.lanes = lanes
+        subscriber = self.Receiver()
+        parser.add_subscribers(subscriber)
+        parser.run()
+        return subscriber.values
+
+    def test_run(self):
+        values = self.run_parser({"processes": 2})
+        self.assertListEqual([(value["sample_id"], value["lane"], value["read"]) for value in values],
+                             [("Sample_1", 1, 1), ("Sample_2", 2, 1)])
+        sample_1, sample_2 = values
+        self.assertEqual(sample_1["reads_sampled"], 100)
+        self.assertEqual(sample_1["file"], "Sample_1_S1_L001_R1_001.fastq.gz")
+        self.assertEqual(sample_1["adapter_counts"]["Illumina Universal Adapter"], 50)
+        self.assertEqual(sample_1["adapter_counts"]["Nextera Transposase Sequence"], 0)
+        self.assertListEqual(sample_1["top_sequences"], [[self.ADAPTER, 50], ["ACGTACGTAA", 50]])
+        self.assertEqual(sample_2["gc_content"], 100)
+
+    def test_run_samples_bounded_number_of_reads(self):
+        values = self.run_parser({"processes": 1, "reads_per_file": 10, "stride": 2})
+        self.assertEqual(values[0]["reads_sampled"], 10)
+        # Every other read is sampled, which are all adapter dimers
+        self.assertEqual(values[0]["adapter_counts"]["Illumina Universal Adapter"], 10)
+
+    def test_run_with_lanes(self):
+        values = self.run_parser(lanes={2})
+        self.assertListEqual([value["sample_id"] for value in values], ["Sample_2"])
+
+    def test_fastq_not_found(self):
+        with self.assertRaises(FastqNotFound):
+            FastqParser(runfolder=self.runfolder, parser_configurations={"FastqParser": {"fastq_path": "fastq"}})
+
+    def test_invalid_configuration(self):
+        with self.assertRaises(ConfigurationError):
+            FastqParser(runfolder=self.runfolder, parser_configurations={"FastqParser": {"stride": 0}})
+
+    def test_sample_fastq_without_called_bases(self):
+        path = os.path.join(self.runfolder, "N_S1_L001_R1_001.fastq.gz")
+        self.write_fastq(path, ["NNNN"] * 3)
+        summary = sample_fastq(path, 10, 1, [], 50)
+        self.assertEqual(summary["reads_sampled"], 3)
+        self.assertIsNone(summary["gc_content"])
+
+
+if __name__ == '__main__':
+    unittest.main()
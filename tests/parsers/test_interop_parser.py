@@ -4,6 +4,8 @@ import os
 import unittest
 
 from checkQC.parsers.interop_parser import InteropParser
+from checkQC.parsers.data_sources import load_interop_run_metrics
+from checkQC.exceptions import InteropNotFound
 
 
 class TestInteropParser(unittest.TestCase):
@@ -12,6 +14,7 @@ class TestInteropParser(unittest.TestCase):
         def __init__(self):
             self.error_rate_values = []
             self.percent_q30_values = []
+            self.clusters_pf_values = []
             self.subscriber = self.subscribe()
             next(self.subscriber)
 
@@ -23,6 +26,8 @@ class TestInteropParser(unittest.TestCase):
                     self.error_rate_values.append(interop_stat)
                 if key == "percent_q30":
                     self.percent_q30_values.append(interop_stat)
+                if key == "clusters_pf":
+                    self.clusters_pf_values.append(interop_stat)
 
         def send(self, value):
             self.subscriber.send(value)
@@ -45,3 +50,38 @@ class TestInteropParser(unittest.TestCase):
                              [('percent_q30', {'lane': 1, 'read': 1, 'percent_q30': 93.42070007324219}),
                               ('percent_q30', {'lane': 1, 'read': 2, 'percent_q30': 84.4270248413086})])
 
+    def test_clusters_pf(self):
+        self.assertListEqual(self.subscriber.clusters_pf_values,
+                             [('clusters_pf', {'lane': 1, 'clusters_pf': 31275807})])
+
+    def test_run_with_lanes(self):
+        interop_parser = InteropParser(runfolder=self.runfolder, parser_configurations=None)
+        interop_parser.lanes = {2}
+        subscriber = self.Receiver()
+        interop_parser.add_subscribers(subscriber)
+        interop_parser.run()
+        # The MiSeq run only has one lane
+        self.assertListEqual(subscriber.clusters_pf_values, [])
+        self.assertListEqual(subscriber.percent_q30_values, [])
+
+    def test_run_with_lanes_only_summarizes_selected_lanes(self):
+        runfolder = os.path.join(os.path.dirname(__file__), "..", "resources", "170726_D00118_0303_BCB1TVANXX")
+        values = {}
+        for lanes in (None, {3, 5}):
+            interop_parser = InteropParser(runfolder=runfolder, parser_configurations=None)
+            interop_parser.lanes = lanes
+            subscriber = self.Receiver()
+            interop_parser.add_subscribers(subscriber)
+            interop_parser.run()
+            values[lanes is None] = [value for _, value in subscriber.clusters_pf_values]
+        self.assertListEqual(values[False], [value for value in values[True] if value["lane"] in (3, 5)])
+
+        interop_parser = InteropParser(runfolder=runfolder, parser_configurations=None)
+        interop_parser.lanes = {3}
+        run_metrics = interop_parser._selected_run_metrics(load_interop_run_metrics(runfolder))
+        self.assertListEqual(list(run_metrics.tile_metric_set().lanes()), [3])
+
+    def test_init_interop_parser_without_interop(self):
+        with self.assertRaises(InteropNotFound):
+            InteropParser(runfolder=os.path.join(os.path.dirname(__file__), "..", "resources", "Rapid"),
+                          parser_configurations=None)
@@ -1,4 +1,5 @@
 
+import asyncio
 import os
 
 import unittest
@@ -24,6 +25,9 @@ class TestStatsJsonParser(unittest.TestCase):
         def send(self, value):
             self.subscriber.send(value)
 
+        async def send_async(self, value):
+            self.send(value)
+
     runfolder = os.path.join(os.path.dirname(__file__), "..", "resources",
                              "170726_D00118_0303_BCB1TVANXX")
     parser_configs = {"StatsJsonParser": {"bcl2fastq_output_path": "Data/Intensities/BaseCalls"}}
@@ -35,6 +39,38 @@ class TestStatsJsonParser(unittest.TestCase):
     def test_read_flowcell_name(self):
         self.assertListEqual(self.subscriber.values, ["CB1TVANXX"])
 
+    def test_run_async(self):
+        stats_json_parser = StatsJsonParser(runfolder=self.runfolder, parser_configurations=self.parser_configs)
+        subscriber = self.Receiver()
+        stats_json_parser.add_subscribers(subscriber)
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(stats_json_parser.run_async())
+        finally:
+            loop.close()
+        self.assertListEqual(subscriber.values, ["CB1TVANXX"])
+
+    def test_run_with_lanes(self):
+        stats_json_parser = StatsJsonParser(runfolder=self.runfolder, parser_configurations=self.parser_configs)
+        stats_json_parser.lanes = {7}
+        values = {}
+
+        class Receiver(object):
+            def send(self, value):
+                key, data = value
+                values[key] = data
+
+        stats_json_parser.add_subscribers(Receiver())
+        stats_json_parser.run()
+        self.assertEqual(values["Flowcell"], "CB1TVANXX")
+        self.assertListEqual([lane["LaneNumber"] for lane in values["ConversionResults"]], [7])
+        self.assertListEqual([lane["Lane"] for lane in values["UnknownBarcodes"]], [7])
+        self.assertListEqual([lane["LaneNumber"] for lane in values["ReadInfosForLanes"]], [7])
+        # The entries of the other lanes are dropped when the file is loaded, so the data source is
+        # specific to the selected lanes
+        self.assertListEqual(list(stats_json_parser.data_sources()),
+                             [("Stats.json", stats_json_parser.file_path, (7,))])
+
     def test_init_stats_json_parser_without_valid_parser_config(self):
         with self.assertRaises(ConfigurationError):
             StatsJsonParser("", parser_configurations={"StatsJsonParser": ""})
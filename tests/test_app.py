@@ -1,8 +1,14 @@
 import unittest
 
+import asyncio
 import os
+import shutil
+import tempfile
+
+import yaml
 
 from checkQC.app import App
+from checkQC.results_store import ResultsStore
 
 
 class TestApp(unittest.TestCase):
@@ -19,6 +25,167 @@ class TestApp(unittest.TestCase):
         # The test data contains fatal qc errors
         self.assertEqual(app.run(), 1)
 
+    def test_configure_and_run_async(self):
+        expected_reports = App(runfolder=self.RUNFOLDER).configure_and_run()
+        app = App(runfolder=self.RUNFOLDER)
+        loop = asyncio.new_event_loop()
+        try:
+            reports = loop.run_until_complete(app.configure_and_run_async())
+        finally:
+            loop.close()
+        self.assertEqual(app.exit_status, 1)
+        self.assertDictEqual(reports, expected_reports)
+
+    def test_configure_and_run_with_only_and_skip(self):
+        app = App(runfolder=self.RUNFOLDER, only=["ClusterPFHandler", "ReadsPerSampleHandler"],
+                  skip=["ReadsPerSampleHandler"])
+        reports = app.configure_and_run()
+        # Only the ClusterPFHandler is run, and it only finds warnings
+        self.assertEqual(app.exit_status, 0)
+        self.assertListEqual(sorted(reports.keys()), ["ClusterPFHandler", "exit_status", "run_summary"])
+        self.assertListEqual([handler["handler"] for handler in reports["run_summary"]["handlers"]],
+                             ["ClusterPFHandler"])
+
+    def test_configure_and_run_with_unknown_only(self):
+        app = App(runfolder=self.RUNFOLDER, only=["Q30Hander"])
+        app.configure_and_run()
+        self.assertEqual(app.exit_status, 1)
+
+    def test_configure_and_run_with_lanes(self):
+        app = App(runfolder=self.RUNFOLDER, lanes=[1, 2])
+        reports = app.configure_and_run()
+        # The fatal qc errors are all on lane 7
+        self.assertEqual(app.exit_status, 0)
+        self.assertListEqual([report["data"]["lane"] for report in reports["ClusterPFHandler"]], [1])
+
+        app = App(runfolder=self.RUNFOLDER, lanes=[7])
+        app.configure_and_run()
+        self.assertEqual(app.exit_status, 1)
+
+    def test_configure_and_run_with_profile_dir(self):
+        profile_dir = tempfile.mkdtemp()
+        try:
+            expected_reports = App(runfolder=self.RUNFOLDER).configure_and_run()
+            reports = App(runfolder=self.RUNFOLDER, profile_dir=os.path.join(profile_dir, "profile")).\
+                configure_and_run()
+            self.assertDictEqual(reports, expected_reports)
+            profiles = os.listdir(os.path.join(profile_dir, "profile"))
+            self.assertIn("checkqc.collapsed", profiles)
+            self.assertIn("checkqc.configure.pstats", profiles)
+            self.assertIn("checkqc.setup.pstats", profiles)
+            self.assertIn("checkqc.parse.InteropParser.pstats", profiles)
+            self.assertIn("checkqc.report.ClusterPFHandler.pstats", profiles)
+        finally:
+            shutil.rmtree(profile_dir)
+
+    def test_run_with_results_db(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            results_db = os.path.join(tmp_dir, "results.db")
+            app = App(runfolder=self.RUNFOLDER, results_db=results_db)
+            self.assertEqual(app.run(), 1)
+            run = ResultsStore(results_db).get_run("170726_D00118_0303_BCB1TVANXX")
+            self.assertEqual(run["instrument"], "D00118")
+            self.assertEqual(run["exit_status"], 1)
+            self.assertEqual(len(ResultsStore(results_db).query_metrics("clusters_pf")), 8)
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    def test_run_with_lanes_does_not_replace_stored_results(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            results_db = os.path.join(tmp_dir, "results.db")
+            App(runfolder=self.RUNFOLDER, results_db=results_db).configure_and_run()
+            App(runfolder=self.RUNFOLDER, results_db=results_db, lanes=[3]).configure_and_run()
+            self.assertEqual(len(ResultsStore(results_db).query_metrics("clusters_pf")), 8)
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    def test_run_with_only_does_not_replace_stored_results(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            results_db = os.path.join(tmp_dir, "results.db")
+            App(runfolder=self.RUNFOLDER, results_db=results_db).configure_and_run()
+            App(runfolder=self.RUNFOLDER, results_db=results_db, only=["Q30Handler"]).configure_and_run()
+            self.assertEqual(len(ResultsStore(results_db).query_metrics("clusters_pf")), 8)
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    def test_run_with_scratch_dir(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            app = App(runfolder=self.RUNFOLDER, scratch_dir=tmp_dir)
+            reports = app.configure_and_run()
+            self.assertEqual(app.exit_status, 1)
+            self.assertIn("ClusterPFHandler", reports)
+            # The mirror of the runfolder should be removed once the run has finished
+            self.assertListEqual(os.listdir(tmp_dir), [])
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    def _write_config(self, tmp_dir, **changes):
+        config_file = os.path.join(os.path.dirname(__file__), "..", "checkQC", "default_config", "config.yaml")
+        with open(config_file) as f:
+            config = yaml.safe_load(f)
+        config.update(changes)
+        new_config_file = os.path.join(tmp_dir, "config.yaml")
+        with open(new_config_file, "w") as f:
+            yaml.dump(config, f)
+        return new_config_file
+
+    def test_run_with_timeout(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            config_file = self._write_config(tmp_dir, timeouts={"total": None, "stages": {"parse": -1}})
+            app = App(runfolder=self.RUNFOLDER, config_file=config_file)
+            self.assertIsNone(app.configure_and_run())
+            self.assertEqual(app.exit_status, 1)
+            self.assertTrue(app.timed_out)
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    def test_configure_and_run_async_with_timeout(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            config_file = self._write_config(tmp_dir, timeouts={"total": 0})
+            app = App(runfolder=self.RUNFOLDER, config_file=config_file)
+            loop = asyncio.new_event_loop()
+            try:
+                self.assertIsNone(loop.run_until_complete(app.configure_and_run_async()))
+            finally:
+                loop.close()
+            self.assertEqual(app.exit_status, 1)
+            self.assertTrue(app.timed_out)
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    def test_run_without_stats_json(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            config_file = os.path.join(os.path.dirname(__file__), "..", "checkQC", "default_config", "config.yaml")
+            with open(config_file) as f:
+                config = yaml.safe_load(f)
+            config["parser_configurations"]["StatsJsonParser"]["bcl2fastq_output_path"] = "not_demultiplexed"
+            config_without_stats_json = os.path.join(tmp_dir, "config.yaml")
+            with open(config_without_stats_json, "w") as f:
+                yaml.dump(config, f)
+
+            app = App(runfolder=self.RUNFOLDER, config_file=config_without_stats_json)
+            reports = app.configure_and_run()
+            # The handlers which need the Stats.json file are reported as not checked
+            self.assertEqual(app.exit_status, 1)
+            self.assertTrue(reports["ReadsPerSampleHandler"][0]["data"]["not_checked"])
+
+            app = App(runfolder=self.RUNFOLDER, config_file=config_without_stats_json, skip_unavailable=True)
+            reports = app.configure_and_run()
+            # The cluster PF is picked up from the Interop files instead, and the handlers
+            # which need the Stats.json file are skipped, which removes the fatal qc errors.
+            self.assertEqual(app.exit_status, 0)
+            self.assertListEqual([report["data"]["lane"] for report in reports["ClusterPFHandler"]], [1, 7, 8])
+            self.assertNotIn("ReadsPerSampleHandler", reports)
+        finally:
+            shutil.rmtree(tmp_dir)
+
 
 if __name__ == '__main__':
     unittest.main()
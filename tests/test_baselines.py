@@ -0,0 +1,100 @@
+import datetime
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+from checkQC.baselines import TDigest, ThresholdResolver
+from checkQC.results_store import ResultsStore
+
+
+class TestTDigest(unittest.TestCase):
+
+    def test_quantiles(self):
+        values = list(range(10001))
+        random.Random(1).shuffle(values)
+        digest = TDigest()
+        for value in values:
+            digest.update(value)
+
+        self.assertEqual(len(digest), 10001)
+        self.assertAlmostEqual(digest.quantile(0.05), 500, delta=10)
+        self.assertAlmostEqual(digest.quantile(0.5), 5000, delta=50)
+        self.assertAlmostEqual(digest.quantile(0.99), 9900, delta=10)
+        self.assertEqual(digest.quantile(0), 0)
+        self.assertEqual(digest.quantile(1), 10000)
+
+    def test_to_and_from_dict(self):
+        digest = TDigest()
+        for value in range(1000):
+            digest.update(value)
+        restored_digest = TDigest.from_dict(digest.to_dict())
+        for value in range(1000, 2000):
+            restored_digest.update(value)
+        self.assertEqual(len(restored_digest), 2000)
+        self.assertAlmostEqual(restored_digest.quantile(0.5), 1000, delta=20)
+
+    def test_empty_digest(self):
+        self.assertIsNone(TDigest().quantile(0.5))
+        self.assertIsNone(TDigest().percentiles())
+
+
+class TestThresholdResolver(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.results_store = ResultsStore(os.path.join(self.tmp_dir, "results.db"))
+        for run_nbr in range(1, 101):
+            reports = {"exit_status": 0,
+                       "run_summary": {"instrument_and_reagent_type": "hiseq2500_rapidhighoutput_v4",
+                                       "read_length": "125-125"}}
+            metrics = [{"metric": "percent_q30", "lane": 1, "read": 1, "value": run_nbr}]
+            self.results_store.add_run(run_id="run_{}".format(run_nbr), runfolder="/foo", instrument="D00118",
+                                       run_date=datetime.date(2017, 7, 26), reports=reports, metrics=metrics)
+        self.threshold_resolver = ThresholdResolver(self.results_store)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_resolve(self):
+        handler_configs = [{"name": "Q30Handler", "warning": "p10", "error": 50},
+                           {"name": "ErrorRateHandler", "warning": 2, "error": "unknown",
+                            "allow_missing_error_rate": False}]
+        resolved = self.threshold_resolver.resolve(handler_configs, "D00118",
+                                                   "hiseq2500_rapidhighoutput_v4", "125-125")
+        self.assertAlmostEqual(resolved[0]["warning"], 10.5, delta=0.5)
+        self.assertEqual(resolved[0]["error"], 50)
+        self.assertIs(resolved[1], handler_configs[1])
+        # The original configuration should not be changed
+        self.assertEqual(handler_configs[0]["warning"], "p10")
+
+    def test_resolve_from_other_instruments_of_same_type(self):
+        handler_configs = [{"name": "Q30Handler", "warning": "p50", "error": "unknown"}]
+        resolved = self.threshold_resolver.resolve(handler_configs, "D00119",
+                                                   "hiseq2500_rapidhighoutput_v4", "125-125")
+        self.assertAlmostEqual(resolved[0]["warning"], 50.5, delta=0.5)
+
+    def test_resolve_without_baseline(self):
+        handler_configs = [{"name": "Q30Handler", "warning": "p5", "error": "unknown"},
+                           {"name": "ReadsPerSampleHandler", "warning": "p5", "error": "unknown"}]
+        resolved = self.threshold_resolver.resolve(handler_configs, "D00118",
+                                                   "hiseq2500_rapidhighoutput_v4", "51-51")
+        self.assertEqual(resolved[0]["warning"], "unknown")
+        self.assertEqual(resolved[1]["warning"], "unknown")
+
+    def test_baseline_is_only_updated_for_new_runs(self):
+        reports = {"exit_status": 0,
+                   "run_summary": {"instrument_and_reagent_type": "hiseq2500_rapidhighoutput_v4",
+                                   "read_length": "125-125"}}
+        for _ in range(100):
+            self.results_store.add_run(run_id="run_1", runfolder="/foo", instrument="D00118",
+                                       run_date=datetime.date(2017, 7, 26), reports=reports,
+                                       metrics=[{"metric": "percent_q30", "lane": 1, "read": 1, "value": 1}])
+        percentiles = self.results_store.get_baseline_percentiles("D00118", "hiseq2500_rapidhighoutput_v4",
+                                                                  "125-125", "percent_q30")
+        self.assertAlmostEqual(percentiles[50], 50.5, delta=0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+
+import os
+import shutil
+import tempfile
+
+import mock
+import yaml
+
+from checkQC.app import App
+from checkQC.config_diff import ConfigDiff
+from checkQC.parsers.interop_parser import InteropParser
+from checkQC.parsers.stats_json_parser import StatsJsonParser
+
+
+class TestConfigDiff(unittest.TestCase):
+
+    RUNFOLDER = os.path.join(os.path.dirname(__file__), "resources", "170726_D00118_0303_BCB1TVANXX")
+    CONFIG = os.path.join(os.path.dirname(__file__), "..", "checkQC", "default_config", "config.yaml")
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        with open(self.CONFIG) as f:
+            config = yaml.safe_load(f)
+        # Only warn, never fail, on the hiseq2500_rapidhighoutput_v4 runs
+        for handler in config["default_handlers"]:
+            handler["error"] = "unknown"
+        for read_length_config in config["hiseq2500_rapidhighoutput_v4"].values():
+            for handler in read_length_config["handlers"]:
+                handler["error"] = "unknown"
+        self.new_config = os.path.join(self.tmp_dir, "config.yaml")
+        with open(self.new_config, "w") as f:
+            yaml.dump(config, f)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_diff_runfolder(self):
+        config_diff = ConfigDiff([self.CONFIG, self.new_config])
+        with mock.patch.object(InteropParser, "run", autospec=True, side_effect=InteropParser.run) as interop_run, \
+                mock.patch.object(StatsJsonParser, "run", autospec=True,
+                                  side_effect=StatsJsonParser.run) as stats_json_run:
+            result = config_diff.diff_runfolder(self.RUNFOLDER)
+
+        # The runfolder should only be parsed once, even though it is checked against two configurations
+        self.assertEqual(interop_run.call_count, 1)
+        self.assertEqual(stats_json_run.call_count, 1)
+
+        self.assertTrue(result["status_changed"])
+        old, new = result["configurations"]
+        self.assertEqual(old["exit_status"], 1)
+        self.assertEqual(new["exit_status"], 0)
+        self.assertListEqual(old["added"], [])
+        self.assertListEqual(new["added"], [])
+        self.assertTrue(new["removed"])
+        self.assertTrue(all(report["type"] == "error" for report in new["removed"]))
+
+    def test_diff_runfolder_sets_up_handlers_like_app(self):
+        results_db = os.path.join(self.tmp_dir, "results.db")
+        config_diff = ConfigDiff([self.CONFIG, self.new_config], results_db=results_db)
+        with mock.patch.object(App, "create_qc_engine", autospec=True,
+                               side_effect=App.create_qc_engine) as create_qc_engine:
+            config_diff.diff_runfolder(self.RUNFOLDER)
+        self.assertEqual(create_qc_engine.call_count, 2)
+        self.assertTrue(all(call[0][0]._results_db == results_db for call in create_qc_engine.call_args_list))
+
+    def test_run(self):
+        result = ConfigDiff([self.CONFIG, self.CONFIG]).run([self.RUNFOLDER, "/does/not/exist"])
+        self.assertListEqual(result["status_changed"], [])
+        self.assertFalse(result["runs"][0]["status_changed"])
+        self.assertIn("error", result["runs"][1])
+
+
+if __name__ == '__main__':
+    unittest.main()
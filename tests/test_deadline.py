@@ -0,0 +1,56 @@
+import unittest
+
+import time
+
+from checkQC.deadline import Deadline
+from checkQC.exceptions import QCTimeout
+
+
+class TestDeadline(unittest.TestCase):
+
+    def test_no_limits(self):
+        deadline = Deadline()
+        deadline.start_stage(Deadline.PARSE)
+        deadline.check()
+        self.assertIsNone(deadline.remaining())
+
+    def test_total_limit(self):
+        deadline = Deadline(total=0.01)
+        deadline.check()
+        time.sleep(0.02)
+        with self.assertRaises(QCTimeout):
+            deadline.check()
+        self.assertEqual(deadline.remaining(), 0)
+
+    def test_stage_limit(self):
+        deadline = Deadline(stages={Deadline.CONFIGURE: 0.01})
+        deadline.start_stage(Deadline.CONFIGURE)
+        self.assertLessEqual(deadline.remaining(), 0.01)
+        time.sleep(0.02)
+        with self.assertRaises(QCTimeout):
+            deadline.check()
+
+    def test_stage_limit_only_applies_to_its_stage(self):
+        deadline = Deadline(stages={Deadline.CONFIGURE: 0.01})
+        deadline.start_stage(Deadline.PARSE)
+        time.sleep(0.02)
+        deadline.check()
+
+    def test_cancel(self):
+        deadline = Deadline()
+        deadline.cancel()
+        with self.assertRaises(QCTimeout):
+            deadline.check()
+
+    def test_from_config(self):
+        deadline = Deadline.from_config({"timeouts": {"total": 300, "stages": {"parse": 240}}})
+        self.assertEqual(deadline.total, 300)
+        self.assertDictEqual(deadline.stages, {"parse": 240})
+
+        deadline = Deadline.from_config({"timeouts": None})
+        self.assertIsNone(deadline.total)
+        self.assertDictEqual(deadline.stages, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import unittest
+
+from checkQC.execution_plan import ExecutionPlan
+from checkQC.handlers.cluster_pf_handler import ClusterPFHandler
+from checkQC.handlers.q30_handler import Q30Handler
+from checkQC.handlers.error_rate_handler import ErrorRateHandler
+from checkQC.handlers.occupancy_handler import OccupancyHandler
+from checkQC.parsers.stats_json_parser import StatsJsonParser
+from checkQC.parsers.interop_parser import InteropParser
+from checkQC.qc_engine import QCEngine
+from checkQC.exceptions import ConfigurationError
+
+
+class TestExecutionPlan(unittest.TestCase):
+
+    def setUp(self):
+        ExecutionPlan.clear_cache()
+        self.handler_config = [{"name": "ClusterPFHandler", "warning": 180, "error": "unknown"},
+                               {"name": "Q30Handler", "warning": 80, "error": "unknown"},
+                               {"name": "ReadsPerSampleHandler", "warning": "unknown", "error": "unknown"}]
+
+    def tearDown(self):
+        ExecutionPlan.clear_cache()
+
+    def test_get_is_cached(self):
+        plan = ExecutionPlan.get(self.handler_config)
+        self.assertIs(ExecutionPlan.get([dict(config) for config in self.handler_config]), plan)
+        self.assertIsNot(ExecutionPlan.get(self.handler_config, skip=["Q30Handler"]), plan)
+        self.assertIsNot(ExecutionPlan.get(self.handler_config, prune_disabled=False), plan)
+
+    def test_compile_prunes_disabled_handlers(self):
+        plan = ExecutionPlan(self.handler_config)
+        self.assertListEqual([prototype.clazz for prototype in plan.compile()], [ClusterPFHandler, Q30Handler])
+        # Compiling is only done once
+        self.assertIs(plan.compile(), plan.handler_prototypes)
+
+        plan = ExecutionPlan(self.handler_config, prune_disabled=False)
+        self.assertEqual(len(plan.compile()), 3)
+
+    def test_compile_keeps_handlers_with_other_checks(self):
+        plan = ExecutionPlan([{"name": "ErrorRateHandler", "warning": "unknown", "error": "unknown",
+                               "allow_missing_error_rate": False},
+                              {"name": "OccupancyHandler", "warning": "unknown", "error": "unknown",
+                               "max_percent_occupied_not_pf": 5}])
+        self.assertListEqual([prototype.clazz for prototype in plan.compile()], [ErrorRateHandler, OccupancyHandler])
+
+    def test_only_and_skip(self):
+        plan = ExecutionPlan(self.handler_config, only=["ClusterPFHandler", "Q30Handler"], skip=["Q30Handler"])
+        self.assertListEqual(plan.selected_handler_config(), [self.handler_config[0]])
+        self.assertListEqual(list(plan.parser_graph().items()), [(StatsJsonParser, ["ClusterPFHandler"])])
+
+    def test_unknown_only_or_skip(self):
+        with self.assertRaises(ConfigurationError) as context:
+            ExecutionPlan.get(self.handler_config, only=["Q30Hander"])
+        self.assertIn("Q30Hander", str(context.exception))
+        with self.assertRaises(ConfigurationError):
+            ExecutionPlan(self.handler_config, skip=["ClusterPFHandler", "NoSuchHandler"])
+
+    def test_parser_graph(self):
+        graph = ExecutionPlan(self.handler_config).parser_graph()
+        self.assertListEqual(list(graph.items()), [(StatsJsonParser, ["ClusterPFHandler"]),
+                                                   (InteropParser, ["Q30Handler"])])
+
+    def test_compile_with_invalid_config(self):
+        with self.assertRaises(ConfigurationError):
+            ExecutionPlan([{"name": "Q30Handler", "warning": 80}]).compile()
+
+    def test_create_handlers(self):
+        plan = ExecutionPlan(self.handler_config)
+        first_run = plan.create_handlers()
+        second_run = plan.create_handlers()
+        self.assertEqual(len(first_run), 2)
+        handler, parser_factories = first_run[0]
+        self.assertIsInstance(handler, ClusterPFHandler)
+        self.assertListEqual(parser_factories, [StatsJsonParser] + list(handler.fallback_parsers()))
+        self.assertIsNot(handler, second_run[0][0])
+
+    def test_qc_engine_with_execution_plan(self):
+        plan = ExecutionPlan(self.handler_config)
+        qc_engine = QCEngine(runfolder="/does/not/exist", parser_configurations={},
+                             handler_config=None, execution_plan=plan)
+        qc_engine._create_handlers()
+        self.assertListEqual([type(handler) for handler in qc_engine._handlers], [ClusterPFHandler, Q30Handler])
+        self.assertTrue(qc_engine._validate_configurations())
+
+
+if __name__ == '__main__':
+    unittest.main()
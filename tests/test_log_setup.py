@@ -0,0 +1,51 @@
+import unittest
+
+import io
+import json
+import logging
+from logging.handlers import QueueHandler
+
+from checkQC.log_setup import JsonFormatter, queue_handlers, stop_queue
+
+
+class TestJsonFormatter(unittest.TestCase):
+
+    def test_format(self):
+        record = logging.LogRecord("checkQC.app", logging.WARNING, "app.py", 1, "QC warning: %s", ("low",), None)
+        record.qc_handler = "ClusterPFHandler"
+        record.qc_data = {"lane": 1}
+        entry = json.loads(JsonFormatter().format(record))
+        self.assertEqual(entry["level"], "WARNING")
+        self.assertEqual(entry["logger"], "checkQC.app")
+        self.assertEqual(entry["message"], "QC warning: low")
+        self.assertEqual(entry["qc_handler"], "ClusterPFHandler")
+        self.assertDictEqual(entry["qc_data"], {"lane": 1})
+        self.assertNotIn("args", entry)
+
+
+class TestQueueHandlers(unittest.TestCase):
+
+    def setUp(self):
+        self.logger = logging.getLogger("checkQC.test_log_setup")
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+        self.stream = io.StringIO()
+        handler = logging.StreamHandler(self.stream)
+        handler.setFormatter(JsonFormatter())
+        self.logger.addHandler(handler)
+
+    def tearDown(self):
+        for handler in self.logger.handlers[:]:
+            self.logger.removeHandler(handler)
+
+    def test_records_are_written_through_queue(self):
+        queue_handlers(self.logger)
+        self.assertEqual(len(self.logger.handlers), 1)
+        self.assertIsInstance(self.logger.handlers[0], QueueHandler)
+
+        self.logger.warning("QC warning: %s", "low", extra={"qc_handler": "ClusterPFHandler"})
+        stop_queue()
+
+        entry = json.loads(self.stream.getvalue())
+        self.assertEqual(entry["message"], "QC warning: low")
+        self.assertEqual(entry["qc_handler"], "ClusterPFHandler")
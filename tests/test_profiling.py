@@ -0,0 +1,85 @@
+import unittest
+
+import os
+import shutil
+import tempfile
+import threading
+
+from checkQC import profiling
+from checkQC.profiling import StageProfiler, StackSampler, Profiler
+
+
+def busy(stop_event):
+    while not stop_event.is_set():
+        sum(range(1000))
+
+
+class TestStage(unittest.TestCase):
+
+    def test_nested_stages(self):
+        self.assertListEqual(profiling.current_stage(), [])
+        with profiling.stage("parse"):
+            with profiling.stage("InteropParser"):
+                self.assertListEqual(profiling.current_stage(), ["parse", "InteropParser"])
+            self.assertListEqual(profiling.current_stage(), ["parse"])
+        self.assertListEqual(profiling.current_stage(), [])
+
+    def test_stage_is_kept_per_thread(self):
+        stages = []
+        with profiling.stage("parse"):
+            thread = threading.Thread(target=lambda: stages.append(profiling.current_stage()))
+            thread.start()
+            thread.join()
+        self.assertListEqual(stages, [[]])
+
+    def test_in_stages(self):
+        self.assertListEqual(profiling.in_stages(["parse", "StatsJsonParser"], profiling.current_stage),
+                             ["parse", "StatsJsonParser"])
+        self.assertListEqual(profiling.current_stage(), [])
+
+
+class TestStageProfiler(unittest.TestCase):
+
+    def test_profiles_each_stage(self):
+        stage_profiler = StageProfiler()
+        stage_profiler.start()
+        with profiling.stage("parse"), profiling.stage("InteropParser"):
+            sum(range(1000))
+        with profiling.stage("report"):
+            sum(range(1000))
+        stage_profiler.stop()
+        self.assertListEqual(sorted(stage_profiler.profiles),
+                             ["checkqc", "checkqc.parse", "checkqc.parse.InteropParser", "checkqc.report"])
+
+
+class TestStackSampler(unittest.TestCase):
+
+    def test_samples_are_labelled_with_stage(self):
+        stop = threading.Event()
+        thread = threading.Thread(target=profiling.in_stages, args=(["parse", "InteropParser"], busy, stop))
+        thread.start()
+        try:
+            collapsed = StackSampler(interval=0.001).sample_for(0.1)
+        finally:
+            stop.set()
+            thread.join()
+        stacks = [line.rsplit(" ", 1)[0] for line in collapsed.splitlines()]
+        self.assertTrue(any(stack.startswith("checkqc;parse;InteropParser;") and
+                            stack.endswith("test_profiling.py:busy") for stack in stacks))
+
+
+class TestProfiler(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_writes_profiles(self):
+        output_dir = os.path.join(self.tmp_dir, "profile")
+        with Profiler(output_dir, interval=0.001):
+            with profiling.stage("setup"):
+                sum(range(1000))
+        self.assertListEqual(sorted(os.listdir(output_dir)),
+                             ["checkqc.collapsed", "checkqc.pstats", "checkqc.setup.pstats"])
@@ -1,3 +1,6 @@
+import asyncio
+import threading
+import time
 from unittest import TestCase
 from mock import create_autospec, MagicMock
 
@@ -6,7 +9,8 @@ from checkQC.handlers.qc_handler_factory import QCHandlerFactory
 from checkQC.handlers.q30_handler import Q30Handler
 from checkQC.handlers.undetermined_percentage_handler import UndeterminedPercentageHandler
 from checkQC.parsers.parser import Parser
-from checkQC.exceptions import ConfigurationError
+from checkQC.exceptions import ConfigurationError, DataSourceNotFound, QCTimeout
+from checkQC.deadline import Deadline
 
 class TestQCEngine(TestCase):
 
@@ -29,6 +33,74 @@ class TestQCEngine(TestCase):
         def __hash__(self):
             return hash(self.__class__.__name__)
 
+    class MissingDataParser(Parser):
+
+        def __init__(self, runfolder, parser_configurations, *args, **kwargs):
+            raise DataSourceNotFound("No data here!")
+
+    class SharedDataParser(Parser):
+
+        loaded = 0
+
+        def __init__(self, runfolder, parser_configurations, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.runfolder = runfolder
+
+        @staticmethod
+        def load():
+            TestQCEngine.SharedDataParser.loaded += 1
+            return "Shared value!"
+
+        def data_sources(self):
+            return {("shared", self.runfolder): self.load}
+
+        def run(self):
+            self._send_to_subscribers(self._get_data_source(("shared", self.runfolder)))
+
+        def __eq__(self, other):
+            return isinstance(other, self.__class__)
+
+        def __hash__(self):
+            return hash(self.__class__.__name__)
+
+    class OtherSharedDataParser(SharedDataParser):
+        pass
+
+    class SlowDataParser(Parser):
+
+        loaded = 0
+        max_loaded = 0
+        lock = threading.Lock()
+
+        def __init__(self, runfolder, parser_configurations, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+
+        @classmethod
+        def load(cls):
+            with cls.lock:
+                TestQCEngine.SlowDataParser.loaded += 1
+                TestQCEngine.SlowDataParser.max_loaded = max(TestQCEngine.SlowDataParser.max_loaded,
+                                                             TestQCEngine.SlowDataParser.loaded)
+            time.sleep(0.05)
+            return cls.__name__
+
+        def data_sources(self):
+            return {("slow", type(self).__name__): self.load}
+
+        def run(self):
+            self._send_to_subscribers(self._get_data_source(("slow", type(self).__name__)))
+            with self.lock:
+                TestQCEngine.SlowDataParser.loaded -= 1
+
+        def __eq__(self, other):
+            return isinstance(other, self.__class__)
+
+        def __hash__(self):
+            return hash(self.__class__.__name__)
+
+    class OtherSlowDataParser(SlowDataParser):
+        pass
+
     def setUp(self):
         runfolder = "foo"
         handler_config = [{'name': 'Q30Handler', 'warning': 30, 'error': 20},
@@ -66,6 +138,33 @@ class TestQCEngine(TestCase):
         self.assertTrue(len(self.qc_engine._parsers_and_handlers.values()) == 1)
         self.assertListEqual(list(self.qc_engine._parsers_and_handlers.values())[0], self.handlers)
 
+    def test__initiate_parsers_with_fallback(self):
+        self.mock_q30_handler.parser.return_value = self.MissingDataParser
+        self.mock_q30_handler.fallback_parsers.return_value = [self.FakeParser]
+        self.mock_undetermined_perc_handler.parser.return_value = self.MissingDataParser
+        self.mock_undetermined_perc_handler.fallback_parsers.return_value = []
+        self.qc_engine._handlers = self.handlers
+
+        self.qc_engine._initiate_parsers()
+
+        self.assertListEqual(list(self.qc_engine._parsers_and_handlers.values()), [[self.mock_q30_handler]])
+        self.assertListEqual(self.qc_engine._handlers, [self.mock_q30_handler])
+        # Handlers without any available data source are reported as not checked
+        self.assertEqual(len(self.qc_engine._unchecked_results), 1)
+        self.assertEqual(self.qc_engine._unchecked_results[0]["exit_status"], 1)
+        self.assertEqual(self.qc_engine._unchecked_results[0]["report"][0]["type"], "error")
+
+    def test__initiate_parsers_skip_unavailable_handlers(self):
+        self.mock_undetermined_perc_handler.parser.return_value = self.MissingDataParser
+        self.mock_undetermined_perc_handler.fallback_parsers.return_value = []
+        self.qc_engine.skip_unavailable_handlers = True
+        self.qc_engine._handlers = self.handlers
+
+        self.qc_engine._initiate_parsers()
+
+        self.assertListEqual(self.qc_engine._handlers, [self.mock_q30_handler])
+        self.assertListEqual(self.qc_engine._unchecked_results, [])
+
     def test__validate_configurations_all_ok(self):
         self.qc_engine._handlers = self.handlers
         self.qc_engine._parsers_and_handlers = self.parsers_and_handlers
@@ -83,10 +182,12 @@ class TestQCEngine(TestCase):
         self.qc_engine._handlers = self.handlers
         self.qc_engine._parsers_and_handlers = self.parsers_and_handlers
 
+        self.qc_engine.runfolder_archive = runfolder_archive = object()
         self.qc_engine._subscribe_handlers_to_parsers()
 
         parser = list(self.qc_engine._parsers_and_handlers.keys())[0]
         self.assertListEqual(parser.subscribers, self.handlers)
+        self.assertIs(parser.runfolder_archive, runfolder_archive)
 
     def test__run_parsers(self):
         self.qc_engine._handlers = self.handlers
@@ -100,6 +201,46 @@ class TestQCEngine(TestCase):
         for parser in self.qc_engine._parsers_and_handlers.keys():
             self.assertTrue(parser.has_been_run)
 
+    def test__run_parsers_reports_and_drops_handlers(self):
+        self.mock_q30_handler.exit_status.return_value = 1
+        self.mock_undetermined_perc_handler.exit_status.return_value = 0
+        self.qc_engine._handlers = list(self.handlers)
+        self.qc_engine._parsers_and_handlers = self.parsers_and_handlers
+        self.qc_engine._subscribe_handlers_to_parsers()
+
+        self.qc_engine._run_parsers()
+
+        for handler in self.handlers:
+            handler.report.assert_called_once_with()
+        # Once reported, the engine and the parser should not hold on to the handlers any more
+        self.assertListEqual(self.qc_engine._handlers, [])
+        for parser, handlers in self.qc_engine._parsers_and_handlers.items():
+            self.assertListEqual(parser.subscribers, [])
+            self.assertListEqual(handlers, [])
+
+        reports = self.qc_engine._compile_reports()
+        self.assertEqual(reports["exit_status"], 1)
+        self.assertEqual(self.qc_engine.exit_status, 1)
+
+    def test__run_parsers_with_shared_data_source(self):
+        self.SharedDataParser.loaded = 0
+        self.mock_q30_handler.parser.return_value = self.SharedDataParser
+        self.mock_q30_handler.fallback_parsers.return_value = []
+        self.mock_undetermined_perc_handler.parser.return_value = self.OtherSharedDataParser
+        self.mock_undetermined_perc_handler.fallback_parsers.return_value = []
+        self.qc_engine._handlers = self.handlers
+
+        self.qc_engine._initiate_parsers()
+        self.qc_engine._subscribe_handlers_to_parsers()
+        self.qc_engine._run_parsers()
+
+        self.assertEqual(len(self.qc_engine._parsers_and_handlers), 2)
+        self.assertEqual(self.SharedDataParser.loaded, 1)
+        self.mock_q30_handler.send.assert_called_once_with("Shared value!")
+        self.mock_undetermined_perc_handler.send.assert_called_once_with("Shared value!")
+        # The data source should be dropped once both parsers have been run
+        self.assertFalse(self.qc_engine._data_source_registry.is_loaded(("shared", "foo")))
+
     def test__compile_reports(self):
 
         self.qc_engine._handlers = self.handlers
@@ -138,6 +279,74 @@ class TestQCEngine(TestCase):
 
         self.assertEqual(self.qc_engine.exit_status, 1)
 
+    def test_run_async(self):
+        self.mock_q30_handler.exit_status.return_value = 1
+        self.mock_undetermined_perc_handler.exit_status.return_value = 0
+        loop = asyncio.new_event_loop()
+        try:
+            reports = loop.run_until_complete(self.qc_engine.run_async())
+        finally:
+            loop.close()
+        for parser in self.qc_engine._parsers_and_handlers.keys():
+            self.assertTrue(parser.has_been_run)
+        self.mock_q30_handler.send.assert_called_once_with("Fake value!")
+        self.assertEqual(reports["exit_status"], 1)
+        self.assertEqual(self.qc_engine.exit_status, 1)
+
+    def test_run_async_loads_one_data_source_at_a_time(self):
+        self.SlowDataParser.loaded = 0
+        self.SlowDataParser.max_loaded = 0
+        self.mock_q30_handler.parser.return_value = self.SlowDataParser
+        self.mock_q30_handler.fallback_parsers.return_value = []
+        self.mock_undetermined_perc_handler.parser.return_value = self.OtherSlowDataParser
+        self.mock_undetermined_perc_handler.fallback_parsers.return_value = []
+        self.mock_q30_handler.exit_status.return_value = 0
+        self.mock_undetermined_perc_handler.exit_status.return_value = 0
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(self.qc_engine.run_async())
+        finally:
+            loop.close()
+        self.mock_q30_handler.send.assert_called_once_with("SlowDataParser")
+        self.mock_undetermined_perc_handler.send.assert_called_once_with("OtherSlowDataParser")
+        self.assertEqual(self.SlowDataParser.max_loaded, 1)
+
+    def test_run_async_reports_in_executor(self):
+        report_threads = []
+        self.mock_q30_handler.report.side_effect = lambda: report_threads.append(threading.get_ident())
+        self.mock_q30_handler.exit_status.return_value = 0
+        self.mock_undetermined_perc_handler.exit_status.return_value = 0
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(self.qc_engine.run_async())
+        finally:
+            loop.close()
+        self.assertEqual(len(report_threads), 1)
+        self.assertNotEqual(report_threads[0], threading.get_ident())
+
+    def test_run_with_recorded_signals(self):
+        self.qc_engine._record_signals = True
+        self.qc_engine.run()
+        self.assertDictEqual(self.qc_engine.recorded_signals, {"FakeParser": ["Fake value!"]})
+
+        self.mock_q30_handler.reset_mock()
+        self.mock_q30_handler.parser.return_value = self.MissingDataParser
+        replaying_engine = QCEngine(runfolder="foo", handler_config=[{'name': 'Q30Handler'}],
+                                    parser_configurations={},
+                                    qc_handler_factory=create_autospec(QCHandlerFactory),
+                                    recorded_signals={"MissingDataParser": [["Recorded", "value"]]})
+        replaying_engine._handlers = [self.mock_q30_handler]
+        replaying_engine._initiate_parsers()
+        replaying_engine._subscribe_handlers_to_parsers()
+        replaying_engine._run_parsers()
+        self.mock_q30_handler.send.assert_called_once_with(("Recorded", "value"))
+
+    def test_run_with_cancelled_deadline(self):
+        self.qc_engine.deadline = Deadline()
+        self.qc_engine.deadline.cancel()
+        with self.assertRaises(QCTimeout):
+            self.qc_engine.run()
+
     def test_run_with_config_error(self):
         self.mock_q30_handler.validate_configuration.side_effect = ConfigurationError
         self.qc_engine.run()
@@ -0,0 +1,51 @@
+import unittest
+
+import os
+import shutil
+import tempfile
+import time
+
+from checkQC.report_version import ReportVersion
+
+
+class TestReportVersion(unittest.TestCase):
+
+    RUNFOLDER = os.path.join(os.path.dirname(__file__), "resources", "170726_D00118_0303_BCB1TVANXX")
+    CONFIG = os.path.join(os.path.dirname(__file__), "..", "checkQC", "default_config", "config.yaml")
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.runfolder = os.path.join(self.tmp_dir, "runfolder")
+        shutil.copytree(self.RUNFOLDER, self.runfolder)
+        self.config = os.path.join(self.tmp_dir, "config.yaml")
+        shutil.copy(self.CONFIG, self.config)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _touch(self, path, mtime):
+        os.utime(path, (mtime, mtime))
+
+    def test_compute(self):
+        etag, last_modified = ReportVersion(self.runfolder, self.config).compute()
+        self.assertEqual(ReportVersion(self.runfolder, self.config).compute(), (etag, last_modified))
+        self.assertNotEqual(ReportVersion(self.runfolder, self.config, {"lanes": [1]}).compute()[0], etag)
+
+        run_info = os.path.join(self.runfolder, "RunInfo.xml")
+        self._touch(run_info, time.time() + 100)
+        changed_etag, changed_last_modified = ReportVersion(self.runfolder, self.config).compute()
+        self.assertNotEqual(changed_etag, etag)
+        self.assertGreater(changed_last_modified, last_modified)
+
+    def test_compute_config_changed(self):
+        etag, _ = ReportVersion(self.runfolder, self.config).compute()
+        with open(self.config, "a") as f:
+            f.write("\n# A comment\n")
+        self.assertNotEqual(ReportVersion(self.runfolder, self.config).compute()[0], etag)
+
+    def test_compute_missing_runfolder(self):
+        self.assertIsNone(ReportVersion(os.path.join(self.tmp_dir, "missing"), self.config).compute())
+
+
+if __name__ == '__main__':
+    unittest.main()
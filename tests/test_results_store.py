@@ -0,0 +1,65 @@
+import datetime
+import os
+import shutil
+import tempfile
+import unittest
+
+from checkQC.results_store import ResultsStore
+
+
+class TestResultsStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.results_store = ResultsStore(os.path.join(self.tmp_dir, "results.db"))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def add_run(self, run_id, instrument, run_date, q30_values):
+        reports = {"exit_status": 0,
+                   "run_summary": {"instrument_and_reagent_type": "hiseq2500_rapidhighoutput_v4",
+                                   "read_length": "125-125",
+                                   "handlers": []}}
+        metrics = [{"metric": "percent_q30", "lane": lane, "read": 1, "value": value}
+                   for lane, value in enumerate(q30_values, start=1)]
+        metrics.append({"metric": "clusters_pf", "lane": 1, "read": None, "value": 180})
+        self.results_store.add_run(run_id=run_id, runfolder="/foo/" + run_id, instrument=instrument,
+                                   run_date=run_date, reports=reports, metrics=metrics)
+
+    def test_get_run(self):
+        self.add_run("170726_D00118_0303_BCB1TVANXX", "D00118", datetime.date(2017, 7, 26), [85, 90])
+        run = self.results_store.get_run("170726_D00118_0303_BCB1TVANXX")
+        self.assertEqual(run["instrument"], "D00118")
+        self.assertEqual(run["run_date"], "2017-07-26")
+        self.assertEqual(run["read_length"], "125-125")
+        self.assertEqual(run["reports"]["exit_status"], 0)
+        self.assertIsNone(self.results_store.get_run("not_a_run"))
+
+    def test_query_metrics(self):
+        self.add_run("170726_D00118_0303_BCB1TVANXX", "D00118", datetime.date(2017, 7, 26), [75, 90])
+        self.add_run("170801_D00118_0304_ACB1TVANXX", "D00118", datetime.date(2017, 8, 1), [79, 78])
+        self.add_run("170802_D00119_0001_ACB1TVANXX", "D00119", datetime.date(2017, 8, 2), [70, 70])
+        self.add_run("160101_D00118_0001_ACB1TVANXX", "D00118", datetime.date(2016, 1, 1), [70, 70])
+
+        results = self.results_store.query_metrics("percent_q30", instrument="D00118", below=80,
+                                                   since=datetime.date(2017, 1, 1))
+
+        self.assertListEqual([(result["run_id"], result["lane"], result["value"]) for result in results],
+                             [("170801_D00118_0304_ACB1TVANXX", 1, 79),
+                              ("170801_D00118_0304_ACB1TVANXX", 2, 78),
+                              ("170726_D00118_0303_BCB1TVANXX", 1, 75)])
+
+    def test_rechecking_run_replaces_results(self):
+        self.add_run("170726_D00118_0303_BCB1TVANXX", "D00118", datetime.date(2017, 7, 26), [75, 90])
+        self.add_run("170726_D00118_0303_BCB1TVANXX", "D00118", datetime.date(2017, 7, 26), [95, 90])
+        results = self.results_store.query_metrics("percent_q30")
+        self.assertListEqual([result["value"] for result in results], [95, 90])
+
+    def test_months_ago(self):
+        self.assertEqual(ResultsStore.months_ago(6, today=datetime.date(2017, 8, 31)), datetime.date(2017, 2, 28))
+        self.assertEqual(ResultsStore.months_ago(12, today=datetime.date(2017, 8, 1)), datetime.date(2016, 8, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
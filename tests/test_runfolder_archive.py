@@ -0,0 +1,80 @@
+import unittest
+
+import os
+import shutil
+import tarfile
+import tempfile
+import zipfile
+
+from checkQC.app import App
+from checkQC.runfolder_archive import RunfolderArchive, ArchivedRunfolder
+
+
+class TestRunfolderArchive(unittest.TestCase):
+
+    RUNFOLDER_NAME = "170726_D00118_0303_BCB1TVANXX"
+    RUNFOLDER = os.path.join(os.path.dirname(__file__), "resources", RUNFOLDER_NAME)
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.tar_path = os.path.join(self.tmp_dir, self.RUNFOLDER_NAME + ".tar.gz")
+        with tarfile.open(self.tar_path, "w:gz") as archive:
+            archive.add(self.RUNFOLDER, arcname=self.RUNFOLDER_NAME)
+
+        self.zip_path = os.path.join(self.tmp_dir, self.RUNFOLDER_NAME + ".zip")
+        with zipfile.ZipFile(self.zip_path, "w") as archive:
+            for root, _, files in os.walk(self.RUNFOLDER):
+                for name in files:
+                    path = os.path.join(root, name)
+                    archive.write(path, os.path.join(self.RUNFOLDER_NAME, os.path.relpath(path, self.RUNFOLDER)))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_is_archive(self):
+        self.assertTrue(RunfolderArchive.is_archive(self.tar_path))
+        self.assertTrue(RunfolderArchive.is_archive(self.zip_path))
+        self.assertFalse(RunfolderArchive.is_archive(self.RUNFOLDER))
+
+    def test_members(self):
+        for archive_path in (self.tar_path, self.zip_path):
+            archive = RunfolderArchive(archive_path)
+            self.assertListEqual(archive.members("InterOp/*"),
+                                 ["InterOp/IndexMetricsOut.bin", "InterOp/TileMetricsOut.bin"])
+            self.assertEqual(archive.runfolder_name, self.RUNFOLDER_NAME)
+
+    def test_read(self):
+        with open(os.path.join(self.RUNFOLDER, "RunInfo.xml"), "rb") as f:
+            run_info = f.read()
+        for archive_path in (self.tar_path, self.zip_path):
+            contents = RunfolderArchive(archive_path).read(["RunInfo.xml"])
+            self.assertEqual(contents["RunInfo.xml"], run_info)
+
+    def test_index_is_cached(self):
+        RunfolderArchive(self.tar_path).members()
+        self.assertTrue(os.path.isfile(self.tar_path + RunfolderArchive.INDEX_SUFFIX))
+
+        archive = RunfolderArchive(self.tar_path)
+        archive._build_index = None
+        self.assertIn("RunInfo.xml", archive.members())
+
+    def test_archived_runfolder(self):
+        with ArchivedRunfolder(self.tar_path) as runfolder:
+            self.assertTrue(os.path.isfile(os.path.join(runfolder, "RunInfo.xml")))
+            self.assertTrue(os.path.isfile(os.path.join(runfolder, "Data", "Intensities", "BaseCalls",
+                                                        "Stats", "Stats.json")))
+            # The Interop files are read directly from the archive
+            self.assertListEqual(os.listdir(os.path.join(runfolder, "InterOp")), [])
+        self.assertFalse(os.path.exists(runfolder))
+
+    def test_run_app_on_archive(self):
+        expected_reports = App(runfolder=self.RUNFOLDER).configure_and_run()
+        for archive_path in (self.tar_path, self.zip_path):
+            app = App(runfolder=archive_path)
+            reports = app.configure_and_run()
+            self.assertEqual(app.exit_status, 1)
+            self.assertDictEqual(reports, expected_reports)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import unittest
+
+import datetime
+import os
+import shutil
+import tempfile
+
+from checkQC.runfolder_catalogue import RunfolderCatalogue
+from checkQC.results_store import ResultsStore
+
+
+class TestRunfolderCatalogue(unittest.TestCase):
+
+    RESOURCES = os.path.join(os.path.dirname(__file__), "resources")
+
+    def setUp(self):
+        self.monitor_path = tempfile.mkdtemp()
+        for runfolder in ("170726_D00118_0303_BCB1TVANXX", "MiSeqDemo"):
+            os.makedirs(os.path.join(self.monitor_path, runfolder))
+            for file_name in ("RunInfo.xml", "RunParameters.xml", "runParameters.xml"):
+                source = os.path.join(self.RESOURCES, runfolder, file_name)
+                if os.path.isfile(source):
+                    shutil.copy(source, os.path.join(self.monitor_path, runfolder, file_name))
+        os.makedirs(os.path.join(self.monitor_path, "not_a_runfolder"))
+        open(os.path.join(self.monitor_path, "a_file.txt"), "w").close()
+        self.catalogue = RunfolderCatalogue(self.monitor_path, min_refresh_interval=0)
+
+    def tearDown(self):
+        shutil.rmtree(self.monitor_path)
+
+    def test_refresh_and_query(self):
+        self.catalogue.refresh()
+        result = self.catalogue.query()
+        self.assertEqual(result["total"], 3)
+        self.assertListEqual([entry["runfolder"] for entry in result["runfolders"]],
+                             ["not_a_runfolder", "MiSeqDemo", "170726_D00118_0303_BCB1TVANXX"])
+
+        hiseq = result["runfolders"][2]
+        self.assertEqual(hiseq["instrument"], "D00118")
+        self.assertEqual(hiseq["instrument_and_reagent_type"], "hiseq2500_rapidhighoutput_v4")
+        self.assertEqual(hiseq["read_length"], "126-126")
+        self.assertFalse(hiseq["sequencing_complete"])
+        self.assertIsNone(hiseq["qc_status"])
+        self.assertIsNotNone(result["runfolders"][0]["error"])
+
+    def test_query_with_filters_and_pagination(self):
+        self.catalogue.refresh()
+        self.assertListEqual([entry["runfolder"] for entry in self.catalogue.query(instrument="D00118")["runfolders"]],
+                             ["170726_D00118_0303_BCB1TVANXX"])
+        page = self.catalogue.query(offset=1, limit=1)
+        self.assertEqual(page["total"], 3)
+        self.assertListEqual([entry["runfolder"] for entry in page["runfolders"]], ["MiSeqDemo"])
+
+        self.catalogue.record_qc_status("MiSeqDemo", 1)
+        self.assertListEqual([entry["runfolder"] for entry in self.catalogue.query(status="failed")["runfolders"]],
+                             ["MiSeqDemo"])
+        self.assertEqual(self.catalogue.query(status="unchecked")["total"], 2)
+
+    def test_refresh_is_incremental(self):
+        self.catalogue.refresh()
+        runfolder = os.path.join(self.monitor_path, "170726_D00118_0303_BCB1TVANXX")
+        indexed = self.catalogue._entries["MiSeqDemo"]
+
+        open(os.path.join(runfolder, "RTAComplete.txt"), "w").close()
+        # Make sure the modification time changes, even on filesystems with a coarse resolution
+        mtime = os.stat(runfolder).st_mtime + 10
+        os.utime(runfolder, (mtime, mtime))
+        shutil.rmtree(os.path.join(self.monitor_path, "not_a_runfolder"))
+        self.catalogue.refresh()
+
+        self.assertIs(self.catalogue._entries["MiSeqDemo"], indexed)
+        self.assertTrue(self.catalogue._entries["170726_D00118_0303_BCB1TVANXX"]["sequencing_complete"])
+        self.assertEqual(self.catalogue.query(complete=True)["total"], 1)
+        self.assertNotIn("not_a_runfolder", self.catalogue._entries)
+
+    def test_refresh_with_malformed_xml(self):
+        run_info = os.path.join(self.monitor_path, "MiSeqDemo", "RunInfo.xml")
+        with open(run_info) as f:
+            content = f.read()
+        with open(run_info, "w") as f:
+            f.write(content[:len(content) // 2])
+        self.catalogue.refresh()
+        self.assertIn("Could not determine the run type", self.catalogue._entries["MiSeqDemo"]["error"])
+        self.assertEqual(self.catalogue.query()["total"], 3)
+
+        # The runfolder is read again on the next refresh, even if its modification time has not changed
+        with open(run_info, "w") as f:
+            f.write(content)
+        self.catalogue.refresh()
+        self.assertIsNone(self.catalogue._entries["MiSeqDemo"]["error"])
+        self.assertEqual(self.catalogue._entries["MiSeqDemo"]["instrument"], "M00141")
+
+    def test_qc_status_from_results_db(self):
+        results_db = os.path.join(self.monitor_path, "results.db")
+        ResultsStore(results_db).add_run(run_id="170726_D00118_0303_BCB1TVANXX", runfolder="/some/path",
+                                         instrument="D00118", run_date=None, reports={"exit_status": 0},
+                                         metrics=[], checked_at=datetime.datetime(2017, 8, 1, 12, 0, 0))
+        catalogue = RunfolderCatalogue(self.monitor_path, results_db=results_db)
+        catalogue.refresh()
+        self.assertDictEqual(catalogue.query(status="passed")["runfolders"][0]["qc_status"],
+                             {"exit_status": 0, "checked_at": "2017-08-01T12:00:00"})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import concurrent.futures
+import io
+import os
+import unittest
+
+import mock
+
+from checkQC import runfolder_comparison
+from checkQC.runfolder_comparison import MetricsTable, RunfolderComparison
+
+
+def check_or_crash(runfolder, config_file=None):
+    # Run in a worker process, which dies without cleaning up when checking the runfolder 'crash'
+    if runfolder == "crash":
+        os._exit(1)
+    return {"runfolder": runfolder, "exit_status": 0, "reports": {}, "metrics": []}
+
+
+class TestMetricsTable(unittest.TestCase):
+
+    def setUp(self):
+        self.metrics_table = MetricsTable()
+        for run_nbr, value in enumerate([90, 91, 89, 90, 60]):
+            self.metrics_table.add_runfolder("run_{}".format(run_nbr),
+                                             [{"metric": "percent_q30", "lane": 1, "read": 1, "value": value},
+                                              {"metric": "clusters_pf", "lane": 1, "read": None, "value": 180}])
+
+    def test_add_runfolder(self):
+        self.assertEqual(len(self.metrics_table), 10)
+        self.assertDictEqual(self.metrics_table.row(9),
+                             {"runfolder": "run_4", "metric": "clusters_pf", "lane": 1, "read": None, "value": 180})
+
+    def test_robust_z_scores(self):
+        z_scores = self.metrics_table.robust_z_scores()
+        self.assertAlmostEqual(z_scores[8], 0.6745 * (60 - 90) / 1)
+        # No deviation at all for clusters_pf
+        self.assertEqual(z_scores[9], 0)
+
+    def test_write_tsv(self):
+        z_scores = self.metrics_table.robust_z_scores()
+        output = io.StringIO()
+        self.metrics_table.write_tsv(output, z_scores, outlier_threshold=3.5)
+        lines = output.getvalue().splitlines()
+        self.assertEqual(len(lines), 11)
+        self.assertEqual(lines[9], "run_4\tpercent_q30\t1\t1\t60.0\t-20.235\t1")
+
+
+class TestRunfolderComparison(unittest.TestCase):
+
+    RUNFOLDER = os.path.join(os.path.dirname(__file__), "resources", "170726_D00118_0303_BCB1TVANXX")
+
+    def test_run_with_failing_runfolder(self):
+        def check_runfolder(runfolder, config_file=None):
+            if runfolder == "broken":
+                raise RuntimeError("worker died")
+            return original_check_runfolder(runfolder, config_file)
+
+        original_check_runfolder = runfolder_comparison.check_runfolder
+        # Threads are used instead of processes, so that check_runfolder can be replaced
+        with mock.patch("concurrent.futures.ProcessPoolExecutor", concurrent.futures.ThreadPoolExecutor), \
+                mock.patch.object(runfolder_comparison, "check_runfolder", check_runfolder):
+            report = RunfolderComparison([self.RUNFOLDER, "broken"], processes=2).run()
+        self.assertEqual(report["exit_status"], 1)
+        self.assertListEqual([run["runfolder"] for run in report["runs"]], [self.RUNFOLDER, "broken"])
+        self.assertNotIn("error", report["runs"][0])
+        self.assertEqual(report["runs"][1]["error"], "RuntimeError: worker died")
+
+    def test_run_with_crashed_worker(self):
+        runfolders = ["run_1", "run_2", "crash", "run_4", "run_5", "run_6"]
+        with mock.patch.object(runfolder_comparison, "check_runfolder", check_or_crash):
+            report = RunfolderComparison(runfolders, processes=1).run()
+        self.assertEqual(report["exit_status"], 1)
+        self.assertListEqual([run["runfolder"] for run in report["runs"]], runfolders)
+        self.assertIn("BrokenProcessPool", report["runs"][2]["error"])
+        # New worker processes are started for the runfolders which had not been submitted yet
+        self.assertNotIn("error", report["runs"][-1])
+
+    def test_run(self):
+        comparison = RunfolderComparison([self.RUNFOLDER, self.RUNFOLDER], processes=2)
+        report = comparison.run()
+        self.assertEqual(report["exit_status"], 1)
+        self.assertEqual(len(report["runs"]), 2)
+        self.assertEqual(report["runs"][0]["warnings"], 3)
+        self.assertEqual(report["outliers"], [])
+        self.assertEqual(len(comparison.metrics_table.runfolders), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import unittest
+
+import os
+import shutil
+import tempfile
+
+from checkQC.runfolder_io import RunfolderPrefetcher
+
+
+class TestRunfolderPrefetcher(unittest.TestCase):
+
+    RUNFOLDER = os.path.join(os.path.dirname(__file__), "resources", "170726_D00118_0303_BCB1TVANXX")
+
+    def setUp(self):
+        self.scratch_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.scratch_dir)
+
+    def test_required_files(self):
+        files = RunfolderPrefetcher(self.RUNFOLDER).required_files()
+        self.assertIn("RunInfo.xml", files)
+        self.assertIn(os.path.join("InterOp", "TileMetricsOut.bin"), files)
+        self.assertIn(os.path.join("Data", "Intensities", "BaseCalls", "Stats", "Stats.json"), files)
+
+    def test_prefetch_to_page_cache(self):
+        prefetcher = RunfolderPrefetcher(self.RUNFOLDER)
+        local_runfolder = prefetcher.prefetch()
+        self.assertEqual(local_runfolder, self.RUNFOLDER)
+        expected_bytes = sum(os.path.getsize(os.path.join(self.RUNFOLDER, f)) for f in prefetcher.files)
+        self.assertEqual(prefetcher.bytes_read, expected_bytes)
+        self.assertIsNone(prefetcher.mirror)
+
+    def test_prefetch_to_scratch(self):
+        with RunfolderPrefetcher(self.RUNFOLDER, scratch_dir=self.scratch_dir) as local_runfolder:
+            self.assertTrue(local_runfolder.startswith(self.scratch_dir))
+            run_info = os.path.join(local_runfolder, "RunInfo.xml")
+            self.assertTrue(os.path.isfile(run_info))
+            self.assertFalse(os.path.islink(run_info))
+            # Entries which are not needed are linked to the original runfolder
+            for entry in os.listdir(self.RUNFOLDER):
+                self.assertTrue(os.path.lexists(os.path.join(local_runfolder, entry)))
+        self.assertListEqual(os.listdir(self.scratch_dir), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
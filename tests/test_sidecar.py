@@ -0,0 +1,93 @@
+import unittest
+
+import os
+import shutil
+import tempfile
+
+import mock
+
+from checkQC.app import App
+from checkQC.sidecar import Sidecar
+from checkQC.parsers.interop_parser import InteropParser
+from checkQC.parsers.stats_json_parser import StatsJsonParser
+
+
+class TestSidecar(unittest.TestCase):
+
+    RUNFOLDER = os.path.join(os.path.dirname(__file__), "resources", "170726_D00118_0303_BCB1TVANXX")
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.runfolder = os.path.join(self.tmp_dir, "170726_D00118_0303_BCB1TVANXX")
+        shutil.copytree(self.RUNFOLDER, self.runfolder)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_write_and_load(self):
+        sidecar = Sidecar(self.runfolder)
+        self.assertIsNone(sidecar.load())
+        self.assertTrue(sidecar.write(run_type={"read_length": "125-125"},
+                                      signals={"FakeParser": [["foo", 1]]},
+                                      reports={"exit_status": 0},
+                                      metrics=[]))
+        self.assertEqual(sidecar.path, os.path.join(self.runfolder, Sidecar.FILE_NAME))
+        self.assertListEqual(sidecar.load()["signals"]["FakeParser"], [["foo", 1]])
+
+    def test_load_when_runfolder_has_changed(self):
+        sidecar = Sidecar(self.runfolder)
+        sidecar.write(run_type={}, signals={}, reports={}, metrics=[])
+        with open(os.path.join(self.runfolder, "InterOp", "TileMetricsOut.bin"), "ab") as f:
+            f.write(b"\0")
+        self.assertIsNone(sidecar.load())
+
+    def test_load_when_fastq_files_have_changed(self):
+        fastq_file = os.path.join(self.runfolder, "Data", "Intensities", "BaseCalls", "Sample_1_S1_L001_R1_001.fastq.gz")
+        with open(fastq_file, "wb") as f:
+            f.write(b"\0")
+        sidecar = Sidecar(self.runfolder)
+        sidecar.write(run_type={}, signals={"FastqParser": [["fastq_sample", {"reads_sampled": 0}]]},
+                      reports={}, metrics=[])
+        self.assertIn(os.path.join("Data", "Intensities", "BaseCalls", "Sample_1_S1_L001_R1_001.fastq.gz"),
+                      sidecar.load()["fingerprint"])
+        with open(fastq_file, "ab") as f:
+            f.write(b"\0")
+        self.assertIsNone(sidecar.load())
+
+    def test_compact_signals(self):
+        conversion_results = [{"LaneNumber": 1, "TotalClustersRaw": 10, "TotalClustersPF": 8, "Yield": 100,
+                               "DemuxResults": [{"SampleId": "Sample_1", "SampleName": "Sample_1", "NumberReads": 7,
+                                                 "Yield": 90, "ReadMetrics": [{"ReadNumber": 1, "Yield": 45}],
+                                                 "IndexMetrics": [{"IndexSequence": "ACGT",
+                                                                   "MismatchCounts": {"0": 7}}]}],
+                               "Undetermined": {"NumberReads": 1, "Yield": 10, "ReadMetrics": []}}]
+        signals = {"StatsJsonParser": [("Flowcell", "CB1TVANXX"), ("ConversionResults", conversion_results),
+                                       ("UnknownBarcodes", [{"Lane": 1, "Barcodes": {"AAAA": 1}}])],
+                   "InteropParser": [("clusters_pf", {"lane": 1, "clusters_pf": 8})]}
+        compact_signals = Sidecar.compact_signals(signals)
+        self.assertListEqual(compact_signals["InteropParser"], signals["InteropParser"])
+        self.assertListEqual(compact_signals["StatsJsonParser"],
+                             [("ConversionResults",
+                               [{"LaneNumber": 1, "TotalClustersPF": 8, "Yield": 100, "Undetermined": {"Yield": 10},
+                                 "DemuxResults": [{"SampleId": "Sample_1", "NumberReads": 7,
+                                                   "IndexMetrics": [{"IndexSequence": "ACGT"}]}]}]),
+                              ("UnknownBarcodes", [{"Lane": 1, "Barcodes": {"AAAA": 1}}])])
+
+    def test_run_app_with_sidecar(self):
+        app = App(runfolder=self.runfolder, sidecar=True)
+        expected_reports = app.configure_and_run()
+        sidecar = Sidecar(self.runfolder).load()
+        self.assertSetEqual(set(sidecar["signals"].keys()), {"InteropParser", "StatsJsonParser"})
+        self.assertEqual(sidecar["run_type"]["instrument_and_reagent_type"], "hiseq2500_rapidhighoutput_v4")
+
+        # When checked again, the values should be replayed from the sidecar instead of parsing the runfolder
+        with mock.patch.object(InteropParser, "run", side_effect=AssertionError("InterOp was parsed")), \
+                mock.patch.object(StatsJsonParser, "run", side_effect=AssertionError("Stats.json was parsed")):
+            app = App(runfolder=self.runfolder, sidecar=True)
+            reports = app.configure_and_run()
+        self.assertEqual(app.exit_status, 1)
+        self.assertDictEqual(reports, expected_reports)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,14 @@
-
+import json
+import shutil
+import tempfile
 
 import tornado.web
+import yaml
 from tornado.testing import *
 
-from checkQC.web_app import WebApp
+import mock
+
+from checkQC.web_app import WebApp, CheckQCHandler
 
 
 class TestWebApp(AsyncHTTPTestCase):
@@ -16,3 +21,158 @@ class TestWebApp(AsyncHTTPTestCase):
         response = self.fetch('/qc/170726_D00118_0303_BCB1TVANXX')
         self.assertEqual(response.code, 200)
 
+
+    def test_qc_endpoint_not_modified(self):
+        response = self.fetch('/qc/170726_D00118_0303_BCB1TVANXX')
+        self.assertEqual(response.code, 200)
+        etag = response.headers["Etag"]
+        last_modified = response.headers["Last-Modified"]
+
+        with mock.patch.object(CheckQCHandler, "_run_check_qc_async") as run_check_qc:
+            response = self.fetch('/qc/170726_D00118_0303_BCB1TVANXX', headers={"If-None-Match": etag})
+            self.assertEqual(response.code, 304)
+            response = self.fetch('/qc/170726_D00118_0303_BCB1TVANXX', headers={"If-Modified-Since": last_modified})
+            self.assertEqual(response.code, 304)
+            run_check_qc.assert_not_called()
+
+        response = self.fetch('/qc/170726_D00118_0303_BCB1TVANXX', headers={"If-None-Match": '"outdated"'})
+        self.assertEqual(response.code, 200)
+        self.assertEqual(response.headers["Etag"], etag)
+
+    def test_qc_endpoint_with_lanes(self):
+        response = self.fetch('/qc/170726_D00118_0303_BCB1TVANXX?lanes=1,2')
+        self.assertEqual(response.code, 200)
+        self.assertEqual(json.loads(response.body)["exit_status"], 0)
+
+        response = self.fetch('/qc/170726_D00118_0303_BCB1TVANXX?lanes=first')
+        self.assertEqual(response.code, 400)
+
+    def test_batch_endpoint(self):
+        batch = {"runfolders": ["170726_D00118_0303_BCB1TVANXX",
+                                {"runfolder": "170726_D00118_0303_BCB1TVANXX", "only": ["ClusterPFHandler"]},
+                                "does_not_exist",
+                                "../resources"]}
+        response = self.fetch('/qc/batch', method="POST", body=json.dumps(batch))
+        self.assertEqual(response.code, 200)
+        results = [json.loads(line) for line in response.body.decode().splitlines()]
+        self.assertEqual(len(results), 4)
+
+        checked = [result for result in results if "reports" in result]
+        self.assertEqual(len(checked), 2)
+        exit_statuses = sorted(result["reports"]["exit_status"] for result in checked)
+        # The ReadsPerSampleHandler finds fatal errors, when only the ClusterPFHandler is run there are none
+        self.assertListEqual(exit_statuses, [0, 1])
+        self.assertListEqual(sorted(result["runfolder"] for result in results if "error" in result),
+                             ["../resources", "does_not_exist"])
+
+        # Unchanged runfolders are not checked again
+        with mock.patch.object(CheckQCHandler, "_run_check_qc_async") as run_check_qc:
+            response = self.fetch('/qc/batch', method="POST",
+                                  body=json.dumps({"runfolders": ["170726_D00118_0303_BCB1TVANXX"]}))
+            run_check_qc.assert_not_called()
+        result = json.loads(response.body.decode())
+        self.assertTrue(result["cached"])
+        self.assertEqual(result["reports"]["exit_status"], 1)
+
+    def test_batch_endpoint_invalid_batch(self):
+        response = self.fetch('/qc/batch', method="POST", body=json.dumps(["170726_D00118_0303_BCB1TVANXX"]))
+        self.assertEqual(response.code, 400)
+
+        for invalid in ({"only": "ClusterPFHandler"},
+                        {"skip": [{"name": "ReadsPerSampleHandler"}]},
+                        {"lanes": {"1": True}},
+                        {"lanes": [True]}):
+            batch = {"runfolders": [dict(invalid, runfolder="170726_D00118_0303_BCB1TVANXX")]}
+            response = self.fetch('/qc/batch', method="POST", body=json.dumps(batch))
+            self.assertEqual(response.code, 400)
+
+    def test_runfolders_endpoint(self):
+        response = self.fetch('/runfolders?instrument=D00118&limit=10')
+        self.assertEqual(response.code, 200)
+        result = json.loads(response.body)
+        self.assertIn("170726_D00118_0303_BCB1TVANXX", [entry["runfolder"] for entry in result["runfolders"]])
+        self.assertTrue(all(entry["instrument"] == "D00118" for entry in result["runfolders"]))
+
+    def test_runfolders_endpoint_invalid_argument(self):
+        response = self.fetch('/runfolders?status=great')
+        self.assertEqual(response.code, 400)
+
+    def test_results_endpoint_without_results_db(self):
+        response = self.fetch('/results?metric=percent_q30&below=80')
+        self.assertEqual(response.code, 404)
+
+    def test_profile_endpoint_is_not_enabled(self):
+        response = self.fetch('/debug/profile?seconds=0.1')
+        self.assertEqual(response.code, 404)
+
+
+class TestWebAppWithProfiling(AsyncHTTPTestCase):
+
+    def get_app(self):
+        routes = WebApp._routes(monitoring_path=os.path.join("tests", "resources"), qc_config_file=None,
+                                enable_profiling=True)
+        return tornado.web.Application(routes)
+
+    def test_profile_endpoint(self):
+        response = self.fetch('/debug/profile?seconds=0.1')
+        self.assertEqual(response.code, 200)
+        self.assertEqual(response.headers["Content-Type"], "text/plain")
+        self.assertTrue(response.body.decode().startswith("checkqc;"))
+
+    def test_profile_endpoint_invalid_argument(self):
+        self.assertEqual(self.fetch('/debug/profile?seconds=600').code, 400)
+        self.assertEqual(self.fetch('/debug/profile?seconds=soon').code, 400)
+
+
+class TestWebAppWithTimeout(AsyncHTTPTestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        with open(os.path.join("checkQC", "default_config", "config.yaml")) as f:
+            config = yaml.safe_load(f)
+        config["timeouts"] = {"total": 0}
+        self.config_file = os.path.join(self.tmp_dir, "config.yaml")
+        with open(self.config_file, "w") as f:
+            yaml.dump(config, f)
+        super().setUp()
+
+    def tearDown(self):
+        super().tearDown()
+        shutil.rmtree(self.tmp_dir)
+
+    def get_app(self):
+        routes = WebApp._routes(monitoring_path=os.path.join("tests", "resources"), qc_config_file=self.config_file)
+        return tornado.web.Application(routes)
+
+    def test_qc_endpoint_times_out(self):
+        response = self.fetch('/qc/170726_D00118_0303_BCB1TVANXX')
+        self.assertEqual(response.code, 504)
+        self.assertTrue(json.loads(response.body)["timed_out"])
+
+
+class TestWebAppWithResultsDb(AsyncHTTPTestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        super().setUp()
+
+    def tearDown(self):
+        super().tearDown()
+        shutil.rmtree(self.tmp_dir)
+
+    def get_app(self):
+        routes = WebApp._routes(monitoring_path=os.path.join("tests", "resources"), qc_config_file=None,
+                                results_db=os.path.join(self.tmp_dir, "results.db"))
+        return tornado.web.Application(routes)
+
+    def test_qc_results_are_stored_and_queried(self):
+        response = self.fetch('/qc/170726_D00118_0303_BCB1TVANXX')
+        self.assertEqual(response.code, 200)
+        response = self.fetch('/results?metric=clusters_pf&instrument=D00118&below=180')
+        self.assertEqual(response.code, 200)
+        results = json.loads(response.body)["results"]
+        self.assertListEqual([result["lane"] for result in results], [1, 7, 8])
+
+    def test_results_endpoint_with_invalid_argument(self):
+        response = self.fetch('/results?below=foo')
+        self.assertEqual(response.code, 400)